@@ -0,0 +1,355 @@
+"""Benchmark the in-situ analyses of semproxy against their ad-hoc versions.
+
+For every size and iteration one job runs:
+
+* semproxy with the in-situ analyses (stats in a run of its own, since the
+  histogram would otherwise hand it its min/max pass for free);
+* semproxy once with every output the ad-hoc analyses need (snapshots, slice
+  snapshots, sismos), then each ad-hoc script on that same output. Slices
+  are rendered both as seaborn heatmaps and with ``visu-slice.py --batch``
+  (``slice_adhoc_batch``), which writes the same PPM images as the in-situ
+  run. ``fourier.py`` reports its load, compute and write phases
+  (``fourier_adhoc_load``, ``fourier_adhoc_compute``,
+  ``fourier_adhoc_write``), so that its FFT can be set against the in-situ
+  one.
+
+Jobs run concurrently on a pool of CPUs, each process pinned to the CPUs of
+its job. Jobs of size >= --exclusive-size get every CPU and run alone; the
+largest jobs are scheduled first. Each job writes under its own
+--output-dir, removed when the job is done (unless --keep).
+
+With --geometry-cache or --assembly the job also runs semproxy without
+any output for each given mode and for the default mode of the option
+(``none``, ``atomic``), and reports the kernel time of each
+(``kerneltime_<mode>``) and its speedup over the default
+(``kernel_speedup_<mode>``).
+
+With --profile every semproxy run times its phases (solver kernels,
+outputs, analyses) and the job reports the total time of each phase
+(``phase_<name>``) of the run giving ``kerneltime``, and of each kernel
+alone run (``phase_<name>_<mode>``), e.g.
+``phase_computeElementContributions``.
+
+With --snapshot-compression the snapshots of the ad-hoc run are written
+raw and compressed; the job then also reports the compression ratio, the
+encode throughput of semproxy and the decode throughput of the Python
+reader (``decode_snapshots.py``).
+
+Results go to one CSV with, for each size and metric, its unit (ms, MB/s
+or ratio), the number of samples, the mean, the standard deviation and the
+95% confidence interval of the mean. Per-run values are saved next to it
+(``*_runs.csv``).
+
+Usage: python3 scripts/bench/bench.py --sizes 10 20 50 100 --iters 5
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_utils import (
+    get_exec_phases,
+    get_exec_stats,
+    get_script_phases,
+    get_script_time,
+    print_stderr,
+    run_pinned,
+    summarize,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPTS = os.path.join(ROOT, "scripts")
+ANALYSES = ["stats", "histo", "fourier", "slice"]
+GEOMETRY_CACHES = ["none", "corners", "jacobian"]
+ASSEMBLIES = ["atomic", "coloring"]
+# semproxy options whose modes are timed on the kernel alone: the argument
+# holding the modes, the option and its default mode
+KERNEL_VARIANTS = [("geometry_cache", "--geometry-cache", "none"),
+                   ("assembly", "--assembly", "atomic")]
+# metrics not in ms
+UNITS = {"compression_ratio": "ratio", "encode_mbps": "MB/s", "decode_mbps": "MB/s"}
+UNITS.update({f"kernel_speedup_{mode}": "ratio" for mode in GEOMETRY_CACHES + ASSEMBLIES})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 30, 50, 75, 100, 200])
+    parser.add_argument("--iters", type=int, default=5, help="Runs per size")
+    parser.add_argument("--analyses", nargs="+", choices=ANALYSES, default=ANALYSES)
+    parser.add_argument("--order", type=int, default=2)
+    parser.add_argument("--timemax", default="1")
+    parser.add_argument("--delay", type=int, default=50,
+                        help="Steps between two snapshots / analyses")
+    parser.add_argument("--cpus", type=int, default=len(available_cpus()),
+                        help="Number of CPUs of the pool")
+    parser.add_argument("--cores-per-run", type=int, default=1,
+                        help="CPUs given to a job smaller than --exclusive-size")
+    parser.add_argument("--exclusive-size", type=int, default=100,
+                        help="Jobs from this size on run alone on every CPU")
+    parser.add_argument("--snapshot-compression", choices=["none", "lossless", "lossy"],
+                        default="none", help="Codec of the snapshots of the ad-hoc run")
+    parser.add_argument("--snapshot-tolerance", default="1e-4",
+                        help="Absolute error bound of --snapshot-compression lossy")
+    parser.add_argument("--geometry-cache", nargs="+", choices=GEOMETRY_CACHES, default=[],
+                        help="Also time the kernel alone with these --geometry-cache modes")
+    parser.add_argument("--assembly", nargs="+", choices=ASSEMBLIES, default=[],
+                        help="Also time the kernel alone with these --assembly modes")
+    parser.add_argument("--profile", action="store_true",
+                        help="Report the time of every phase of the runs (semproxy --profile)")
+    parser.add_argument("--exe", default=os.path.join(ROOT, "build/bin/semproxy"))
+    parser.add_argument("--workdir", default="/tmp/insitu/bench",
+                        help="Outputs of the runs, one directory per job")
+    parser.add_argument("--keep", action="store_true", help="Keep the outputs of the runs")
+    parser.add_argument("--output", default=os.path.join(ROOT, "data/bench/bench_results.csv"))
+    return parser.parse_args()
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuPool:
+    """CPUs handed out to the jobs, first come first served."""
+
+    def __init__(self, cpus):
+        self.free = list(cpus)
+        self.size = len(cpus)
+        self.cond = threading.Condition()
+
+    def acquire(self, count):
+        count = min(count, self.size)
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.free) >= count)
+            cpus, self.free = self.free[:count], self.free[count:]
+            return cpus
+
+    def release(self, cpus):
+        with self.cond:
+            self.free.extend(cpus)
+            self.cond.notify_all()
+
+
+def semproxy(args, size, output_dir, flags, cpus):
+    cmd = [args.exe, "--timemax", args.timemax, "-o", str(args.order),
+           "--ex", str(size), "--ey", str(size), "--ez", str(size),
+           "--output-dir", output_dir] + flags
+    if args.profile:
+        cmd.append("--profile")
+    result = run_pinned(cmd, cpus)
+    print_stderr(result.stderr)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {result.returncode}")
+    return {k: float(v) for k, v in get_exec_stats(result.stdout).items()}
+
+
+def script_time(cmd, cpus, cwd=None):
+    """Time (us) printed by an ad-hoc script."""
+    return run_script(cmd, cpus, cwd)[0]
+
+
+def run_script(cmd, cpus, cwd=None):
+    """Time (us) printed by an ad-hoc script, and its stdout."""
+    result = run_pinned(["python3"] + cmd, cpus, cwd)
+    print_stderr(result.stderr)
+    seconds = get_script_time(result.stdout)
+    if seconds is None:
+        raise RuntimeError(f"No 'Time:' line in the output of {cmd[0]}")
+    return seconds * 1e6, result.stdout
+
+
+def snapshot_metrics(row, snapshots, cpus):
+    """Compression ratio and encode/decode throughputs (MB/s) of a run."""
+    stored = row["snapshotstoredbytes"]
+    if stored == 0:
+        return {}
+    metrics = {"compression_ratio": row["snapshotbytes"] / stored}
+    if row["snapshotencodetime"] > 0:
+        # bytes per us = MB/s
+        metrics["encode_mbps"] = row["snapshotbytes"] / row["snapshotencodetime"]
+    elapsed, stdout = run_script([os.path.join(SCRIPTS, "bench/decode_snapshots.py"),
+                                  snapshots], cpus)
+    decoded = next(float(line.split(":")[1]) for line in stdout.splitlines()
+                   if line.startswith("Bytes:"))
+    if elapsed > 0:
+        metrics["decode_mbps"] = decoded / elapsed
+    return metrics
+
+
+def run_job(args, size, iteration, cpus):
+    """Run the in-situ and ad-hoc versions of the analyses, return the
+    metrics of the job in ms (see UNITS for the others)."""
+    job_dir = os.path.join(args.workdir, f"size{size}_iter{iteration}")
+    shutil.rmtree(job_dir, ignore_errors=True)
+    delay = str(args.delay)
+    nb_nodes = size * args.order + 1
+    z = nb_nodes // 2
+    # receiver at the center of the default 2000 m domain
+    points = os.path.join(job_dir, "points.txt")
+    os.makedirs(job_dir)
+    with open(points, "w") as f:
+        f.write("1000 1000 1000\n")
+
+    metrics = {}
+    rates = {}
+    analyses = set(args.analyses)
+    try:
+        # kernel alone, each mode against the default one of its option
+        for dest, option, default in KERNEL_VARIANTS:
+            modes = getattr(args, dest)
+            if not modes:
+                continue
+            for mode in [default] + [m for m in modes if m != default]:
+                row = semproxy(args, size, os.path.join(job_dir, f"kernel_{mode}"),
+                               [option, mode], cpus)
+                metrics[f"kerneltime_{mode}"] = row["kerneltime"]
+                metrics.update(get_exec_phases(row, f"_{mode}"))
+                if mode != default:
+                    rates[f"kernel_speedup_{mode}"] = (metrics[f"kerneltime_{default}"]
+                                                       / row["kerneltime"])
+
+        # in-situ
+        if "stats" in analyses:
+            row = semproxy(args, size, os.path.join(job_dir, "insitu_stats"),
+                           ["--stats-analysis", "--stats-interval", delay], cpus)
+            metrics["stats_insitu"] = row["statstime"]
+        flags = []
+        if "histo" in analyses:
+            flags += ["--compute-histogram", "--compute-histogram-delay", delay]
+        if "fourier" in analyses:
+            flags += ["--sismo-points", points, "--sismo-fourier"]
+        if "slice" in analyses:
+            flags += ["--sd", delay, "--slice-snapshot", str(z), "--slice-ppm"]
+        if flags:
+            row = semproxy(args, size, os.path.join(job_dir, "insitu"), flags, cpus)
+            metrics["kerneltime"] = row["kerneltime"]
+            metrics.update(get_exec_phases(row))
+            metrics["histo_insitu"] = row["histotime"]
+            metrics["fourier_insitu"] = row["fouriertime"]
+            metrics["slice_insitu"] = row["slicesnaptime"]
+
+        # ad-hoc: one solver run for all the analyses
+        adhoc_dir = os.path.join(job_dir, "adhoc")
+        flags = ["--sd", delay]
+        if analyses & {"stats", "histo", "slice"}:
+            flags += ["-s"]
+            if args.snapshot_compression != "none":
+                flags += ["--snapshot-format", "raw",
+                          "--snapshot-compression", args.snapshot_compression,
+                          "--snapshot-tolerance", args.snapshot_tolerance]
+        if "slice" in analyses:
+            flags += ["--slice-snapshot", str(z)]
+        if "fourier" in analyses:
+            flags += ["--sismo-points", points]
+        row = semproxy(args, size, adhoc_dir, flags, cpus)
+        if "kerneltime" not in metrics:
+            metrics["kerneltime"] = row["kerneltime"]
+            metrics.update(get_exec_phases(row))
+        snapshots = os.path.join(adhoc_dir, "snapshot")
+        if args.snapshot_compression != "none":
+            rates.update(snapshot_metrics(row, snapshots, cpus))
+
+        if "stats" in analyses:
+            metrics["stats_adhoc"] = row["snapshottime"] + script_time(
+                [os.path.join(SCRIPTS, "stats/stats.py"), snapshots], cpus)
+        if "histo" in analyses:
+            metrics["histo_adhoc"] = row["snapshottime"] + script_time(
+                [os.path.join(SCRIPTS, "stats/histo.py"), snapshots], cpus)
+        if "fourier" in analyses:
+            # fourier.py writes in ./data/fourier
+            sismo = os.path.join(adhoc_dir, "sismos/sismo_gather.bin")
+            elapsed, stdout = run_script([os.path.join(SCRIPTS, "stats/fourier.py"), sismo],
+                                         cpus, cwd=adhoc_dir)
+            metrics["fourier_adhoc"] = row["writesismotime"] + elapsed
+            # the phases, to set the FFT alone against the in-situ one
+            for phase, seconds in get_script_phases(stdout).items():
+                metrics[f"fourier_adhoc_{phase}"] = seconds * 1e6
+        if "slice" in analyses:
+            visu = [os.path.join(SCRIPTS, "plot/visu-slice.py"), "--order", str(args.order),
+                    "-z", str(z), "--size", str(size)]
+            metrics["slice_adhoc"] = row["slicesnaptime"] + script_time(
+                visu + ["--input", os.path.join(adhoc_dir, "slice_snapshot"),
+                        "--slice-snapshot"], cpus)
+            metrics["slice_adhoc_full"] = row["snapshottime"] + script_time(
+                visu + ["--input", snapshots], cpus)
+            # same colours and PPM images as the in-situ slices
+            metrics["slice_adhoc_batch"] = row["slicesnaptime"] + script_time(
+                visu + ["--input", os.path.join(adhoc_dir, "slice_snapshot"),
+                        "--slice-snapshot", "--batch", "--jobs", str(len(cpus))], cpus)
+    finally:
+        if not args.keep:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    # us -> ms
+    return dict({name: value / 1e3 for name, value in metrics.items()}, **rates)
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.exe):
+        print(f"Erreur: Exécutable introuvable: {args.exe}")
+        sys.exit(1)
+
+    pool = CpuPool(available_cpus()[:args.cpus])
+    # largest jobs first, so that the small ones fill the CPUs at the end
+    jobs = sorted(((size, i) for size in args.sizes for i in range(args.iters)),
+                  key=lambda job: -job[0])
+    runs = []
+    lock = threading.Lock()
+
+    def work(size, iteration, cpus):
+        t0 = time.time()
+        try:
+            metrics = run_job(args, size, iteration, cpus)
+        except Exception as e:
+            print(f"[Size {size}][Iter {iteration}] failed: {e}")
+            return
+        finally:
+            pool.release(cpus)
+        print(f"[Size {size}][Iter {iteration}] done in {time.time() - t0:.1f}s on CPUs {cpus}")
+        with lock:
+            runs.append(dict(size=size, iteration=iteration, **metrics))
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        for size, iteration in jobs:
+            exclusive = size >= args.exclusive_size
+            cpus = pool.acquire(pool.size if exclusive else args.cores_per_run)
+            executor.submit(work, size, iteration, cpus)
+
+    write_results(args.output, runs)
+
+
+def write_results(output, runs):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    metrics = sorted({name for run in runs for name in run} - {"size", "iteration"})
+    runs.sort(key=lambda run: (run["size"], run["iteration"]))
+
+    runs_output = os.path.splitext(output)[0] + "_runs.csv"
+    with open(runs_output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["size", "iteration"] + metrics)
+        writer.writeheader()
+        writer.writerows(runs)
+
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["size", "metric", "unit", "n", "mean", "std", "ci95_low", "ci95_high"])
+        for size in sorted({run["size"] for run in runs}):
+            for name in metrics:
+                values = [run.get(name) for run in runs if run["size"] == size]
+                n, mean, std, low, high = summarize(values)
+                unit = UNITS.get(name, "ms")
+                writer.writerow([size, name, unit, n, mean, std, low, high])
+                print(f"{size:<6} {name:<18} {mean:>12.3f} {unit} ± {std:.3f} (n={n})")
+
+    print(f"Résultats sauvegardés dans {output} et {runs_output}")
+
+
+if __name__ == "__main__":
+    main()
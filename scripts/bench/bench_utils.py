@@ -0,0 +1,120 @@
+"""Helpers shared by the benchmark scripts of ``scripts/bench``."""
+
+import csv
+import math
+import os
+import subprocess
+
+# message printed on stderr by every Kokkos Cuda run, not an error
+KOKKOS_UVM_WARNING = """Kokkos::Cuda::initialize WARNING: Cuda is allocating into UVMSpace by default
+                                  without setting CUDA_MANAGED_FORCE_DEVICE_ALLOC=1 or
+                                  setting CUDA_VISIBLE_DEVICES.
+                                  This could on multi GPU systems lead to severe performance"
+                                  penalties."""
+
+# two-sided 95% quantiles of Student's t for 1 to 30 degrees of freedom
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def print_stderr(stderr):
+    """Print the stderr of a run, without the Kokkos UVM warning."""
+    err = stderr.replace(KOKKOS_UVM_WARNING, "").strip()
+    if len(err) > 0:
+        print(err)
+
+
+def get_exec_stats(stdout):
+    """Return the row of the execution CSV announced by ``Exec stats:``.
+
+    The values are strings, keyed by the CSV header (kerneltime, histotime,
+    ...). Raise ValueError when the run printed no such line.
+    """
+    output_path = None
+    for line in stdout.splitlines():
+        if line.startswith("Exec stats:"):
+            output_path = line.split(":", 1)[1].strip().strip('"')
+    if not output_path:
+        raise ValueError("No 'Exec stats' line in the output of semproxy")
+
+    with open(output_path, newline="") as f:
+        return next(csv.DictReader(f))
+
+
+def get_exec_phases(row, suffix=""):
+    """Total time (us) of each phase of a row of the execution CSV of a
+    ``semproxy --profile`` run, keyed by ``phase_<name><suffix>``."""
+    phases = {}
+    for column, value in row.items():
+        if column.startswith("phase_") and column.endswith("_total"):
+            phases[column[:-len("_total")] + suffix] = float(value)
+    return phases
+
+
+def get_script_time(stdout):
+    """Seconds printed by an ad-hoc script on its ``Time:`` line, or None."""
+    for line in stdout.splitlines():
+        if line.startswith("Time:"):
+            return float(line.split(":")[-1].strip())
+    return None
+
+
+def get_script_phases(stdout):
+    """Seconds of each phase printed by an ad-hoc script on its
+    ``<Phase> time:`` lines (Load, Compute, Write), keyed by phase in lower
+    case."""
+    phases = {}
+    for line in stdout.splitlines():
+        name, sep, value = line.partition(" time:")
+        if sep and name and " " not in name:
+            phases[name.lower()] = float(value.strip())
+    return phases
+
+
+def run_pinned(cmd, cpus=None, cwd=None):
+    """Run ``cmd`` bound to the given CPUs, with as many OpenMP threads.
+
+    Without ``cpus`` the command runs unbound with the default environment.
+    """
+    env = None
+    preexec_fn = None
+    if cpus:
+        cpus = sorted(cpus)
+        env = dict(os.environ)
+        for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            env[var] = str(len(cpus))
+        if hasattr(os, "sched_setaffinity"):
+            def preexec_fn():
+                os.sched_setaffinity(0, cpus)
+    return subprocess.run(cmd, capture_output=True, text=True, cwd=cwd,
+                          env=env, preexec_fn=preexec_fn)
+
+
+def t_quantile_95(dof):
+    """Two-sided 95% quantile of Student's t distribution."""
+    try:
+        from scipy import stats
+        return float(stats.t.ppf(0.975, dof))
+    except ImportError:
+        return _T95[dof - 1] if dof <= len(_T95) else 1.96
+
+
+def summarize(values):
+    """Return ``(n, mean, std, ci_low, ci_high)`` of a list of samples.
+
+    ``std`` is the sample standard deviation and ``[ci_low, ci_high]`` the
+    95% confidence interval of the mean (Student's t); both are NaN for a
+    single sample.
+    """
+    values = [v for v in values if v is not None and not math.isnan(v)]
+    n = len(values)
+    if n == 0:
+        nan = float("nan")
+        return 0, nan, nan, nan, nan
+    mean = sum(values) / n
+    if n == 1:
+        return 1, mean, float("nan"), float("nan"), float("nan")
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    half = t_quantile_95(n - 1) * std / math.sqrt(n)
+    return n, mean, std, mean - half, mean + half
@@ -0,0 +1,33 @@
+# décodage bloc par bloc des snapshots raw (compressées ou non) d'un dossier,
+# pour mesurer le débit de décompression du côté ad-hoc
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import (is_bricked, iter_bricks, iter_snapshot_blocks,
+                                list_snapshots, read_header)
+
+if len(sys.argv) < 2:
+    print("Usage: python decode_snapshots.py <path_to_snapshot>")
+    sys.exit(1)
+
+files = list_snapshots(sys.argv[1])
+if len(files) == 0:
+    print("There is no file to work on")
+    sys.exit(1)
+
+t0 = time.time()
+nbytes = 0
+for file_snapshot in files:
+    header = read_header(file_snapshot)
+    blocks = iter_bricks if is_bricked(header) else iter_snapshot_blocks
+    for _, values in blocks(file_snapshot, header):
+        # octets stockés une fois décodés (les snapshots lossy sont lues en float64)
+        nbytes += values.size * np.dtype(header["dtype"]).itemsize
+t1 = time.time()
+
+print("Bytes: ", nbytes)
+print("Time: ", t1 - t0)
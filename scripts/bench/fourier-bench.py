@@ -1,40 +1,20 @@
 import subprocess
 import csv
+import os
+import sys
 from tabulate import tabulate
+from bench_utils import get_exec_stats, print_stderr
+
+# fourier.py est importé une seule fois: les runs ad-hoc ne paient plus le
+# démarrage de l'interpréteur ni l'import de numpy à chaque itération
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "stats"))
+import fourier
 
 
 nb_iter = 4
 sizes = [10,50, 100, 200]
 
 
-
-def printStderr(stderr):
-    # print lines except the kokkos line
-    err = stderr.replace("""Kokkos::Cuda::initialize WARNING: Cuda is allocating into UVMSpace by default
-                                  without setting CUDA_MANAGED_FORCE_DEVICE_ALLOC=1 or
-                                  setting CUDA_VISIBLE_DEVICES.
-                                  This could on multi GPU systems lead to severe performance"
-                                  penalties.""", "")
-    err = err.strip()
-    if len(err) > 0:
-        print(err)
-
-
-def getExecStats(subprocess_stdout):
-    outputPath = None
-    for line in subprocess_stdout.splitlines():
-        if line.startswith("Exec stats:"):
-            outputPath = line.split(':')[1].strip().strip('"')
-    
-    if not outputPath:
-        print("Stdout received:", subprocess_stdout) # Pour debug
-        raise ValueError("Chemin 'Exec stats' non trouvé dans la sortie standard.")
-
-    with open(outputPath, newline="\n") as f:
-        reader = csv.DictReader(f)
-        row = next(reader)
-    return row
-
 def run_insitu(size):
     result = subprocess.run(
         ["./build/bin/semproxy",  "--timemax", "1", "-o", "2", "--sismo-points", "inputPoint.txt", "--sismo-fourier", "--ex", str(size), "--ey",  str(size), "--ez",  str(size)],
@@ -42,8 +22,8 @@ def run_insitu(size):
         text=True          
     )
     if len(result.stderr) > 0:
-        printStderr(result.stderr)
-    row = getExecStats(result.stdout)
+        print_stderr(result.stderr)
+    row = get_exec_stats(result.stdout)
     insitu_time = float(row['fouriertime']) 
     return insitu_time
 
@@ -54,29 +34,14 @@ def run_adhoc(size):
         text=True          
     )
     if len(result.stderr) > 0:
-        printStderr(result.stderr)
-    statsExec = getExecStats(result.stdout)
-    # launch fourier python adhoc
-    with open('inputPoint.txt', 'r') as file:
-        content = file.read().split()
-    x, y, z = map(int, content)
-    result = subprocess.run(
-        ["python3", "scripts/stats/fourier.py", f"./data/sismos/{x}-{y}-{z}-sismo.txt"],
-        capture_output=True,
-        text=True          
-    )
-    # time to save snapshots
-    adhoc_time = float(statsExec['writesismotime'])
-    found = False
-    for line in result.stdout.splitlines():
-        if line.startswith("Time:"):
-            # time to compute histogram in python script
-            adhoc_time += float(line.split(':')[1].strip()) * 1e6
-            found = True 
-    print(result.stderr)
-    if not(found):
-        print("Did not find any time in stdout for python3 fourier.py")
-        print(result.stderr)
+        print_stderr(result.stderr)
+    statsExec = get_exec_stats(result.stdout)
+    # launch fourier python adhoc, on the traces of every receiver
+    times = fourier.run(["./data/sismos/sismo_gather.bin"], "./data/fourier/fourier_adhoc.csv")
+    print(f"[ad-hoc] load: {times['load'] * 1e3} ms, compute: {times['compute'] * 1e3} ms, "
+          f"write: {times['write'] * 1e3} ms")
+    # time to save sismos, then the python phases
+    adhoc_time = float(statsExec['writesismotime']) + sum(times.values()) * 1e6
     return adhoc_time
 
 
@@ -1,34 +1,12 @@
 import subprocess
-import csv
 from tabulate import tabulate
+from bench_utils import get_exec_stats, print_stderr
 
 
 nb_iter = 4
 sizes = [10,50, 100, 200]
 
 
-
-def printStderr(stderr):
-    # print lines except the kokkos line
-    err = stderr.replace("""Kokkos::Cuda::initialize WARNING: Cuda is allocating into UVMSpace by default
-                                  without setting CUDA_MANAGED_FORCE_DEVICE_ALLOC=1 or
-                                  setting CUDA_VISIBLE_DEVICES.
-                                  This could on multi GPU systems lead to severe performance"
-                                  penalties.""", "")
-    err = err.strip()
-    if len(err) > 0:
-        print(err)
-
-
-def getExecStats(subprocess_stdout):
-    for line in subprocess_stdout.splitlines():
-        if line.startswith("Exec stats:"):
-            outputPath = line.split(':')[1].strip()[1:-1]
-    with open(f"{outputPath}", newline="\n") as f:
-        reader = csv.DictReader(f)
-        row = next(reader)
-    return row
-
 def run_insitu(size):
     # Faire exécution insitu pendant laquelle on calcule les histogrammes
     # histoTime
@@ -39,8 +17,8 @@ def run_insitu(size):
         text=True          
     )
     if len(result.stderr) > 0:
-        printStderr(result.stderr)
-    row = getExecStats(result.stdout)
+        print_stderr(result.stderr)
+    row = get_exec_stats(result.stdout)
     insitu_time = float(row['histotime']) 
     return insitu_time
 
@@ -52,15 +30,15 @@ def run_adhoc(size):
         capture_output=True,
         text=True          
     )
-    printStderr(result.stderr)
-    statsExec = getExecStats(result.stdout)
+    print_stderr(result.stderr)
+    statsExec = get_exec_stats(result.stdout)
     # launch histo python adhoc
     result = subprocess.run(
         ["python3", "scripts/stats/histo.py", "/tmp/insitu/data/snapshot/"],
         capture_output=True,
         text=True          
     )
-    printStderr(result.stderr)
+    print_stderr(result.stderr)
     # time to save snapshots
     adhoc_time = float(statsExec['snapshottime'])
     found = False
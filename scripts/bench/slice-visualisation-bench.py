@@ -1,35 +1,12 @@
 import subprocess
-import csv
 from tabulate import tabulate
 import time
 import os
+from bench_utils import get_exec_stats, print_stderr
 
 nb_iter = 5
 sizes = [10,20, 30, 50, 75, 100, 200]
 
-# Fonction utilitaires
-def getExecStats(subprocess_stdout):
-    for line in subprocess_stdout.splitlines():
-        if line.startswith("Exec stats:"):
-            outputPath = line.split(':')[1].strip()[1:-1]
-    with open(f"{outputPath}", newline="\n") as f:
-        reader = csv.DictReader(f)
-        row = next(reader)
-    return row
-
-
-
-def printStderr(stderr):
-    # print lines except the kokkos line
-    err = stderr.replace("""Kokkos::Cuda::initialize WARNING: Cuda is allocating into UVMSpace by default
-                                  without setting CUDA_MANAGED_FORCE_DEVICE_ALLOC=1 or
-                                  setting CUDA_VISIBLE_DEVICES.
-                                  This could on multi GPU systems lead to severe performance"
-                                  penalties.""", "")
-    err = err.strip()
-    if len(err) > 0:
-        print(err)
-
 # Benchmark:
 # - adhoc basique (save snapshot + load snapshot + trouver la slice + la visualiser et la sauvegarder)
 # - adhoc avec snapshot de slice (save slice snapshot + load slice snapshot + la visualiser et la sauvegarder)
@@ -42,8 +19,8 @@ def run_adhoc_basic(size):
     capture_output=True,
     text=True
   )
-  printStderr(result.stderr)
-  statsExecCpp = getExecStats(result.stdout)
+  print_stderr(result.stderr)
+  statsExecCpp = get_exec_stats(result.stdout)
 
   # On lance la visualisation adhoc en python
   result = subprocess.run(
@@ -52,7 +29,7 @@ def run_adhoc_basic(size):
     capture_output=True,
     text=True
   )
-  printStderr(result.stderr)
+  print_stderr(result.stderr)
 
   total_time = float(statsExecCpp["snapshottime"])
 
@@ -72,8 +49,8 @@ def run_adhoc_slice(size):
     capture_output=True,
     text=True
   )
-  printStderr(result.stderr)
-  statsExecCpp = getExecStats(result.stdout)
+  print_stderr(result.stderr)
+  statsExecCpp = get_exec_stats(result.stdout)
 
   # On lance la visualisation adhoc en python
   result = subprocess.run(
@@ -82,7 +59,7 @@ def run_adhoc_slice(size):
     capture_output=True,
     text=True
   )
-  printStderr(result.stderr)
+  print_stderr(result.stderr)
 
   total_time = float(statsExecCpp["slicesnaptime"])
 
@@ -101,8 +78,8 @@ def run_insitu(size):
     capture_output=True,
     text=True
   )
-  printStderr(result.stderr)
-  statsExecCpp = getExecStats(result.stdout)
+  print_stderr(result.stderr)
+  statsExecCpp = get_exec_stats(result.stdout)
 
   total_time = float(statsExecCpp["slicesnaptime"])
   return total_time
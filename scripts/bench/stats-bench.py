@@ -1,10 +1,14 @@
 import subprocess
-import csv
 import time
 import os
 import glob
+import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import iter_snapshots, list_snapshots
+from bench_utils import get_exec_stats
+
 NB_ITER = 4
 SIZES = [10,20,30,40,50,75,100,200] 
 SEM_EXE = "./build/bin/semproxy"
@@ -22,34 +26,6 @@ def clean_snapshots():
             except OSError:
                 pass
 
-def get_exec_stats(stdout_output):
-    """Récupère la dernière ligne du CSV indiqué dans stdout"""
-    csv_path = None
-    for line in stdout_output.splitlines():
-        if "Exec stats:" in line:
-            parts = line.split(':', 1)
-            if len(parts) > 1:
-                raw_path = parts[1].strip().strip('"').strip("'")
-                
-                # Résolution du chemin
-                if os.path.exists(raw_path):
-                    csv_path = raw_path
-                elif os.path.exists(os.path.join("build/bin", raw_path)):
-                    csv_path = os.path.join("build/bin", raw_path)
-                elif os.path.exists(os.path.normpath(os.path.join("build/bin", raw_path))):
-                     csv_path = os.path.normpath(os.path.join("build/bin", raw_path))
-
-    if not csv_path:
-        return {}
-
-    try:
-        with open(csv_path, newline='') as f:
-            reader = csv.DictReader(f)
-            return next(reader)
-    except Exception as e:
-        print(f"  [Error] Erreur lecture CSV: {e}")
-        return {}
-
 def compute_stats_python_adhoc():
     """
     Simule le post-traitement 
@@ -57,20 +33,13 @@ def compute_stats_python_adhoc():
     """
     start_time = time.time()
     
-    files = glob.glob(os.path.join(SNAPSHOT_DIR, "*.bin"))
-    if not files:
+    if not list_snapshots(SNAPSHOT_DIR):
         return 0
 
-    for file_path in files:
-        try:
-            with open(file_path, 'r') as f:
-                data = f.read().split()
-                vals = [float(x) for x in data if x.strip()]
-                if vals:
-                    _ = min(vals)
-                    _ = max(vals)
-        except:
-            pass
+    for _, vals in iter_snapshots(SNAPSHOT_DIR):
+        if vals.size:
+            _ = vals.min()
+            _ = vals.max()
 
     end_time = time.time()
     return (end_time - start_time) * 1000 # conversion en ms
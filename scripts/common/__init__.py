@@ -0,0 +1 @@
+"""Helpers shared by the analysis, plot and benchmark scripts."""
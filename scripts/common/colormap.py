@@ -0,0 +1,88 @@
+"""Colour images of slices, the same as the in-situ ones.
+
+``to_rgb`` maps values to RGB with the lookup tables of
+``src/insitu/include/image_writer.h``: same anchors, same integer
+interpolation, same float32 normalisation, so that an image rendered here
+has exactly the colours of the ``ppm``/``png`` slices written by semproxy.
+``write_ppm`` and ``write_png`` write the array as it is, row 0 first.
+"""
+
+import functools
+import struct
+import zlib
+
+import numpy as np
+
+COLORMAPS = {
+    "blue-green": [(0, 0, 255), (0, 255, 0)],
+    "gray": [(0, 0, 0), (255, 255, 255)],
+    "viridis": [(68, 1, 84), (71, 45, 123), (59, 82, 139), (44, 114, 142),
+                (33, 145, 140), (40, 174, 128), (94, 201, 98), (173, 220, 48),
+                (253, 231, 37)],
+    "seismic": [(0, 0, 77), (0, 0, 255), (255, 255, 255), (255, 0, 0), (128, 0, 0)],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def colormap_table(name):
+    """The 256 colours of a colormap as a ``(256, 3)`` uint8 array."""
+    anchors = np.array(COLORMAPS[name], dtype=np.int64)
+    segments = len(anchors) - 1
+    i = np.arange(256)
+    k = np.minimum(i * segments // 255, segments - 1)
+    r = (i * segments - k * 255)[:, None]
+    table = (anchors[k] * (255 - r) + anchors[k + 1] * r + 127) // 255
+    table = table.astype(np.uint8)
+    table.flags.writeable = False
+    return table
+
+
+def to_rgb(values, colormap="blue-green", vmin=None, vmax=None):
+    """Map a 2D array to a ``(ny, nx, 3)`` uint8 image.
+
+    ``vmin`` and ``vmax`` default to the min and max of the array, as the
+    ``step`` image range of semproxy.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    vmin = np.float32(values.min() if vmin is None else vmin)
+    vmax = np.float32(values.max() if vmax is None else vmax)
+    scale = np.float32(255) / (vmax - vmin) if vmax > vmin else np.float32(0)
+    t = (values - vmin) * scale
+    with np.errstate(invalid="ignore"):
+        # NaN takes the first colour, like in semproxy
+        index = np.where(t >= 0, np.minimum(t, 255), 0).astype(np.uint8)
+    return colormap_table(colormap)[index]
+
+
+def write_ppm(path, rgb):
+    """Write an ``(ny, nx, 3)`` uint8 image as a binary PPM (P6)."""
+    height, width, _ = rgb.shape
+    with open(path, "wb") as f:
+        f.write(b"P6\n%d %d\n255\n" % (width, height))
+        f.write(np.ascontiguousarray(rgb, dtype=np.uint8).tobytes())
+
+
+def _png_chunk(kind, data):
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def write_png(path, rgb, level=1):
+    """Write an ``(ny, nx, 3)`` uint8 image as an RGB PNG."""
+    height, width, _ = rgb.shape
+    # every scanline starts with its filter type, 0 (none)
+    scanlines = np.zeros((height, 3 * width + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgb.reshape(height, 3 * width)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def write_image(path, rgb):
+    """Write ``rgb`` as a PNG or a PPM, from the extension of ``path``."""
+    if str(path).endswith(".png"):
+        write_png(path, rgb)
+    else:
+        write_ppm(path, rgb)
@@ -0,0 +1,69 @@
+"""Reader for the receiver gather file written by the SEM proxy.
+
+With ``--sismo-format gather`` (the default) every receiver trace goes to
+``data/sismos/sismo_gather.bin`` (see ``src/insitu/include/sismo_gather.h``):
+a header with the receiver count, the sample count, dt and the coordinates
+of every receiver, then one contiguous float32 matrix, one row per receiver.
+
+The matrix is memory-mapped, so reading a few receivers of a large gather
+only touches their rows::
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.sismo_gather import open_gather
+    gather = open_gather("data/sismos/sismo_gather.bin")
+    gather.traces[3]  # samples of receiver 3, at gather.receivers[3]
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+GATHER_MAGIC = b"SEMGATH\0"
+GATHER_FILENAME = "sismo_gather.bin"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("nb_receivers", "<u4"),
+    ("nb_samples", "<u4"),
+    ("dt", "<f8"),
+])
+
+# receivers: (nb_receivers, 3) float32 coordinates
+# traces: (nb_receivers, nb_samples) read-only float32 memmap
+Gather = namedtuple("Gather", ["receivers", "dt", "traces"])
+
+
+def is_gather(path):
+    """True if ``path`` is a gather file."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(GATHER_MAGIC)) == GATHER_MAGIC
+    except OSError:
+        return False
+
+
+def open_gather(path):
+    """Map the gather file ``path``, see :class:`Gather`."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header[0]["magic"] != GATHER_MAGIC.rstrip(b"\0"):
+        raise ValueError(f"{path} is not a gather file")
+    header = header[0]
+    nb_receivers = int(header["nb_receivers"])
+    nb_samples = int(header["nb_samples"])
+
+    receivers = np.fromfile(path, dtype="<f4", count=3 * nb_receivers,
+                            offset=HEADER_DTYPE.itemsize).reshape(nb_receivers, 3)
+    if nb_receivers * nb_samples == 0:
+        traces = np.empty((nb_receivers, nb_samples), dtype="<f4")
+    else:
+        traces = np.memmap(path, dtype="<f4", mode="r",
+                           offset=int(header["header_size"]),
+                           shape=(nb_receivers, nb_samples))
+    return Gather(receivers, float(header["dt"]), traces)
+
+
+def receiver_name(coords, sep="_"):
+    """``x_y_z`` name of a receiver, as in the spectrum files of semproxy."""
+    return sep.join(f"{float(c):g}" for c in coords)
@@ -0,0 +1,455 @@
+"""Readers for the files written by the SEM proxy.
+
+Snapshots (``SEMproxy::saveSnapshot``) and slice snapshots
+(``SEMproxy::saveSlices``) come in two formats, detected from the
+first bytes of the file:
+
+* raw (``--snapshot-format raw``, default): a 128 byte header
+  (see ``src/insitu/include/snapshot_format.h``) followed by float32 values.
+  These files are opened with ``numpy.memmap``; nothing is read until the
+  values are used, and a Z-plane is read by offset.
+
+  With ``--snapshot-compression lossless|lossy`` (header version 2, see
+  ``src/insitu/include/snapshot_codec.h``) the values are stored in blocks,
+  each one stored as is, byte-shuffled then zlib compressed, or quantized
+  then zlib compressed. ``iter_snapshot_blocks`` decodes them one block at a
+  time; the loaders below decode the whole file, except ``read_plane`` which
+  stops after the blocks of the plane. Lossy snapshots are decoded as
+  float64 (``values_dtype``): the tolerance bounds the error of these
+  values, rounding them to float32 may add up to half an ulp.
+
+  With ``--snapshot-brick N`` (header version 3) the box is cut in bricks of
+  N x N x N nodes, stored one after the other (each one compressed as a
+  block when a codec is set) behind an index of their offsets.
+  ``read_box`` and ``read_slice`` then read only the bricks holding the
+  requested nodes: an X, Y or Z slice, a sub-box, or every ``step``-th node
+  of it for a coarser level of detail. They also work, less cheaply, on the
+  other layouts.
+* text (``--snapshot-format text``): whitespace separated values, one X row
+  per line. The whole file is parsed in one vectorized call (``np.fromfile``
+  with a separator); a split-based path is only used when the fast path gives
+  up on a malformed file.
+
+Sismo traces are always text. Nodes are ordered x fastest then y then z, so a
+cube is returned with shape ``(nz, ny, nx)`` and a slice with ``(ny, nx)``.
+
+Usage from a script living in ``scripts/<dir>/``::
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.snapshot_io import iter_snapshots
+"""
+
+import glob
+import itertools
+import os
+import re
+import warnings
+import zlib
+
+import numpy as np
+
+SNAPSHOT_SUFFIX = ".bin"
+
+SNAPSHOT_MAGIC = b"SEMSNAP\0"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("dims", "<i4", 3),
+    ("origin", "<i4", 3),
+    ("grid_dims", "<i4", 3),
+    ("order", "<i4"),
+    ("timestep", "<i4"),
+    ("dtype", "S4"),
+    ("codec", "<u4"),
+    ("block_values", "<u4"),
+    ("tolerance", "<f8"),
+    ("brick_dims", "<i4", 3),
+    ("reserved", "u1", 36),
+])
+
+BLOCK_HEADER_DTYPE = np.dtype([("size", "<u4"), ("mode", "<u4")])
+
+CODEC_NONE = 0
+CODEC_SHUFFLE_ZLIB = 1
+CODEC_QUANTIZED = 2
+
+_NAME_RE = re.compile(r"_(\d+)_order(\d+)")
+
+
+def is_raw_snapshot(path):
+    """True if ``path`` starts with the raw snapshot magic."""
+    with open(path, "rb") as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def read_header(path):
+    """Return the header of a raw snapshot as a dict."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header["magic"][0] != SNAPSHOT_MAGIC.rstrip(b"\0"):
+        raise ValueError(f"{path} is not a raw snapshot")
+    header = header[0]
+    return {
+        "version": int(header["version"]),
+        "header_size": int(header["header_size"]),
+        "dims": tuple(int(v) for v in header["dims"]),
+        "origin": tuple(int(v) for v in header["origin"]),
+        "grid_dims": tuple(int(v) for v in header["grid_dims"]),
+        "order": int(header["order"]),
+        "timestep": int(header["timestep"]),
+        "dtype": header["dtype"].decode(),
+        "codec": int(header["codec"]),
+        "block_values": int(header["block_values"]),
+        "tolerance": float(header["tolerance"]),
+        "brick_dims": tuple(int(v) for v in header["brick_dims"]),
+    }
+
+
+def is_bricked(header):
+    return header["brick_dims"][0] > 0
+
+
+def values_dtype(header):
+    """Dtype of the values read from a raw snapshot: float64 for a lossy
+    one, whose tolerance only holds before rounding to float32, else the
+    stored dtype."""
+    if header["codec"] == CODEC_QUANTIZED:
+        return np.dtype(np.float64)
+    return np.dtype(header["dtype"])
+
+
+def _varints(data):
+    """Decode a uint8 array of LEB128 varints into uint64 values."""
+    ends = (data & 0x80) == 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    group = np.cumsum(np.concatenate(([0], ends[:-1]))).astype(np.int64)
+    shift = (7 * (np.arange(data.size) - starts[group])).astype(np.uint64)
+    values = (data & 0x7F).astype(np.uint64) << shift
+    # the 7 bit groups do not overlap, a sum is an or
+    return np.add.reduceat(values, starts)
+
+
+def _decode_block(mode, payload, tolerance):
+    if mode == CODEC_NONE:
+        return np.frombuffer(payload, dtype="<f4")
+    raw = np.frombuffer(zlib.decompress(payload), dtype=np.uint8)
+    if mode == CODEC_SHUFFLE_ZLIB:
+        return raw.reshape(4, raw.size // 4).T.copy().view("<f4").ravel()
+    if mode == CODEC_QUANTIZED:
+        zigzag = _varints(raw)
+        deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+        # float64: at most tolerance away, float32 could add half an ulp
+        return np.cumsum(deltas) * (2 * tolerance)
+    raise ValueError(f"Unknown snapshot block mode {mode}")
+
+
+def iter_snapshot_blocks(path, header=None, first=0, stop=None):
+    """Lazily yield ``(index, values)`` for the blocks of a raw snapshot.
+
+    ``index`` is the position of ``values[0]`` among all the values, in node
+    order. Only blocks holding values in ``[first, stop)`` are decoded, the
+    others are skipped; uncompressed snapshots are cut in blocks of 65536
+    values.
+    """
+    if header is None:
+        header = read_header(path)
+    if is_bricked(header):
+        raise ValueError(f"{path} is bricked, use iter_bricks")
+    count = int(np.prod(header["dims"]))
+    stop = count if stop is None else min(stop, count)
+    with open(path, "rb") as f:
+        f.seek(header["header_size"])
+        if header["codec"] == CODEC_NONE:
+            block = 1 << 16
+            f.seek(first // block * block * 4, os.SEEK_CUR)
+            for index in range(first // block * block, stop, block):
+                n = min(block, count - index)
+                yield index, np.frombuffer(f.read(n * 4), dtype=np.dtype(header["dtype"]))
+            return
+
+        block = header["block_values"]
+        for index in range(0, stop, block):
+            size, mode = np.frombuffer(f.read(BLOCK_HEADER_DTYPE.itemsize),
+                                       dtype=BLOCK_HEADER_DTYPE)[0]
+            if index + block <= first:
+                f.seek(int(size), os.SEEK_CUR)
+                continue
+            yield index, _decode_block(int(mode), f.read(int(size)), header["tolerance"])
+
+
+def _read_values(path, header, first=0, stop=None):
+    """Values ``[first, stop)`` of a compressed snapshot."""
+    parts = []
+    for index, values in iter_snapshot_blocks(path, header, first, stop):
+        lo = max(first - index, 0)
+        hi = len(values) if stop is None else min(stop - index, len(values))
+        parts.append(values[lo:hi])
+    if not parts:
+        return np.empty(0, dtype=values_dtype(header))
+    # the Stored blocks of a lossy snapshot are float32, the others float64
+    return np.concatenate(parts).astype(values_dtype(header), copy=False)
+
+
+def _brick_ranges(header, start, stop):
+    """Per axis (x, y, z), the bricks holding box nodes ``[start, stop)``."""
+    return [range(lo // b, (hi - 1) // b + 1) if hi > lo else range(0)
+            for lo, hi, b in zip(start, stop, header["brick_dims"])]
+
+
+def iter_bricks(path, header=None, start=(0, 0, 0), stop=None):
+    """Lazily yield ``(corner, values)`` for the bricks of a bricked snapshot.
+
+    ``corner`` is the ``(x, y, z)`` position of the first node of the brick
+    in the box and ``values`` the brick with shape ``(bz, by, bx)``. Only
+    the bricks holding box nodes ``[start, stop)`` are read.
+    """
+    if header is None:
+        header = read_header(path)
+    dims, brick = header["dims"], header["brick_dims"]
+    stop = dims if stop is None else stop
+    nb = [-(-d // b) for d, b in zip(dims, brick)]
+    with open(path, "rb") as f:
+        f.seek(header["header_size"])
+        offsets = np.fromfile(f, dtype="<u8", count=nb[0] * nb[1] * nb[2] + 1)
+        bx, by, bz = _brick_ranges(header, start, stop)
+        for k in bz:
+            for j in by:
+                for i in bx:
+                    b = (k * nb[1] + j) * nb[0] + i
+                    f.seek(int(offsets[b]))
+                    payload = f.read(int(offsets[b + 1] - offsets[b]))
+                    if header["codec"] == CODEC_NONE:
+                        values = np.frombuffer(payload, dtype=np.dtype(header["dtype"]))
+                    else:
+                        _, mode = np.frombuffer(payload[:BLOCK_HEADER_DTYPE.itemsize],
+                                                dtype=BLOCK_HEADER_DTYPE)[0]
+                        values = _decode_block(int(mode), payload[BLOCK_HEADER_DTYPE.itemsize:],
+                                               header["tolerance"])
+                    corner = (i * brick[0], j * brick[1], k * brick[2])
+                    shape = [min(b, d - c) for b, d, c in zip(brick, dims, corner)]
+                    yield corner, values.reshape(shape[::-1])
+
+
+def _strided(lo, hi, start, stop, step):
+    """Nodes ``start + n * step < stop`` of ``[lo, hi)``, as output and input
+    slices."""
+    hi = min(hi, stop)
+    first = start + -(-(max(lo, start) - start) // step) * step
+    if first >= hi:
+        return None, None
+    count = (hi - 1 - first) // step + 1
+    out = slice((first - start) // step, (first - start) // step + count)
+    return out, slice(first - lo, first - lo + (count - 1) * step + 1, step)
+
+
+def read_box(path, start, stop, step=1):
+    """Read the nodes ``start[d] + n * step[d] < stop[d]`` of a snapshot.
+
+    ``start`` and ``stop`` are ``(x, y, z)`` global grid indices and
+    ``step`` an int or a ``(x, y, z)`` tuple; the result has shape
+    ``(nz, ny, nx)``. Bricked snapshots only read the bricks holding these
+    nodes, contiguous raw ones only the Z-planes between ``start`` and
+    ``stop``; text snapshots are loaded whole.
+    """
+    step = (step,) * 3 if np.isscalar(step) else tuple(step)
+    if not is_raw_snapshot(path):
+        values = load_snapshot(path)
+        return np.array(values[start[2]:stop[2]:step[2], start[1]:stop[1]:step[1],
+                               start[0]:stop[0]:step[0]])
+
+    header = read_header(path)
+    start = [s - o for s, o in zip(start, header["origin"])]
+    stop = [min(s - o, d) for s, o, d in zip(stop, header["origin"], header["dims"])]
+    if any(lo < 0 or lo >= hi for lo, hi in zip(start, stop)):
+        raise ValueError(f"Empty or out of bounds box for {path}")
+    if not is_bricked(header):
+        nx, ny, _ = header["dims"]
+        if header["codec"] == CODEC_NONE:
+            planes = open_raw_snapshot(path, header)[start[2]:stop[2]]
+        else:
+            values = _read_values(path, header, start[2] * nx * ny, stop[2] * nx * ny)
+            planes = values.reshape(-1, ny, nx)
+        return np.array(planes[::step[2], start[1]:stop[1]:step[1],
+                               start[0]:stop[0]:step[0]])
+
+    shape = [-(-(hi - lo) // s) for lo, hi, s in zip(start, stop, step)]
+    out = np.empty(shape[::-1], dtype=values_dtype(header))
+    for corner, brick in iter_bricks(path, header, start, stop):
+        # brick axis order is z, y, x
+        ranges = [_strided(c, c + n, lo, hi, s) for c, n, lo, hi, s in
+                  zip(corner, brick.shape[::-1], start, stop, step)]
+        if any(r[0] is None for r in ranges):
+            continue
+        (ox, ix), (oy, iy), (oz, iz) = ranges
+        out[oz, oy, ox] = brick[iz, iy, ix]
+    return out
+
+
+def read_slice(path, axis, index, step=1):
+    """Read the slice ``axis == index`` (global grid index) of a cube snapshot.
+
+    ``axis`` is ``"x"``, ``"y"`` or ``"z"``; the result has shape
+    ``(ny, nx)``, ``(nz, nx)`` or ``(nz, ny)`` respectively.
+    """
+    d = "xyz".index(axis)
+    if is_raw_snapshot(path):
+        header = read_header(path)
+        lo, hi = list(header["origin"]), [o + n for o, n in zip(header["origin"], header["dims"])]
+    else:
+        lo, hi = [0, 0, 0], [np.iinfo(np.int32).max] * 3
+    lo[d], hi[d] = index, index + 1
+    return read_box(path, lo, hi, step).squeeze(axis=2 - d)
+
+
+def open_raw_snapshot(path, header=None):
+    """Memory-map the values of a raw snapshot with shape ``(nz, ny, nx)``.
+
+    A compressed or bricked snapshot is decoded in memory instead.
+    """
+    if header is None:
+        header = read_header(path)
+    nx, ny, nz = header["dims"]
+    if is_bricked(header):
+        origin = header["origin"]
+        return read_box(path, origin, [o + n for o, n in zip(origin, header["dims"])])
+    if header["codec"] != CODEC_NONE:
+        return _read_values(path, header).reshape(nz, ny, nx)
+    return np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r",
+                     offset=header["header_size"], shape=(nz, ny, nx))
+
+
+def _load_text_slow(path, dtype):
+    with open(path, "r") as f:
+        return np.array(f.read().split(), dtype=dtype)
+
+
+def load_text_values(path, dtype=np.float64):
+    """Return every value of a whitespace separated text file as a 1D array."""
+    with warnings.catch_warnings():
+        # numpy only warns (and stops early) when it meets a bad token
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromfile(path, dtype=dtype, sep=" ")
+        except (DeprecationWarning, ValueError):
+            pass
+    return _load_text_slow(path, dtype)
+
+
+def row_length(path):
+    """Number of values on the first line, i.e. ``nx`` for a snapshot."""
+    with open(path, "r") as f:
+        return len(f.readline().split())
+
+
+def parse_snapshot_name(path):
+    """Return ``(timestep, order)`` from ``snapshot_<t>_order<o>.bin``.
+
+    Either value is ``None`` when the name does not follow the convention.
+    """
+    match = _NAME_RE.search(os.path.basename(path))
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _cube_shape(values, nx):
+    """Guess ``(nz, ny, nx)`` for a cube snapshot, assuming ny == nz."""
+    if nx == 0 or values.size % nx != 0:
+        return None
+    rows = values.size // nx
+    side = int(round(np.sqrt(rows)))
+    if side * side != rows:
+        return None
+    return (side, side, nx)
+
+
+def load_snapshot(path, shape=None, dtype=np.float64):
+    """Load a full-cube snapshot.
+
+    ``shape`` is ``(nx, ny, nz)`` (the ``nb_nodes_`` order used by the proxy).
+    Without it the shape is inferred from the row length, assuming ny == nz;
+    if that fails the flat array is returned. Raw snapshots are returned as a
+    read-only float32 memmap and ignore ``shape`` and ``dtype``.
+    """
+    if is_raw_snapshot(path):
+        return open_raw_snapshot(path)
+    values = load_text_values(path, dtype)
+    if shape is not None:
+        nx, ny, nz = shape
+        return values.reshape(nz, ny, nx)
+    guess = _cube_shape(values, row_length(path))
+    return values if guess is None else values.reshape(guess)
+
+
+def load_slice_snapshot(path, shape=None, dtype=np.float64):
+    """Load a slice snapshot as a 2D array.
+
+    Z slices are returned as ``(ny, nx)``, Y slices as ``(nz, nx)`` and X
+    slices as ``(nz, ny)``. A text slice has one row per line.
+    """
+    if is_raw_snapshot(path):
+        header = read_header(path)
+        values = open_raw_snapshot(path, header)
+        # the fixed axis is the last one of a single node
+        fixed = max(d for d in range(3) if header["dims"][d] == 1)
+        return values.squeeze(axis=2 - fixed)
+    values = load_text_values(path, dtype)
+    if shape is not None:
+        nx, ny = shape[0], shape[1]
+    else:
+        nx = row_length(path)
+        ny = values.size // nx if nx else 0
+    return values.reshape(ny, nx)
+
+
+def read_plane(path, z, nx, ny, dtype=np.float64):
+    """Read the Z-plane ``z`` of a cube snapshot as a ``(ny, nx)`` array.
+
+    For raw snapshots only the plane is read, at its offset in the file
+    (``z`` is a global grid index). For text snapshots the lines before the
+    plane are skipped without being converted and reading stops right after.
+    """
+    if is_raw_snapshot(path):
+        header = read_header(path)
+        if is_bricked(header):
+            return read_slice(path, "z", z)
+        if header["codec"] != CODEC_NONE:
+            size = header["dims"][0] * header["dims"][1]
+            first = (z - header["origin"][2]) * size
+            return _read_values(path, header, first, first + size).reshape(ny, nx)
+        plane = open_raw_snapshot(path, header)[z - header["origin"][2]]
+        return np.array(plane)
+    with open(path, "r") as f:
+        lines = itertools.islice(f, ny * z, ny * (z + 1))
+        values = np.fromstring(" ".join(lines), dtype=dtype, sep=" ")
+    return values.reshape(ny, nx)
+
+
+def load_sismo(path, dtype=np.float64):
+    """Load one receiver trace (one line of samples)."""
+    return load_text_values(path, dtype)
+
+
+def list_snapshots(path, suffix=SNAPSHOT_SUFFIX):
+    """Files to process for ``path``: the file itself, or the matching files
+    of a directory sorted by timestep."""
+    if not os.path.isdir(path):
+        return [path]
+    files = glob.glob(os.path.join(path, "*" + suffix))
+
+    def key(name):
+        timestep, _ = parse_snapshot_name(name)
+        return (timestep if timestep is not None else -1, name)
+
+    return sorted(files, key=key)
+
+
+def iter_snapshots(path, loader=load_snapshot, suffix=SNAPSHOT_SUFFIX, **kwargs):
+    """Lazily yield ``(filename, array)`` for every snapshot under ``path``.
+
+    Only one file is held in memory at a time, so a directory with hundreds
+    of snapshots can be streamed through an analysis.
+    """
+    for filename in list_snapshots(path, suffix):
+        yield filename, loader(filename, **kwargs)
@@ -0,0 +1,61 @@
+"""Reader for the short-time spectra file written by the SEM proxy.
+
+With ``--sismo-stft`` the spectra of every receiver go to
+``data/fourier/stft_insitu.bin`` (see ``src/insitu/include/stft_writer.h``):
+a header with the receiver count, the bins per spectrum, the window and the
+hop, the coordinates of every receiver, then the frames, each one a
+(receivers, bins) complex64 matrix. Frame ``f`` starts at time sample
+``f * hop``.
+
+The frames are memory-mapped, and only the complete ones are mapped, so a
+file still being written can be read::
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.stft_io import open_stft
+    stft = open_stft("data/fourier/stft_insitu.bin")
+    abs(stft.spectra[:, 3])  # magnitudes of receiver 3, one row per frame
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+STFT_MAGIC = b"SEMSTFT\0"
+STFT_FILENAME = "stft_insitu.bin"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("nb_receivers", "<u4"),
+    ("nb_bins", "<u4"),
+    ("window", "<u4"),
+    ("hop", "<u4"),
+])
+
+# receivers: (nb_receivers, 3) float32 coordinates
+# spectra: (nb_frames, nb_receivers, nb_bins) read-only complex64 memmap
+STFT = namedtuple("STFT", ["receivers", "window", "hop", "spectra"])
+
+
+def open_stft(path):
+    """Map the STFT file ``path``, see :class:`STFT`."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header[0]["magic"] != STFT_MAGIC.rstrip(b"\0"):
+        raise ValueError(f"{path} is not an STFT file")
+    header = header[0]
+    nb_receivers = int(header["nb_receivers"])
+    nb_bins = int(header["nb_bins"])
+    header_size = int(header["header_size"])
+
+    receivers = np.fromfile(path, dtype="<f4", count=3 * nb_receivers,
+                            offset=HEADER_DTYPE.itemsize).reshape(nb_receivers, 3)
+    frame_size = nb_receivers * nb_bins * np.dtype("<c8").itemsize
+    nb_frames = (os.path.getsize(path) - header_size) // frame_size if frame_size else 0
+    if nb_frames == 0:
+        spectra = np.empty((0, nb_receivers, nb_bins), dtype="<c8")
+    else:
+        spectra = np.memmap(path, dtype="<c8", mode="r", offset=header_size,
+                            shape=(nb_frames, nb_receivers, nb_bins))
+    return STFT(receivers, int(header["window"]), int(header["hop"]), spectra)
@@ -0,0 +1,78 @@
+"""Reader for the time-series file written by the SEM proxy.
+
+``--stats-analysis`` and ``--timeseries`` append one row per recorded step to
+``data/stats/timeseries_order<o>.bin`` (see
+``src/insitu/include/timeseries.h``): a header with the column names, then
+blocks holding a row count followed by every column as float64. Values not
+computed at a step (the stats between two ``--stats-interval`` steps) are NaN.
+
+The file is read with a single ``np.fromfile`` call and each column is the
+concatenation of its block slices::
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.timeseries import load_timeseries_frame
+    df = load_timeseries_frame("data/stats/timeseries_order2.bin")
+"""
+
+import numpy as np
+
+TIMESERIES_MAGIC = b"SEMTSER\0"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("nb_columns", "<u4"),
+    ("block_rows", "<u4"),
+    ("reserved", "u1", 8),
+])
+
+
+def _parse_header(raw, path):
+    if raw.size < HEADER_DTYPE.itemsize or \
+            raw[:len(TIMESERIES_MAGIC)].tobytes() != TIMESERIES_MAGIC:
+        raise ValueError(f"{path} is not a time-series file")
+    header = raw[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    header_size = int(header["header_size"])
+    nb_columns = int(header["nb_columns"])
+    names = raw[HEADER_DTYPE.itemsize:header_size].tobytes().split(b"\0")
+    return header_size, [name.decode() for name in names[:nb_columns]]
+
+
+def load_timeseries(path, columns=None):
+    """Return ``{column: float64 array}`` for every (or the given) column.
+
+    A block cut short by a run that was killed is ignored.
+    """
+    raw = np.fromfile(path, dtype=np.uint8)
+    offset, names = _parse_header(raw, path)
+    wanted = names if columns is None else list(columns)
+    indices = [names.index(name) for name in wanted]
+
+    parts = {name: [] for name in wanted}
+    while offset + 8 <= raw.size:
+        nb_rows = int(raw[offset:offset + 8].view("<i8")[0])
+        size = nb_rows * len(names) * 8
+        if offset + 8 + size > raw.size:
+            break
+        block = raw[offset + 8:offset + 8 + size].view("<f8")
+        block = block.reshape(len(names), nb_rows)
+        for name, c in zip(wanted, indices):
+            parts[name].append(block[c])
+        offset += 8 + size
+
+    return {name: np.concatenate(parts[name]) if parts[name]
+            else np.empty(0) for name in wanted}
+
+
+def load_timeseries_frame(path, columns=None):
+    """Same as :func:`load_timeseries` as a pandas DataFrame indexed by
+    timestep."""
+    import pandas as pd
+
+    data = load_timeseries(path, columns)
+    df = pd.DataFrame(data)
+    if "timestep" in df:
+        df["timestep"] = df["timestep"].astype(np.int64)
+        df = df.set_index("timestep")
+    return df
@@ -1,6 +1,10 @@
 import numpy as np
 import re
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import load_snapshot
 
 
 filename = "../data/snapshot/snapshot_150_order2.txt" 
@@ -17,13 +21,7 @@ start_line = 1275
 Y_lines = 51
 
 
-data = []
-with open(filename, 'r') as f:
-    for i, line in enumerate(f):
-        row = [float(x) for x in line.strip().split()]
-        data.append(row)
-
-data_array = np.array(data)
+data_array = load_snapshot(filename)
 
 max_value = np.max(data_array)
 min_value = np.min(data_array)
@@ -1,22 +1,31 @@
 import matplotlib.pyplot as plt 
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.sismo_gather import is_gather, open_gather, receiver_name
+from common.snapshot_io import load_sismo
+
+# Avec un fichier gather, le second argument est l'indice du récepteur (0 par défaut)
 if len(sys.argv) < 2:
-    print("Usage: python script.py <nom_du_fichier>")
+    print("Usage: python script.py <nom_du_fichier> [indice_recepteur]")
     sys.exit(1)
 
 filename = sys.argv[1]
 
-with open(filename, 'r') as f:
-    content = f.read()  # lit tout le fichier dans une string
-
-content = content.strip()
-pressureValues = content.split(' ')
-pressureValues = list(map(float, pressureValues))
+if is_gather(filename):
+    gather = open_gather(filename)
+    receiver = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    pressureValues = gather.traces[receiver]
+    [x,y,z] = [float(c) for c in gather.receivers[receiver]]
+    plotName = f"plot-{receiver_name(gather.receivers[receiver], '-')}-sismo"
+else:
+    pressureValues = load_sismo(filename)
 
-coords = filename.split('/')[-1].rsplit('-', 1)[0]
-[x,y,z] = coords.split('-')
-[x,y,z] = [float(x), float(y), float(z)]
+    coords = filename.split('/')[-1].rsplit('-', 1)[0]
+    [x,y,z] = coords.split('-')
+    [x,y,z] = [float(x), float(y), float(z)]
+    plotName = f"plot-{filename.split('/')[-1].split('.')[0]}"
 
 print(f"{x} {y} {z}")
 
@@ -24,7 +33,7 @@ print(f"{x} {y} {z}")
 
 plt.plot(range(len(pressureValues)), pressureValues)
 plt.title(f"Receiver x:{x}, y:{y}, z:{z}")
-plt.savefig(f"plot-{filename.split('/')[-1].split('.')[0]}")
+plt.savefig(plotName)
 plt.show()
 
 
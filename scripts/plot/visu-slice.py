@@ -1,14 +1,15 @@
 import warnings
 
 warnings.filterwarnings("ignore", category=UserWarning)
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
 import argparse
 import time
-from matplotlib.colors import LinearSegmentedColormap
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.colormap import COLORMAPS, to_rgb, write_image
+from common.snapshot_io import list_snapshots, load_slice_snapshot, read_plane, read_slice
 
 
 # Script python permettant de visualiser une slice soit:
@@ -16,69 +17,108 @@ import os
 # - à partir d'une snapshot d'une slice directement
 
 # Fonctionne uniquement avec ex==ey==ez (le but de ce script étant le benchmark, cela simplifie les choses)
-# La dimension fixée est la dimension Z, on visualise le plan X-Y
+# La dimension fixée est Z par défaut (plan X-Y), --axis x|y fixe X (plan Y-Z) ou Y (plan X-Z).
+# Avec des snapshots en briques (--snapshot-brick) seules les briques du plan sont lues.
+
+# Avec --batch, pas de figure matplotlib: chaque slice passe par la table de couleurs de
+# common/colormap.py (mêmes couleurs que les images in-situ --slice-ppm) et est écrite
+# directement en PPM ou PNG, les fichiers étant répartis sur --jobs processus.
 
 
 # Si l'input donnée est un dossier, alors on fait la visualisation pour chaque fichier .bin (snapshot) du dossier
 # Sinon, uniquement pour le fichier donné en input.
 
-parser = argparse.ArgumentParser()
-parser.add_argument('-o', '--order')
-parser.add_argument('-z', help="The Z fixed coordinate")
-parser.add_argument('-s', '--size', help="Size of the problem, i.e ex value (ex==ey==ez)") # ex=ey=ez
-parser.add_argument('--slice-snapshot', help="If present, this flag means the snapshot is a slice snapshot and not a regular full-cube snapshot",
-                    action=argparse.BooleanOptionalAction)
-parser.add_argument('-i', '--input', help="Input path")
+def parse_args():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-o', '--order')
+  parser.add_argument('-z', '-c', '--coord', dest='z', help="The fixed coordinate (along --axis)")
+  parser.add_argument('--axis', choices=['x', 'y', 'z'], default='z', help="The fixed dimension (default z)")
+  parser.add_argument('-s', '--size', help="Size of the problem, i.e ex value (ex==ey==ez)") # ex=ey=ez
+  parser.add_argument('--slice-snapshot', help="If present, this flag means the snapshot is a slice snapshot and not a regular full-cube snapshot",
+                      action=argparse.BooleanOptionalAction)
+  parser.add_argument('-i', '--input', help="Input path")
+  parser.add_argument('--batch', action='store_true',
+                      help="Render with a colormap table instead of a seaborn heatmap, files in parallel")
+  parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="Processes of --batch")
+  parser.add_argument('--colormap', choices=sorted(COLORMAPS), default='blue-green', help="Colormap of --batch")
+  parser.add_argument('--image-format', choices=['ppm', 'png'], default='ppm', help="Image format of --batch")
+
+  args = parser.parse_args()
+  if args.slice_snapshot and args.axis != 'z':
+      parser.error("slice snapshots are Z-planes, --axis must be z")
+  return args
+
+
+def load_plane(singleFile, args, sizeDim):
+  if (args.slice_snapshot):
+      return load_slice_snapshot(singleFile, (sizeDim, sizeDim))
+  if args.axis == 'z':
+      # seul le plan Z est lu (offset, lignes ou briques selon le format)
+      return read_plane(singleFile, int(args.z), sizeDim, sizeDim)
+  # seules les briques du plan sont lues, le cube entier en texte
+  return read_slice(singleFile, args.axis, int(args.z))
+
+
+def output_path(singleFile, extension):
+  return f"/tmp/{ (singleFile.split('/'))[-1].split('.')[:-1][0]}--visu_slice.{extension}"
+
+
+def render_batch(singleFile, args, sizeDim):
+  data_array = load_plane(singleFile, args, sizeDim)
+  write_image(output_path(singleFile, args.image_format), to_rgb(data_array, args.colormap))
+
+
+def render_heatmap(files, args, sizeDim):
+  import matplotlib.pyplot as plt
+  import seaborn as sns
+  from matplotlib.colors import LinearSegmentedColormap
 
-args = parser.parse_args()
+  # axes du plan visualisé (horizontal, vertical)
+  xlabel, ylabel = {'x': ("Y", "Z"), 'y': ("X", "Z"), 'z': ("X", "Y")}[args.axis]
+  for singleFile in files:
+    data_array = load_plane(singleFile, args, sizeDim)
+    plt.figure(figsize=(6, 5))
 
+    colors = [(0, 0, 1), (0, 1, 0)]
+    cmap = LinearSegmentedColormap.from_list("my_cmap", colors)
+    sns.heatmap(data_array, cmap=cmap)
 
-size = int(args.size)
-order = int(args.order)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.savefig(output_path(singleFile, "png"))
+    plt.close()
 
-sizeDim = (size * order) + 1 # la taille d'une dimension
-sizePlan = sizeDim * sizeDim # la taille d'un plan
 
-startingLine = sizeDim * int(args.z)
-if (args.slice_snapshot):
-    startingLine = 0
+def main():
+  args = parse_args()
 
-if os.path.isdir(args.input):
-    files = []
-    for fName in os.listdir(args.input):
-        if fName.endswith('.bin'):
-            files.append(os.path.join(args.input, fName))
-else:
-    files = [args.input]
+  size = int(args.size)
+  order = int(args.order)
 
+  sizeDim = (size * order) + 1 # la taille d'une dimension
 
-t0 = time.time()
+  files = list_snapshots(args.input)
 
 
-for singleFile in files:
-  data = []
-  with open(singleFile, 'r') as f:
-      for i, line in enumerate(f):
-          if i < startingLine:
-              continue
-          if i >= startingLine + sizeDim:
-              break
-          row = [float(x) for x in line.strip().split()]
-          data.append(row)
+  t0 = time.time()
 
-  data_array = np.array(data)
-  plt.figure(figsize=(6, 5))
+  if args.batch:
+    jobs = max(1, min(args.jobs, len(files)))
+    if jobs == 1:
+      for singleFile in files:
+        render_batch(singleFile, args, sizeDim)
+    else:
+      with ProcessPoolExecutor(max_workers=jobs) as executor:
+        n = len(files)
+        list(executor.map(render_batch, files, [args] * n, [sizeDim] * n,
+                          chunksize=max(1, n // (4 * jobs))))
+  else:
+    render_heatmap(files, args, sizeDim)
 
-  colors = [(0, 0, 1), (0, 1, 0)] 
-  cmap = LinearSegmentedColormap.from_list("my_cmap", colors)
-  sns.heatmap(data_array, cmap=cmap)
+  t1 = time.time()
 
-  plt.xlabel("X")
-  plt.ylabel("Y")
-  outputPath = f"/tmp/{ (singleFile.split('/'))[-1].split('.')[:-1][0]}--visu_slice.png"
-  plt.savefig(outputPath)
-  plt.close()
+  print("Time: ", t1 - t0)
 
-t1 = time.time()
 
-print("Time: ", t1 - t0)
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,66 @@
+import glob
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.sismo_gather import GATHER_FILENAME, open_gather
+from common.snapshot_io import load_sismo
+
+# Compare les spectres calculés in-situ (--sismo-fourier) avec np.fft.fft
+# appliqué aux sismos écrits par une exécution sans --sismo-fourier
+# (fichier gather, ou un fichier texte par récepteur avec --sismo-format text).
+# Usage: python3 scripts/stats/compare_fourier.py [fourier_dir] [sismos_dir]
+fourier_dir = sys.argv[1] if len(sys.argv) > 1 else './data/fourier'
+sismos_dir = sys.argv[2] if len(sys.argv) > 2 else './data/sismos'
+
+# le CSV in-situ est écrit avec 6 chiffres significatifs
+rtol = 1e-5
+
+# traces du gather par coordonnées entières, comme les noms des fichiers texte
+gather_path = os.path.join(sismos_dir, GATHER_FILENAME)
+gather_traces = {}
+if os.path.exists(gather_path):
+    gather = open_gather(gather_path)
+    for coords, trace in zip(gather.receivers, gather.traces):
+        gather_traces[tuple(int(c) for c in coords)] = trace
+
+totalMismatchCount = 0
+nbCompared = 0
+
+for fourier_path in sorted(glob.glob(os.path.join(fourier_dir, 'fourier_insitu_*.csv'))):
+    coords = re.findall(r"[-+]?\d*\.\d+|[-+]?\d+", os.path.basename(fourier_path))
+    x, y, z = (int(float(c)) for c in coords[:3])
+    sismo_path = os.path.join(sismos_dir, f'{x}-{y}-{z}-sismo.txt')
+    if (x, y, z) in gather_traces:
+        data = np.asarray(gather_traces[(x, y, z)], dtype=np.float64)
+    elif os.path.exists(sismo_path):
+        data = load_sismo(sismo_path)
+    else:
+        print(f"[{x},{y},{z}] # No sismo {sismo_path}, skipped")
+        continue
+
+    insitu = pd.read_csv(fourier_path)
+    reference = np.fft.fft(data)[:len(data) // 2]
+
+    if len(insitu) != len(reference):
+        print(f"[{x},{y},{z}] # Length differs: python={len(reference)}, insitu={len(insitu)}")
+        totalMismatchCount += 1
+        continue
+
+    # tolérance relative au pic du spectre, les petits coefficients
+    # n'ont pas assez de chiffres dans le CSV pour une erreur relative
+    scale = max(np.abs(reference).max(), np.finfo(float).tiny)
+    for column, values in (('real', reference.real), ('imag', reference.imag),
+                           ('magnitude', np.abs(reference))):
+        error = np.abs(insitu[column].to_numpy() - values) / scale
+        for k in np.flatnonzero(error > rtol):
+            print(f"[{x},{y},{z}] # Diff in {column}[{k}]: {error[k]}, "
+                  f"python={values[k]}, insitu={insitu[column][k]}")
+            totalMismatchCount += 1
+    nbCompared += 1
+
+print(f"==> {nbCompared} receivers compared, {totalMismatchCount} total mismatch between numpy and insitu")
@@ -1,38 +1,94 @@
+import glob
+import os
+import sys
+
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import load_snapshot, parse_snapshot_name
+
+# Compare les histogrammes calculés in-situ (--compute-histogram) avec numpy
+# sur les snapshots écrits aux mêmes pas de temps. Tous les modes sont gérés:
+# bins linéaires ou log (--histogram-log), range step/fixed/learned et
+# histogramme cumulé (--histogram-cumulative).
+# Usage: python3 scripts/stats/compare_histo.py [histo_dir] [snapshot_dir]
+histo_dir = sys.argv[1] if len(sys.argv) > 1 else './data/histo'
+snapshot_dir = sys.argv[2] if len(sys.argv) > 2 else './data/snapshot'
+
+
+def read_histo(path):
+    with open(path, 'r') as f:
+        lines = f.read().strip().split('\n')
+    edges = np.array(list(map(float, lines[1].split())))
+    hist = np.array(list(map(int, lines[3].split())))
+    # les anciens fichiers n'ont que les edges et les counts
+    scale = lines[5].strip() if len(lines) > 5 else 'linear'
+    hist_range = lines[7].strip() if len(lines) > 7 else 'step'
+    return edges, hist, scale, hist_range
+
+
+def ambiguous_counts(values, edges, scale):
+    """Nombre de valeurs si proches d'un bord de bin (précision float32)
+    que le bin choisi in-situ et par numpy peut différer."""
+    x, xe = values, edges
+    if scale == 'log':
+        x, xe = np.log10(values[values > 0]), np.log10(edges)
+    tol = 8 * np.finfo(np.float32).eps * (np.abs(xe).max() + (xe[-1] - xe[0]))
+    per_edge = np.array([np.count_nonzero(np.abs(x - e) <= tol) for e in xe])
+    return per_edge[:-1] + per_edge[1:]
+
+
 totalMismatchCount = 0
+nbCompared = 0
+sums = {}
+
+for histo_path in sorted(glob.glob(os.path.join(histo_dir, 'histo_*_order*.bin'))):
+    step, order = parse_snapshot_name(histo_path)
+    if step is None:
+        continue  # histo_cumulative_order<o>.bin, vérifié plus bas
+    edges, histValues, scale, hist_range = read_histo(histo_path)
+    key = (order, scale, hist_range, tuple(edges) if hist_range != 'step' else None)
+    sums.setdefault(key, np.zeros_like(histValues))
+    sums[key] += histValues
 
-for step in range(50,1500,50): # on skip la snapshot remplie de 0
-    snapshot_path = f'./data/snapshot/snapshot_{step}_order2.bin'
-    histo_path = f'./data/histo/histo_{step}_order2.bin'
-    data = []
-    with open(snapshot_path, 'r') as f:
-        content = f.read()
-    content.strip()
-    lines = content.split('\n')
-    for l in lines:
-        vals = l.strip().split(' ')
-        vals = list(map(float, vals))
-        data.extend(vals)
-
-    hist, bin_edges = np.histogram(data, bins=10) 
-
-    # comparer avec l'histogramme que j'ai compute moi
-    with open(histo_path, 'r') as f:
-        content = f.read()
-    content.strip()
-    lines = content.split('\n')
-    edgesValues = list(map(float, lines[1].strip().split(' ')))
-    histValues = list(map(int, lines[3].strip().split(' ')))
+    snapshot_path = os.path.join(snapshot_dir, f'snapshot_{step}_order{order}.bin')
+    if not os.path.exists(snapshot_path):
+        continue
+    data = np.asarray(load_snapshot(snapshot_path), dtype=np.float64).ravel()
+    values = np.abs(data) if scale == 'log' else data
 
+    # numpy avec les mêmes bords de bins (hors range: non compté)
+    hist, _ = np.histogram(values, bins=edges)
+    allowed = ambiguous_counts(values, edges, scale)
     for i in range(len(hist)):
         diff = abs(hist[i] - histValues[i])
-        if diff > 1e-5:
+        if diff > allowed[i]:
             print(f"[{step}] # Diff in hist[{i}]: {diff}, python={hist[i]}, insitu={histValues[i]}")
-            totalMismatchCount+=1
-    for i in range(len(hist)):
-        diff = abs(edgesValues[i] - bin_edges[i])
-        if diff > 1e-5:
-            print(f"[{step}] # Diff in edges[{i}]: {diff}, python={bin_edges[i]}, insitu={edgesValues[i]}")
-            totalMismatchCount+=1
-print(f"==> {totalMismatchCount} total mismatch between numpy and insitu")
+            totalMismatchCount += 1
+
+    # range step: les bords doivent être ceux de np.histogram sur le min/max
+    # (sauf champ constant, numpy élargit alors le range de ±0.5)
+    if hist_range == 'step' and scale == 'linear' and data.min() < data.max():
+        _, bin_edges = np.histogram(data, bins=len(histValues))
+        for i in range(len(bin_edges)):
+            diff = abs(edges[i] - bin_edges[i])
+            if diff > 1e-5 * max(1.0, abs(bin_edges[i])):
+                print(f"[{step}] # Diff in edges[{i}]: {diff}, python={bin_edges[i]}, insitu={edges[i]}")
+                totalMismatchCount += 1
+    nbCompared += 1
+
+# l'histogramme cumulé doit être la somme des histogrammes de chaque pas
+for cumulative_path in sorted(glob.glob(os.path.join(histo_dir, 'histo_cumulative_order*.bin'))):
+    edges, histValues, scale, hist_range = read_histo(cumulative_path)
+    order = int(cumulative_path.rsplit('order', 1)[1].split('.')[0])
+    expected = sums.get((order, scale, hist_range, tuple(edges)))
+    if expected is None:
+        print(f"[cumulative] # No step histogram with the same bins as {cumulative_path}")
+        totalMismatchCount += 1
+        continue
+    for i in np.flatnonzero(expected != histValues):
+        print(f"[cumulative] # Diff in hist[{i}]: sum of steps={expected[i]}, insitu={histValues[i]}")
+        totalMismatchCount += 1
+    nbCompared += 1
+
+print(f"==> {nbCompared} histograms compared, {totalMismatchCount} total mismatch between numpy and insitu")
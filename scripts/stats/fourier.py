@@ -1,64 +1,138 @@
-import numpy as np
-import pandas as pd
-import sys
+import argparse
+import glob
 import os
-import re
+import sys
 import time
 
+import numpy as np
+import pandas as pd
 
-def process_single_file(filepath, dt=0.001):
-    if not os.path.exists(filepath):
-        print(f"Erreur : Le fichier '{filepath}' est introuvable.")
-        return
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.sismo_gather import GATHER_FILENAME, is_gather, open_gather
+from common.snapshot_io import load_sismo
 
-    filename = os.path.basename(filepath)
+# Spectres ad-hoc des traces des récepteurs, tous les récepteurs d'un coup.
+# Usage: python3 fourier.py <entrée>... [-o data/fourier/fourier_adhoc.csv]
+# Une entrée est un fichier gather (--sismo-format gather), un fichier texte
+# x-y-z-sismo.txt, un dossier (son gather, sinon ses fichiers texte) ou un glob.
+# Les traces sont rassemblées dans une matrice (récepteurs x échantillons),
+# transformées par un seul np.fft.rfft, et écrites dans un seul fichier:
+# CSV (x,y,z,freq_idx,magnitude,real,imag) ou .npz avec les mêmes colonnes.
+# Comme l'in-situ, on ne garde que les n // 2 premières fréquences.
+# Les temps de lecture, de calcul et d'écriture sont affichés séparément.
 
-    coords = re.findall(r"[-+]?\d*\.\d+|\d+", filename)
-    
-    if len(coords) >= 3:
-        x, y, z = coords[0], coords[1], coords[2]
-    else:
-        x, y, z = "unknown", "unknown", "unknown"
+SISMO_SUFFIX = "-sismo.txt"
 
+
+def list_traces(inputs):
+    """Fichiers de traces des entrées, dans l'ordre."""
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            gather = os.path.join(entry, GATHER_FILENAME)
+            if os.path.exists(gather):
+                paths.append(gather)
+            else:
+                paths += sorted(glob.glob(os.path.join(entry, "*" + SISMO_SUFFIX)))
+        elif os.path.exists(entry):
+            paths.append(entry)
+        else:
+            paths += sorted(glob.glob(entry))
+    return paths
+
+
+def text_coords(path):
+    """Coordonnées x, y, z lues dans le nom x-y-z-sismo.txt (NaN sinon)."""
+    name = os.path.basename(path)
+    if not name.endswith(SISMO_SUFFIX):
+        return [np.nan] * 3
+    coords = name[: -len(SISMO_SUFFIX)].split("-", 2)
     try:
-        with open(filepath, 'r') as f:
-            data = np.fromstring(f.read(), sep=' ')
-        
-        if data.size == 0:
-            print(f"Le fichier {filename} est vide.")
-            return
-
-        n = len(data)
-        fourier_raw = np.fft.fft(data)
-        half_n = n // 2
-        
-        results = []
-        for k in range(half_n):
-            val_complex = fourier_raw[k]
-            results.append({
-                "freq_idx": k,
-                "magnitude": np.abs(val_complex),
-                "real": val_complex.real,
-                "imag": val_complex.imag
-            })
-
-        output_csv = f"./data/fourier/fourier_adhoc_{x}_{y}_{z}.csv"
-        df = pd.DataFrame(results)
-        df.to_csv(output_csv, index=False)
-        
-        print(f"Analyse terminée pour le point ({x}, {y}, {z})")
-        print(f"Résultat sauvegardé dans : {output_csv}")
-
-    except Exception as e:
-        print(f"Erreur lors du traitement : {e}")
+        return [float(c) for c in coords] if len(coords) == 3 else [np.nan] * 3
+    except ValueError:
+        return [np.nan] * 3
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 adhoc_single_fourier.py <chemin_du_fichier> [dt]")
+
+def load_traces(paths):
+    """Coordonnées (n, 3) et traces (n, échantillons) de tous les récepteurs."""
+    receivers = []
+    traces = []
+    for path in paths:
+        if is_gather(path):
+            gather = open_gather(path)
+            receivers.append(np.asarray(gather.receivers, dtype=np.float64))
+            traces.append(np.asarray(gather.traces, dtype=np.float64))
+        else:
+            receivers.append(np.array([text_coords(path)]))
+            traces.append(load_sismo(path)[None, :])
+
+    if not traces:
+        return np.empty((0, 3)), np.empty((0, 0))
+    lengths = {t.shape[1] for t in traces}
+    if len(lengths) > 1:
+        raise ValueError(f"Les traces n'ont pas toutes la même longueur: {sorted(lengths)}")
+    return np.concatenate(receivers), np.concatenate(traces)
+
+
+def compute_spectra(traces):
+    """Les n // 2 premiers coefficients de Fourier de chaque trace."""
+    half_n = traces.shape[1] // 2
+    return np.fft.rfft(traces, axis=1)[:, :half_n]
+
+
+def spectra_columns(receivers, spectra):
+    """Colonnes du résultat, une ligne par (récepteur, fréquence)."""
+    nb_receivers, nb_freqs = spectra.shape
+    return {
+        "x": np.repeat(receivers[:, 0], nb_freqs),
+        "y": np.repeat(receivers[:, 1], nb_freqs),
+        "z": np.repeat(receivers[:, 2], nb_freqs),
+        "freq_idx": np.tile(np.arange(nb_freqs), nb_receivers),
+        "magnitude": np.abs(spectra).ravel(),
+        "real": spectra.real.ravel(),
+        "imag": spectra.imag.ravel(),
+    }
+
+
+def write_spectra(output, receivers, spectra):
+    columns = spectra_columns(receivers, spectra)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    if output.endswith(".npz"):
+        np.savez(output, **columns)
     else:
-        file_path = sys.argv[1]
-        delta_t = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
-        t0 = time.time()
-        process_single_file(file_path, delta_t)
-        t1 = time.time()
-        print("Time: ", t1 - t0)
+        pd.DataFrame(columns).to_csv(output, index=False)
+
+
+def run(inputs, output):
+    """Spectres de toutes les traces de inputs dans output.
+
+    Retourne les temps (s) de chaque phase: load, compute, write.
+    """
+    t0 = time.perf_counter()
+    receivers, traces = load_traces(list_traces(inputs))
+    t1 = time.perf_counter()
+    spectra = compute_spectra(traces)
+    t2 = time.perf_counter()
+    write_spectra(output, receivers, spectra)
+    t3 = time.perf_counter()
+    print(f"Analyse terminée pour {len(spectra)} récepteurs, résultat dans : {output}")
+    return {"load": t1 - t0, "compute": t2 - t1, "write": t3 - t2}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+",
+                        help="Gather files, sismo text files, directories or globs")
+    parser.add_argument("-o", "--output", default="./data/fourier/fourier_adhoc.csv",
+                        help="Combined output, .csv or .npz")
+    args = parser.parse_args()
+
+    times = run(args.inputs, args.output)
+    print("Load time: ", times["load"])
+    print("Compute time: ", times["compute"])
+    print("Write time: ", times["write"])
+    print("Time: ", sum(times.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ import time
 import numpy as np
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import iter_snapshots, list_snapshots
+
 if len(sys.argv) < 2:
     print("Usage: python histo.py <path_to_snapshot>")
     print("Could be path to a single snapshot or to a folder containing all snapshots for an execution")
@@ -14,13 +17,7 @@ filename = sys.argv[1]
 
 # On peut passer un folder en paramètre, et cela calculera une moyenne de toutes les snapshots
 # contenues dans ce folder
-if os.path.isdir(filename):
-    files = []
-    for fName in os.listdir(filename):
-        if fName.endswith('.bin'):
-            files.append(os.path.join(filename, fName))
-else:
-    files = [filename]
+files = list_snapshots(filename)
 
 print("On calcule l'histogramme pour ces fichiers:")
 print(files)
@@ -32,16 +29,8 @@ if len(files) == 0:
 # data = []
 t0 = time.time()
 
-for file_snapshot in files:
-    data = []
-    with open(file_snapshot, 'r') as f:
-        content = f.read()
-    content.strip()
-    lines = content.split('\n')
-    for l in lines:
-        vals = l.strip().split(' ')
-        vals = list(map(float, vals))
-        data.extend(vals)
+# une snapshot à la fois en mémoire
+for file_snapshot, data in iter_snapshots(filename):
     hist, bin_edges = np.histogram(data, bins=10) 
 
 
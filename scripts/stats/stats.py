@@ -0,0 +1,39 @@
+# statistiques de la pression (moyenne, variance, min, max, norme L2) sur des snapshots,
+# équivalent ad-hoc de --stats-analysis
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot_io import iter_snapshots, list_snapshots, parse_snapshot_name
+
+if len(sys.argv) < 2:
+    print("Usage: python stats.py <path_to_snapshot>")
+    print("Could be path to a single snapshot or to a folder containing all snapshots for an execution")
+    sys.exit(1)
+
+filename = sys.argv[1]
+
+files = list_snapshots(filename)
+if len(files) == 0:
+    print("There is no file to work on")
+    sys.exit(1)
+
+t0 = time.time()
+
+rows = []
+# une snapshot à la fois en mémoire
+for file_snapshot, data in iter_snapshots(filename):
+    values = np.asarray(data, dtype=np.float64)
+    timestep, _ = parse_snapshot_name(file_snapshot)
+    rows.append((timestep, values.mean(), values.var(), values.min(), values.max(),
+                 np.sqrt(np.dot(values.ravel(), values.ravel()))))
+
+t1 = time.time()
+
+print("timestep,mean,variance,min,max,l2norm")
+for row in rows:
+    print(",".join(str(v) for v in row))
+print("Time: ", t1 - t0)
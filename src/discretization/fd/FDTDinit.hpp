@@ -3,6 +3,10 @@
 
 #include <utils.h>
 
+#include <algorithm>
+#include <stdexcept>
+#include <string>
+
 #include "FDTDutils.hpp"
 
 struct FDTDInit
@@ -28,6 +32,13 @@ struct FDTDInit
   int i2 = 1;
 
   bool saveSnapShots = false;
+  // snapshots: steps between two snapshots, box {x0, x1, y0, y1, z0, z1}
+  // of nodes [x0, x1) x [y0, y1) x [z0, z1) (default the y = ny / 2 plane)
+  // and directory of the files
+  int snapshotInterval = 50;
+  int snapshotBox[6];
+  bool snapshotBoxSet = false;
+  std::string snapshotDir = ".";
   bool usePML = false;
 
   vectorReal RHSTerm;
@@ -142,6 +153,25 @@ struct FDTDInit
           saveSnapShots = true;
           i = i + 1;
         }
+        if (arg == "-snapshotinterval")
+        {
+          snapshotInterval = atoi(argv[i + 1]);
+          i = i + 2;
+        }
+        if (arg == "-snapshotbox")
+        {
+          for (int d = 0; d < 6; d++)
+          {
+            snapshotBox[d] = atoi(argv[i + 1 + d]);
+          }
+          snapshotBoxSet = true;
+          i = i + 7;
+        }
+        if (arg == "-snapshotdir")
+        {
+          snapshotDir = argv[i + 1];
+          i = i + 2;
+        }
 
         //  use PML
         if (arg == "-usePML")
@@ -157,6 +187,9 @@ struct FDTDInit
           "usage fd_exe -nx XXX -ny YYY -nz ZZZZ -lx LX -ly LY -lz LZ -dx DX "
           "-dy DY -dz DZ  ");
       printf("-xs XS -ys YS -zs ZS -savesnapshots (false) -usePML (false) \n ");
+      printf(
+          "-snapshotinterval N (50) -snapshotbox X0 X1 Y0 Y1 Z0 Z1 (y=ny/2) "
+          "-snapshotdir DIR (.) \n ");
       printf("if no argument running with default values\n");
     }
 
@@ -164,6 +197,21 @@ struct FDTDInit
            myGrids.nz);
     printf("Source location: xs=%d, ys=%d, zs=%d\n", myGrids.xs, myGrids.ys,
            myGrids.zs);
+    if (!snapshotBoxSet)
+    {
+      const int plane[6] = {0, myGrids.nx, myGrids.ny / 2, myGrids.ny / 2 + 1,
+                            0, myGrids.nz};
+      std::copy(plane, plane + 6, snapshotBox);
+    }
+    if (saveSnapShots)
+    {
+      if (snapshotInterval < 1)
+        throw std::invalid_argument("Snapshot interval must be at least 1");
+      printf(
+          "Snapshots every %d steps: x=[%d %d[, y=[%d %d[, z=[%d %d[ in %s\n",
+          snapshotInterval, snapshotBox[0], snapshotBox[1], snapshotBox[2],
+          snapshotBox[3], snapshotBox[4], snapshotBox[5], snapshotDir.c_str());
+    }
     float lambdamax = vmin / fmax;
 
     // init pml limits
@@ -0,0 +1,83 @@
+#ifndef FDTDSNAPSHOT_HPP
+#define FDTDSNAPSHOT_HPP
+
+#include <snapshot_format.h>
+#include <snapshot_writer.h>
+
+#include <cerrno>
+#include <cstring>
+#include <filesystem>
+#include <iostream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "FDTDdata.hpp"
+
+// Snapshots of a box of the FD grid. The nodes of the box are packed x
+// fastest into one buffer (on the device with Kokkos, then one copy to the
+// host) and written in one call after a SnapshotHeader (snapshot_format.h),
+// so scripts/common/snapshot_io.py reads them like the SEM raw snapshots.
+struct FDTDSnapshot
+{
+  // box = {x0, x1, y0, y1, z0, z1}: nodes [x0, x1) x [y0, y1) x [z0, z1)
+  FDTDSnapshot(FDTDGRIDS &myGrids, const int box[6], const std::string &dir)
+      : dir_(dir)
+  {
+    const int gridDims[3] = {myGrids.nx, myGrids.ny, myGrids.nz};
+    int origin[3];
+    int dims[3];
+    for (int d = 0; d < 3; d++)
+    {
+      if (box[2 * d] < 0 || box[2 * d] >= box[2 * d + 1] ||
+          box[2 * d + 1] > gridDims[d])
+        throw std::invalid_argument(
+            "Snapshot box must be a non empty box of the grid, got " +
+            std::to_string(box[2 * d]) + " " + std::to_string(box[2 * d + 1]) +
+            " on axis " + std::to_string(d));
+      origin[d] = box[2 * d];
+      dims[d] = box[2 * d + 1] - box[2 * d];
+    }
+    header_ = insitu::makeSnapshotHeader(gridDims, origin, dims, 0, 0);
+
+    nodes_.reserve(header_.count());
+    for (int k = box[4]; k < box[5]; ++k)
+    {
+      for (int j = box[2]; j < box[3]; ++j)
+      {
+        for (int i = box[0]; i < box[1]; ++i)
+        {
+          nodes_.push_back(IDX3_l(i, j, k));
+        }
+      }
+    }
+    values_.resize(nodes_.size());
+
+    if (!dir_.empty()) std::filesystem::create_directories(dir_);
+  }
+
+  // write dir/snapshot_it_<istep>.H@ from column i1 of pnGlobal
+  void write(arrayReal const &pnGlobal, int istep, const int &i1)
+  {
+    // the box never changes, its nodes are sent to the device once
+    gather_.gather(pnGlobal, i1, nodes_, 1, values_.data());
+
+    header_.timestep = istep;
+    const std::filesystem::path filename =
+        dir_ / ("snapshot_it_" + std::to_string(istep) + ".H@");
+    if (!insitu::writeRawSnapshot(filename, header_, values_.data()))
+    {
+      std::cerr << "Error writing snapshot " << filename << ": "
+                << std::strerror(errno) << std::endl;
+    }
+  }
+
+ private:
+  std::filesystem::path dir_;
+  insitu::SnapshotHeader header_;
+  std::vector<size_t> nodes_;
+  std::vector<float> values_;
+  insitu::FieldGather<arrayReal> gather_;
+};
+
+#endif  // FDTDSNAPSHOT_HPP
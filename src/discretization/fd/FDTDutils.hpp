@@ -209,46 +209,14 @@ struct FDTDUtils
         y1 + 1, y2, y3 + 1, y4, y5 + 1, y6, z1 + 1, z2, z3 + 1, z4, z5 + 1, z6);
   }
 
-  void output(FDTDGRIDS &myGrids, arrayReal const &pnGlobal, int itSample,
-              const int &i1, const bool saveSnapShots)
+  void printSource(FDTDGRIDS &myGrids, arrayReal const &pnGlobal, int itSample,
+                   const int &i1)
   {
-    if (itSample % 50 == 0)
-    {
-      FDFENCE
-
-      printf("TimeStep=%d\t; Pressure value at source [%d %d %d] = %f\n",
-             itSample, myGrids.xs, myGrids.ys, myGrids.zs,
-             pnGlobal(IDX3_l(myGrids.xs, myGrids.ys, myGrids.zs), i1));
-      // #ifdef FD_SAVE_SNAPSHOTS
-      if (saveSnapShots)
-        write_io(myGrids, 0, myGrids.nx, myGrids.ny / 2, myGrids.ny / 2, 0,
-                 myGrids.nz, pnGlobal, itSample, i1);
-      // #endif
-    }
-  }
+    FDFENCE
 
-  void write_io(FDTDGRIDS &myGrids, int x0, int x1, int y0, int y1, int z0,
-                int z1, arrayReal const &pnGlobal, int istep, const int &i1)
-  {
-    char filename_buf[32];
-    snprintf(filename_buf, sizeof(filename_buf), "snapshot_it_%d.H@", istep);
-    FILE *snapshot_file = fopen(filename_buf, "wb");
-    // printf("write snapshot for: x=[%d %d], y=[%d %d], z=[%d
-    // %d]\n",x0,x1,y0,y1,z0,z1);
-
-    for (int k = z0; k < z1; ++k)
-    {
-      for (int j = y0; j < y1 + 1; ++j)
-      {
-        for (int i = x0; i < x1; ++i)
-        {
-          fwrite(&pnGlobal(IDX3_l(i, j, k), i1), sizeof(float), 1,
-                 snapshot_file);
-        }
-      }
-    }
-    // Clean up
-    fclose(snapshot_file);
+    printf("TimeStep=%d\t; Pressure value at source [%d %d %d] = %f\n",
+           itSample, myGrids.xs, myGrids.ys, myGrids.zs,
+           pnGlobal(IDX3_l(myGrids.xs, myGrids.ys, myGrids.zs), i1));
   }
 };
 
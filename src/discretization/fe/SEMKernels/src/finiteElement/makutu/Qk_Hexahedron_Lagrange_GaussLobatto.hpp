@@ -492,6 +492,28 @@ public:
   static void computeStiffnessTerm( real_t const (&X)[8][3],
                                     FUNC && func );
 
+  /**
+   * @brief computes the matrix B of every quadrature point of an element, see computeBMatrix.
+   *   The mesh being fixed, they can be computed once and given to computeStiffnessTermFromB.
+   * @param X Array containing the coordinates of the support points.
+   * @param B Array to store the matrices B, B[q] being the one of the quadrature point q
+   *   (linear index of qa, qb, qc), in Voigt notation
+   */
+  PROXY_HOST_DEVICE
+  static void computeBMatrices( real_t const (&X)[8][3],
+                                real_t ( &B )[numQuadraturePoints][6] );
+
+  /**
+   * @brief same as computeStiffnessTerm, the matrices B being precomputed by computeBMatrices.
+   * @param B Callback function accepting two parameters: the quadrature point q and the
+   *   Voigt index c (0 to 5), and returning the component c of the matrix B of q
+   * @param func Callback function accepting three parameters: i, j and R_ij
+   */
+  template< typename BMATRIX, typename FUNC >
+  PROXY_HOST_DEVICE
+  static void computeStiffnessTermFromB( BMATRIX && B,
+                                         FUNC && func );
+
 /**
  * @brief Computes the "Grad(Phi)*B*Grad(Phi)" coefficient of the stiffness term. The matrix B must be provided and Phi denotes a basis
  * function.
@@ -1101,6 +1123,42 @@ computeStiffnessTerm( real_t const (&X)[8][3],
    });
 }
 
+template< typename GL_BASIS >
+PROXY_HOST_DEVICE
+void
+Qk_Hexahedron_Lagrange_GaussLobatto< GL_BASIS >::
+computeBMatrices( real_t const (&X)[8][3],
+                  real_t ( &B )[numQuadraturePoints][6] )
+{
+   triple_loop<num1dNodes,num1dNodes,num1dNodes>([&](auto const icqa, auto const icqb, auto const icqc)
+   {
+      constexpr int qa = decltype(icqa)::value;
+      constexpr int qb = decltype(icqb)::value;
+      constexpr int qc = decltype(icqc)::value;
+      real_t J[3][3] = {{0}};
+      computeBMatrix( qa, qb, qc, X, J, B[linearIndex3DVal( qa, qb, qc )] );
+   });
+}
+
+template< typename GL_BASIS >
+template< typename BMATRIX, typename FUNC >
+PROXY_HOST_DEVICE
+void
+Qk_Hexahedron_Lagrange_GaussLobatto< GL_BASIS >::
+computeStiffnessTermFromB( BMATRIX && B,
+                           FUNC && func )
+{
+   triple_loop<num1dNodes,num1dNodes,num1dNodes>([&](auto const icqa, auto const icqb, auto const icqc)
+   {
+      constexpr int qa = decltype(icqa)::value;
+      constexpr int qb = decltype(icqb)::value;
+      constexpr int qc = decltype(icqc)::value;
+      constexpr int q = linearIndex3DVal( qa, qb, qc );
+      real_t const Bq[6] = { B( q, 0 ), B( q, 1 ), B( q, 2 ), B( q, 3 ), B( q, 4 ), B( q, 5 ) };
+      computeGradPhiBGradPhi<num1dNodes,qa,qb,qc>(Bq, func );
+   });
+}
+
 template< typename GL_BASIS >
 template< typename FUNC1, typename FUNC2 >
 PROXY_HOST_DEVICE
@@ -0,0 +1,222 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  analysis_pipeline.h: in-situ analyses run by one driver on a schedule
+//
+//  Each analysis registers a name, the steps it runs at and a consumer.
+//  At every step the driver hands one StepField to the consumers due at
+//  that step, in their registration order. The StepField stages the field
+//  on the host and reduces its stats on first use only, so that every
+//  consumer of the step shares the same copy and the same stats. The time
+//  spent in each consumer (staging and reduction included for the first
+//  one asking for them) is accumulated under its name, and each run is a
+//  region of the profiler under the same name.
+//************************************************************************
+
+#ifndef ANALYSIS_PIPELINE_HPP_
+#define ANALYSIS_PIPELINE_HPP_
+
+#include <field_reduction.h>
+#include <profiler.h>
+
+#include <chrono>
+#include <functional>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Steps of an analysis: every interval steps from first.
+ */
+struct Schedule
+{
+  int interval = 0;  ///< steps between two runs, 0 for never
+  int first = 0;     ///< first step
+
+  bool due(int step) const
+  {
+    return interval > 0 && step >= first && (step - first) % interval == 0;
+  }
+};
+
+/**
+ * @brief The field of one step, as seen by the analyses due at it.
+ */
+class StepField
+{
+ public:
+  /// Copy the field to the buffer, count values ordered x fastest.
+  using Stage = std::function<void(std::vector<float>&)>;
+  /// Stats of the field, computed where it lives.
+  using Reduce = std::function<FieldStats()>;
+
+  /**
+   * @param stage how to stage the field, empty if no analysis reads values()
+   * @param reduce how to reduce the field, empty to reduce the staged copy
+   */
+  StepField(size_t count, Stage stage, Reduce reduce = {})
+      : count_(count), stage_(std::move(stage)), reduce_(std::move(reduce))
+  {
+  }
+
+  int timestep() const { return timestep_; }
+  size_t size() const { return count_; }
+
+  /// Field staged on the host, copied by the first call of the step.
+  const std::vector<float>& values()
+  {
+    if (!staged_)
+    {
+      if (!stage_)
+        throw std::logic_error("StepField has no stage, values() is unusable");
+      buffer_.resize(count_);
+      stage_(buffer_);
+      staged_ = true;
+    }
+    return buffer_;
+  }
+  /// True once values() has been called at this step.
+  bool staged() const { return staged_; }
+
+  /// Stats of the field, reduced by the first call of the step.
+  const FieldStats& stats()
+  {
+    if (!hasStats_)
+    {
+      setStats(reduce_ ? reduce_() : reduceValues(values().data(), count_));
+    }
+    return stats_;
+  }
+  /// Stats an analysis computed on its own pass over the field.
+  void setStats(const FieldStats& stats)
+  {
+    stats_ = stats;
+    hasStats_ = true;
+  }
+
+  /// Start a new step, dropping the copy and the stats of the previous one.
+  void reset(int timestep)
+  {
+    timestep_ = timestep;
+    staged_ = false;
+    hasStats_ = false;
+  }
+
+ private:
+  size_t count_;
+  Stage stage_;
+  Reduce reduce_;
+  int timestep_ = -1;
+  std::vector<float> buffer_;
+  bool staged_ = false;
+  FieldStats stats_;
+  bool hasStats_ = false;
+};
+
+/**
+ * @brief Run the registered analyses at the steps they are due.
+ */
+class AnalysisPipeline
+{
+ public:
+  using Consumer = std::function<void(StepField&)>;
+  /// True if the analysis runs at this step.
+  using Due = std::function<bool(int timestep)>;
+
+  explicit AnalysisPipeline(StepField field) : field_(std::move(field)) {}
+
+  /**
+   * @brief Register an analysis, run after the ones registered before.
+   * @param name reported with its time, e.g. snapshot for snapshottime
+   */
+  void add(const std::string& name, Due due, Consumer consumer)
+  {
+    for (const Entry& entry : entries_)
+    {
+      if (entry.name == name)
+        throw std::invalid_argument("Analysis " + name +
+                                    " is already registered");
+    }
+    entries_.push_back({name,
+                        std::move(due),
+                        std::move(consumer),
+                        {},
+                        -1,
+                        Profiler::instance().regionId(name)});
+  }
+
+  void add(const std::string& name, Schedule schedule, Consumer consumer)
+  {
+    add(
+        name, [schedule](int timestep) { return schedule.due(timestep); },
+        std::move(consumer));
+  }
+
+  /**
+   * @brief Run the analyses due at timestep.
+   * @return the number of analyses run
+   */
+  int run(int timestep)
+  {
+    field_.reset(timestep);
+    int ran = 0;
+    for (Entry& entry : entries_)
+    {
+      if (!entry.due(timestep)) continue;
+      const auto start = std::chrono::steady_clock::now();
+      {
+        ProfileRegion region(entry.region);
+        entry.consumer(field_);
+      }
+      entry.time += std::chrono::steady_clock::now() - start;
+      entry.lastStep = timestep;
+      ran++;
+    }
+    return ran;
+  }
+
+  /// Names and total times (microseconds) of the analyses, in order.
+  std::vector<std::pair<std::string, double>> timings() const
+  {
+    std::vector<std::pair<std::string, double>> result;
+    for (const Entry& entry : entries_)
+    {
+      result.emplace_back(
+          entry.name,
+          std::chrono::duration<double, std::micro>(entry.time).count());
+    }
+    return result;
+  }
+
+  /// True if the analysis ran at the step of the last run().
+  bool ran(const std::string& name) const
+  {
+    for (const Entry& entry : entries_)
+    {
+      if (entry.name == name) return entry.lastStep == field_.timestep();
+    }
+    return false;
+  }
+
+ private:
+  struct Entry
+  {
+    std::string name;
+    Due due;
+    Consumer consumer;
+    std::chrono::steady_clock::duration time;
+    int lastStep;
+    int region;  ///< id of the analysis in the profiler
+  };
+
+  StepField field_;
+  std::vector<Entry> entries_;
+};
+
+}  // namespace insitu
+
+#endif  // ANALYSIS_PIPELINE_HPP_
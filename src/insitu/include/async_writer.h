@@ -0,0 +1,159 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  async_writer.h: background thread running in-situ output jobs
+//
+//  The time loop copies what an output needs into one of a fixed number
+//  of staging buffers and queues a job working on that copy. The queue is
+//  bounded by the number of buffers: when all of them are in use the time
+//  loop waits (backpressure) and the waiting time is accounted as stall.
+//************************************************************************
+
+#ifndef ASYNC_WRITER_HPP_
+#define ASYNC_WRITER_HPP_
+
+#include <chrono>
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <mutex>
+#include <stdexcept>
+#include <thread>
+#include <utility>
+#include <vector>
+
+namespace insitu
+{
+
+class AsyncWriter
+{
+ public:
+  /// A job reads the staging buffer it was submitted with.
+  using Job = std::function<void(const std::vector<float>&)>;
+
+  /**
+   * @brief Start the writer thread.
+   * @param depth Number of staging buffers, i.e. how many outputs may be
+   *              in flight before the time loop has to wait (2 = double
+   *              buffering).
+   */
+  explicit AsyncWriter(int depth = 2) : buffers_(depth)
+  {
+    if (depth < 1)
+      throw std::invalid_argument("AsyncWriter depth must be >= 1");
+    for (int i = 0; i < depth; i++) freeBuffers_.push_back(i);
+    worker_ = std::thread(&AsyncWriter::workerLoop, this);
+  }
+
+  AsyncWriter(const AsyncWriter&) = delete;
+  AsyncWriter& operator=(const AsyncWriter&) = delete;
+
+  /**
+   * @brief Wait for pending jobs and stop the thread.
+   */
+  ~AsyncWriter()
+  {
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      stop_ = true;
+    }
+    jobAvailable_.notify_one();
+    worker_.join();
+  }
+
+  /**
+   * @brief Get a staging buffer of count values to fill before submit().
+   *
+   * Blocks while every buffer is owned by a queued or running job.
+   */
+  std::vector<float>& acquire(size_t count)
+  {
+    auto start = std::chrono::steady_clock::now();
+    std::unique_lock<std::mutex> lock(mutex_);
+    bufferFreed_.wait(lock, [this] { return !freeBuffers_.empty(); });
+    stall_ += std::chrono::steady_clock::now() - start;
+
+    acquired_ = freeBuffers_.front();
+    freeBuffers_.pop_front();
+    std::vector<float>& buffer = buffers_[acquired_];
+    buffer.resize(count);
+    return buffer;
+  }
+
+  /**
+   * @brief Queue a job on the buffer returned by the last acquire().
+   */
+  void submit(Job job)
+  {
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (acquired_ < 0)
+        throw std::logic_error("AsyncWriter::submit called before acquire");
+      pending_.emplace_back(acquired_, std::move(job));
+      acquired_ = -1;
+    }
+    jobAvailable_.notify_one();
+  }
+
+  /**
+   * @brief Block until every submitted job has completed.
+   */
+  void drain()
+  {
+    auto start = std::chrono::steady_clock::now();
+    std::unique_lock<std::mutex> lock(mutex_);
+    bufferFreed_.wait(lock, [this] {
+      return freeBuffers_.size() + (acquired_ >= 0 ? 1 : 0) == buffers_.size();
+    });
+    stall_ += std::chrono::steady_clock::now() - start;
+  }
+
+  /**
+   * @brief Total time the caller spent blocked in acquire() and drain().
+   */
+  float stallMicroseconds() const
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return std::chrono::duration<float, std::micro>(stall_).count();
+  }
+
+ private:
+  void workerLoop()
+  {
+    while (true)
+    {
+      std::pair<int, Job> job;
+      {
+        std::unique_lock<std::mutex> lock(mutex_);
+        jobAvailable_.wait(lock, [this] { return stop_ || !pending_.empty(); });
+        if (pending_.empty()) return;  // stop_ and nothing left to do
+        job = std::move(pending_.front());
+        pending_.pop_front();
+      }
+
+      job.second(buffers_[job.first]);
+
+      {
+        std::lock_guard<std::mutex> lock(mutex_);
+        freeBuffers_.push_back(job.first);
+      }
+      bufferFreed_.notify_all();
+    }
+  }
+
+  std::vector<std::vector<float>> buffers_;
+  std::deque<int> freeBuffers_;
+  std::deque<std::pair<int, Job>> pending_;
+  int acquired_ = -1;
+  bool stop_ = false;
+  std::chrono::steady_clock::duration stall_{0};
+
+  mutable std::mutex mutex_;
+  std::condition_variable jobAvailable_;
+  std::condition_variable bufferFreed_;
+  std::thread worker_;
+};
+
+}  // namespace insitu
+
+#endif  // ASYNC_WRITER_HPP_
@@ -0,0 +1,323 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  fft.h: fast Fourier transforms for the in-situ analyses
+//
+//  FFTPlan is a mixed radix (4, 2, 3, 5, 7) Stockham transform; lengths
+//  with a larger prime factor go through Bluestein's algorithm on top of a
+//  power of two plan. RealFFTPlan transforms real signals with a complex
+//  transform of half the length. Plans hold every twiddle factor, so one
+//  plan is built per length and reused for all the signals.
+//************************************************************************
+
+#ifndef FFT_HPP_
+#define FFT_HPP_
+
+#include <algorithm>
+#include <cmath>
+#include <complex>
+#include <memory>
+#include <stdexcept>
+#include <vector>
+
+namespace insitu
+{
+
+using Complex = std::complex<double>;
+
+/**
+ * @brief Forward complex FFT of a fixed length,
+ *        X[k] = sum_n x[n] exp(-2 i pi k n / N).
+ */
+class FFTPlan
+{
+ public:
+  /// Largest radix of the Stockham stages, larger primes use Bluestein.
+  static constexpr int kMaxRadix = 7;
+
+  explicit FFTPlan(int n) : n_(n)
+  {
+    if (n < 1) throw std::invalid_argument("FFT length must be >= 1");
+
+    int rest = n;
+    for (int p : {4, 2, 3, 5, 7})
+    {
+      while (rest % p == 0)
+      {
+        radices_.push_back(p);
+        rest /= p;
+      }
+    }
+
+    if (rest != 1)
+    {
+      initBluestein();
+      return;
+    }
+
+    const double PI = std::acos(-1.0);
+    twiddles_.resize(n);
+    for (int j = 0; j < n; j++)
+    {
+      twiddles_[j] = std::polar(1.0, -2.0 * PI * j / n);
+    }
+    work_.resize(n);
+  }
+
+  int size() const { return n_; }
+
+  /// True if the length has a prime factor larger than kMaxRadix.
+  bool usesBluestein() const { return static_cast<bool>(inner_); }
+
+  /**
+   * @brief In-place forward transform of n values.
+   */
+  void forward(Complex* data)
+  {
+    if (inner_)
+      bluestein(data);
+    else
+      stockham(data);
+  }
+
+ private:
+  // Stockham autosort, decimation in frequency: each stage splits the
+  // current sub-transforms of length len into p interleaved ones of length
+  // len / p and the output comes out in natural order.
+  void stockham(Complex* data)
+  {
+    Complex* x = data;
+    Complex* y = work_.data();
+    int len = n_;
+    int stride = 1;
+    for (int p : radices_)
+    {
+      const int m = len / p;
+      const int step = n_ / len;  // twiddle of the stage is w_N^(step * .)
+      if (p == 2)
+        radix2(x, y, m, stride, step);
+      else if (p == 4)
+        radix4(x, y, m, stride, step);
+      else
+        radixGeneric(x, y, p, m, stride, step);
+      len = m;
+      stride *= p;
+      std::swap(x, y);
+    }
+    if (x != data) std::copy(x, x + n_, data);
+  }
+
+  void radix2(const Complex* x, Complex* y, int m, int s, int step) const
+  {
+    for (int q = 0; q < m; q++)
+    {
+      const Complex w = twiddles_[q * step];
+      for (int k = 0; k < s; k++)
+      {
+        const Complex a = x[k + s * q];
+        const Complex b = x[k + s * (q + m)];
+        y[k + s * (2 * q)] = a + b;
+        y[k + s * (2 * q + 1)] = (a - b) * w;
+      }
+    }
+  }
+
+  void radix4(const Complex* x, Complex* y, int m, int s, int step) const
+  {
+    for (int q = 0; q < m; q++)
+    {
+      const Complex w1 = twiddles_[q * step];
+      const Complex w2 = twiddles_[2 * q * step];
+      const Complex w3 = twiddles_[3 * q * step];
+      for (int k = 0; k < s; k++)
+      {
+        const Complex a0 = x[k + s * q];
+        const Complex a1 = x[k + s * (q + m)];
+        const Complex a2 = x[k + s * (q + 2 * m)];
+        const Complex a3 = x[k + s * (q + 3 * m)];
+        const Complex t0 = a0 + a2;
+        const Complex t1 = a0 - a2;
+        const Complex t2 = a1 + a3;
+        // -i * (a1 - a3)
+        const Complex t3(a1.imag() - a3.imag(), a3.real() - a1.real());
+        y[k + s * (4 * q)] = t0 + t2;
+        y[k + s * (4 * q + 1)] = (t1 + t3) * w1;
+        y[k + s * (4 * q + 2)] = (t0 - t2) * w2;
+        y[k + s * (4 * q + 3)] = (t1 - t3) * w3;
+      }
+    }
+  }
+
+  void radixGeneric(const Complex* x, Complex* y, int p, int m, int s,
+                    int step) const
+  {
+    const int rootStep = n_ / p;  // w_p = w_N^(N / p)
+    Complex a[kMaxRadix];
+    for (int q = 0; q < m; q++)
+    {
+      for (int k = 0; k < s; k++)
+      {
+        for (int r = 0; r < p; r++) a[r] = x[k + s * (q + r * m)];
+        for (int t = 0; t < p; t++)
+        {
+          Complex sum = a[0];
+          for (int r = 1; r < p; r++)
+          {
+            sum += a[r] * twiddles_[((r * t) % p) * rootStep];
+          }
+          y[k + s * (p * q + t)] = sum * twiddles_[(q * t * step) % n_];
+        }
+      }
+    }
+  }
+
+  // Bluestein: X[k] = c[k] * sum_j (x[j] c[j]) conj(c[k - j]) with the chirp
+  // c[j] = exp(-i pi j^2 / N), the convolution being done with power of two
+  // FFTs of length >= 2N - 1.
+  void initBluestein()
+  {
+    radices_.clear();
+    int m = 1;
+    while (m < 2 * n_ - 1) m *= 2;
+    inner_ = std::make_unique<FFTPlan>(m);
+
+    const double PI = std::acos(-1.0);
+    chirp_.resize(n_);
+    for (int j = 0; j < n_; j++)
+    {
+      // j^2 mod 2N keeps the angle small for long signals
+      const long long j2 = (static_cast<long long>(j) * j) % (2LL * n_);
+      chirp_[j] = std::polar(1.0, -PI * j2 / n_);
+    }
+
+    chirpSpectrum_.assign(m, Complex(0.0, 0.0));
+    chirpSpectrum_[0] = std::conj(chirp_[0]);
+    for (int j = 1; j < n_; j++)
+    {
+      chirpSpectrum_[j] = std::conj(chirp_[j]);
+      chirpSpectrum_[m - j] = std::conj(chirp_[j]);
+    }
+    inner_->forward(chirpSpectrum_.data());
+    work_.resize(m);
+  }
+
+  void bluestein(Complex* data)
+  {
+    const int m = inner_->size();
+    for (int j = 0; j < n_; j++) work_[j] = data[j] * chirp_[j];
+    std::fill(work_.begin() + n_, work_.end(), Complex(0.0, 0.0));
+
+    inner_->forward(work_.data());
+    // inverse transform as conj(FFT(conj(.))) / m
+    for (int j = 0; j < m; j++)
+    {
+      work_[j] = std::conj(work_[j] * chirpSpectrum_[j]);
+    }
+    inner_->forward(work_.data());
+
+    const double scale = 1.0 / m;
+    for (int k = 0; k < n_; k++)
+    {
+      data[k] = std::conj(work_[k]) * scale * chirp_[k];
+    }
+  }
+
+  int n_;
+  std::vector<int> radices_;
+  std::vector<Complex> twiddles_;
+  std::vector<Complex> work_;
+
+  // Bluestein only
+  std::unique_ptr<FFTPlan> inner_;
+  std::vector<Complex> chirp_;
+  std::vector<Complex> chirpSpectrum_;
+};
+
+/**
+ * @brief Forward FFT of real signals of a fixed length.
+ *
+ * Only the n / 2 + 1 first bins are computed, the others being their
+ * complex conjugates. For even lengths the signal is packed into n / 2
+ * complex values (even samples as real part, odd samples as imaginary
+ * part) and the spectrum is rebuilt after a half length transform.
+ */
+class RealFFTPlan
+{
+ public:
+  explicit RealFFTPlan(int n) : n_(n), half_(n % 2 == 0 ? n / 2 : n)
+  {
+    if (n % 2 == 0)
+    {
+      const double PI = std::acos(-1.0);
+      split_.resize(n / 2 + 1);
+      for (int k = 0; k <= n / 2; k++)
+      {
+        split_[k] = std::polar(1.0, -2.0 * PI * k / n);
+      }
+    }
+    packed_.resize(half_.size());
+  }
+
+  int size() const { return n_; }
+
+  /// Number of bins written by forward().
+  int spectrumSize() const { return n_ / 2 + 1; }
+
+  /**
+   * @brief Transform n real samples into spectrumSize() bins.
+   */
+  template <typename T>
+  void forward(const T* signal, Complex* spectrum)
+  {
+    if (n_ % 2 != 0)
+    {
+      for (int j = 0; j < n_; j++) packed_[j] = Complex(signal[j], 0.0);
+      half_.forward(packed_.data());
+      std::copy(packed_.begin(), packed_.begin() + spectrumSize(), spectrum);
+      return;
+    }
+
+    const int h = n_ / 2;
+    for (int j = 0; j < h; j++)
+    {
+      packed_[j] = Complex(signal[2 * j], signal[2 * j + 1]);
+    }
+    half_.forward(packed_.data());
+
+    for (int k = 0; k <= h; k++)
+    {
+      const Complex z = packed_[k % h];
+      const Complex zc = std::conj(packed_[(h - k) % h]);
+      const Complex even = 0.5 * (z + zc);
+      const Complex diff = 0.5 * (z - zc);
+      const Complex odd(diff.imag(), -diff.real());  // -i * diff
+      spectrum[k] = even + split_[k] * odd;
+    }
+  }
+
+  /**
+   * @brief Transform count signals stored one after the other.
+   *
+   * Signal i starts at signals + i * n and its bins are written at
+   * spectra + i * spectrumSize().
+   */
+  template <typename T>
+  void forwardBatch(const T* signals, int count, Complex* spectra)
+  {
+    for (int i = 0; i < count; i++)
+    {
+      forward(signals + static_cast<size_t>(i) * n_,
+              spectra + static_cast<size_t>(i) * spectrumSize());
+    }
+  }
+
+ private:
+  int n_;
+  FFTPlan half_;
+  std::vector<Complex> split_;
+  std::vector<Complex> packed_;
+};
+
+}  // namespace insitu
+
+#endif  // FFT_HPP_
@@ -0,0 +1,193 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  field_reduction.h: one pass statistics and histogram of a field
+//
+//  Every thread (Kokkos or OpenMP) accumulates its own FieldStats with
+//  Welford's update and its own histogram; the partial results are merged
+//  at the end (Chan's formula for the moments, a sum for the bins).
+//************************************************************************
+
+#ifndef FIELD_REDUCTION_HPP_
+#define FIELD_REDUCTION_HPP_
+
+#include <common_macros.h>
+#include <histogram.h>
+
+#include <cmath>
+#include <vector>
+
+#if defined(USE_KOKKOS)
+#include <Kokkos_Core.hpp>
+#include <Kokkos_ScatterView.hpp>
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Running moments, extrema and norm of a set of values.
+ */
+struct FieldStats
+{
+  double count = 0;
+  double mean = 0;
+  double m2 = 0;  ///< sum of squared deviations from the mean
+  double sumSquares = 0;
+  double min = HUGE_VAL;
+  double max = -HUGE_VAL;
+
+  PROXY_HOST_DEVICE void add(double value)
+  {
+    count += 1;
+    const double delta = value - mean;
+    mean += delta / count;
+    m2 += delta * (value - mean);
+    sumSquares += value * value;
+    min = value < min ? value : min;
+    max = value > max ? value : max;
+  }
+
+  /// Merge the stats of another set of values.
+  PROXY_HOST_DEVICE FieldStats& operator+=(const FieldStats& other)
+  {
+    if (other.count == 0) return *this;
+    if (count == 0)
+    {
+      *this = other;
+      return *this;
+    }
+    const double total = count + other.count;
+    const double delta = other.mean - mean;
+    mean += delta * other.count / total;
+    m2 += other.m2 + delta * delta * count * other.count / total;
+    count = total;
+    sumSquares += other.sumSquares;
+    min = other.min < min ? other.min : min;
+    max = other.max > max ? other.max : max;
+    return *this;
+  }
+
+  /// Population variance.
+  double variance() const { return count > 0 ? m2 / count : 0; }
+
+  double l2Norm() const { return std::sqrt(sumSquares); }
+};
+
+}  // namespace insitu
+
+#if defined(USE_KOKKOS)
+namespace Kokkos
+{
+// identity of Kokkos::Sum<insitu::FieldStats>: an empty set of values
+template <>
+struct reduction_identity<insitu::FieldStats>
+{
+  KOKKOS_FORCEINLINE_FUNCTION static insitu::FieldStats sum()
+  {
+    return insitu::FieldStats();
+  }
+};
+}  // namespace Kokkos
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Stats of field(:, column) and, if bins is given, its histogram in
+ *        the same pass.
+ * @param hist receives bins->nbBins counts (values out of range are not
+ *        counted)
+ */
+template <typename ArrayType>
+FieldStats reduceField(const ArrayType& field, int column, int n,
+                       const HistogramBins* bins = nullptr,
+                       std::vector<long long>* hist = nullptr)
+{
+  FieldStats stats;
+#if defined(USE_KOKKOS)
+  if (bins == nullptr)
+  {
+    Kokkos::parallel_reduce(
+        "fieldStats", n,
+        KOKKOS_LAMBDA(const int i, FieldStats& local) {
+          local.add(field(i, column));
+        },
+        Kokkos::Sum<FieldStats>(stats));
+    return stats;
+  }
+
+  const HistogramBins b = *bins;
+  Kokkos::View<long long*> counts("fieldHistogram", b.nbBins);
+  // duplicated per thread on host backends, atomics on GPUs
+  Kokkos::Experimental::ScatterView<long long*> scatter(counts);
+  Kokkos::parallel_reduce(
+      "fieldStatsHistogram", n,
+      KOKKOS_LAMBDA(const int i, FieldStats& local) {
+        const float value = field(i, column);
+        local.add(value);
+        const int idx = b.index(value);
+        if (idx >= 0)
+        {
+          auto access = scatter.access();
+          access(idx) += 1;
+        }
+      },
+      Kokkos::Sum<FieldStats>(stats));
+  Kokkos::Experimental::contribute(counts, scatter);
+  auto hostCounts =
+      Kokkos::create_mirror_view_and_copy(Kokkos::HostSpace(), counts);
+  hist->assign(hostCounts.data(), hostCounts.data() + b.nbBins);
+#else
+  const int nbBins = bins ? bins->nbBins : 0;
+  std::vector<long long> counts(nbBins, 0);
+#pragma omp parallel
+  {
+    FieldStats local;
+    std::vector<long long> localCounts(nbBins, 0);
+#pragma omp for nowait
+    for (int i = 0; i < n; i++)
+    {
+      const float value = field(i, column);
+      local.add(value);
+      if (bins)
+      {
+        const int idx = bins->index(value);
+        if (idx >= 0) localCounts[idx]++;
+      }
+    }
+#pragma omp critical
+    {
+      stats += local;
+      for (int b = 0; b < nbBins; b++) counts[b] += localCounts[b];
+    }
+  }
+  if (hist) *hist = counts;
+#endif
+  return stats;
+}
+
+/**
+ * @brief Stats of n values on the host.
+ */
+inline FieldStats reduceValues(const float* values, size_t n)
+{
+  FieldStats stats;
+#pragma omp parallel
+  {
+    FieldStats local;
+#pragma omp for nowait
+    for (size_t i = 0; i < n; i++)
+    {
+      local.add(values[i]);
+    }
+#pragma omp critical
+    stats += local;
+  }
+  return stats;
+}
+
+}  // namespace insitu
+
+#endif  // FIELD_REDUCTION_HPP_
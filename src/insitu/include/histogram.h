@@ -0,0 +1,183 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  histogram.h: histogram bins and histogram files
+//
+//  A histogram file is the text
+//    bin_edges:\n<nbBins + 1 edges>\nhist:\n<nbBins counts>\n
+//    scale:\n<linear|log>\nrange:\n<step|fixed|learned>\n
+//  readers only interested in the counts can stop after the fourth line.
+//************************************************************************
+
+#ifndef HISTOGRAM_HPP_
+#define HISTOGRAM_HPP_
+
+#include <common_macros.h>
+
+#include <cmath>
+#include <filesystem>
+#include <fstream>
+#include <iomanip>
+#include <limits>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Where the range of the bins comes from.
+ */
+enum class HistogramRange
+{
+  Step,    ///< min and max of the field at each histogram step
+  Fixed,   ///< given on the command line
+  Learned  ///< global range saved by a previous run
+};
+
+inline HistogramRange parseHistogramRange(const std::string& name)
+{
+  if (name == "step") return HistogramRange::Step;
+  if (name == "fixed") return HistogramRange::Fixed;
+  if (name == "learned") return HistogramRange::Learned;
+
+  throw std::invalid_argument(
+      "Histogram range must be step, fixed or learned, got " + name);
+}
+
+inline std::string histogramRangeName(HistogramRange range)
+{
+  switch (range)
+  {
+    case HistogramRange::Fixed:
+      return "fixed";
+    case HistogramRange::Learned:
+      return "learned";
+    default:
+      return "step";
+  }
+}
+
+/**
+ * @brief nbBins bins covering [min, max], of equal width or, for log bins,
+ *        of equal width in log10 of the absolute value.
+ *
+ * Values out of the range are not counted; max falls in the last bin.
+ */
+struct HistogramBins
+{
+  int nbBins = 10;
+  float min = 0;
+  float max = 0;
+  bool log = false;
+  // min and bin width in the binned variable (value or log10 |value|)
+  float start = 0;
+  float width = 0;
+
+  static HistogramBins linear(int nbBins, float min, float max)
+  {
+    HistogramBins bins;
+    bins.nbBins = nbBins;
+    bins.min = min;
+    bins.max = max;
+    bins.start = min;
+    bins.width = (max - min) / nbBins;
+    return bins;
+  }
+
+  /// Log bins of |value| over [min, max], with 0 < min.
+  static HistogramBins logarithmic(int nbBins, float min, float max)
+  {
+    if (!(min > 0))
+      throw std::invalid_argument("Log histogram bins need a range above 0");
+    HistogramBins bins;
+    bins.nbBins = nbBins;
+    bins.min = min;
+    bins.max = max;
+    bins.log = true;
+    bins.start = std::log10(min);
+    bins.width = (std::log10(max) - bins.start) / nbBins;
+    return bins;
+  }
+
+  PROXY_HOST_DEVICE int index(float value) const
+  {
+    if (log) value = fabsf(value);
+    if (value < min || value > max) return -1;
+    if (width == 0) return 0;
+
+    const float x = log ? log10f(value) : value;
+    int idx = (x - start) / width;
+    if (idx >= nbBins) idx = nbBins - 1;
+    return idx < 0 ? 0 : idx;
+  }
+
+  float edge(int i) const
+  {
+    if (log) return std::pow(10.f, start + i * width);
+    return min + i * width;
+  }
+};
+
+/**
+ * @brief Write a histogram file, edges with full float precision.
+ * @return false if the file could not be opened
+ */
+inline bool writeHistogram(const std::filesystem::path& filename,
+                           const HistogramBins& bins,
+                           const std::vector<long long>& hist,
+                           HistogramRange range)
+{
+  std::ofstream out(filename);
+  if (!out) return false;
+
+  out << std::setprecision(std::numeric_limits<float>::max_digits10);
+  out << "bin_edges:\n";
+  for (int i = 0; i < bins.nbBins + 1; i++)
+  {
+    out << bins.edge(i) << ' ';
+  }
+  out << '\n';
+  out << "hist:\n";
+  for (int i = 0; i < bins.nbBins; i++)
+  {
+    out << hist[i] << ' ';
+  }
+  out << '\n';
+  out << "scale:\n" << (bins.log ? "log" : "linear") << '\n';
+  out << "range:\n" << histogramRangeName(range) << '\n';
+  return static_cast<bool>(out);
+}
+
+/**
+ * @brief Save the global [min, max] of the field seen during a run.
+ */
+inline bool writeHistogramRange(const std::filesystem::path& filename,
+                                float min, float max)
+{
+  std::ofstream out(filename);
+  if (!out) return false;
+  out << std::setprecision(std::numeric_limits<float>::max_digits10);
+  out << min << ' ' << max << '\n';
+  return static_cast<bool>(out);
+}
+
+/**
+ * @brief Load a range saved by writeHistogramRange.
+ */
+inline void readHistogramRange(const std::filesystem::path& filename,
+                               float& min, float& max)
+{
+  std::ifstream in(filename);
+  if (!(in >> min >> max))
+  {
+    throw std::runtime_error("Cannot read a learned histogram range from " +
+                             filename.string() +
+                             ", run once with --compute-histogram first");
+  }
+}
+
+}  // namespace insitu
+
+#endif  // HISTOGRAM_HPP_
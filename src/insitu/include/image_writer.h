@@ -0,0 +1,337 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  image_writer.h: colour images of slices, binary PPM (P6) or PNG
+//
+//  Values are mapped to colours through a 256 entry lookup table:
+//    index = clamp(int((v - min) * (255.f / (max - min))), 0, 255)
+//  in float32, NaN giving 0. The tables are interpolated in integers
+//  between the anchors of each colormap, so that other tools can rebuild
+//  exactly the same colours.
+//
+//  The PNG encoder only needs zlib for compression: without it the image
+//  data is written as stored (uncompressed) deflate blocks.
+//************************************************************************
+
+#ifndef IMAGE_WRITER_HPP_
+#define IMAGE_WRITER_HPP_
+
+#include <algorithm>
+#include <array>
+#include <cmath>
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#if defined(USE_ZLIB)
+#include <zlib.h>
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Colours of the images, from the minimum to the maximum.
+ */
+enum class Colormap
+{
+  BlueGreen,  ///< blue to green, the former PPM gradient
+  Gray,       ///< black to white
+  Viridis,    ///< perceptually uniform, purple to yellow
+  Seismic     ///< dark blue, white at the middle, dark red
+};
+
+inline Colormap parseColormap(const std::string& name)
+{
+  if (name == "blue-green") return Colormap::BlueGreen;
+  if (name == "gray") return Colormap::Gray;
+  if (name == "viridis") return Colormap::Viridis;
+  if (name == "seismic") return Colormap::Seismic;
+
+  throw std::invalid_argument(
+      "Colormap must be blue-green, gray, viridis or seismic, got " + name);
+}
+
+/**
+ * @brief Values mapped to the ends of the colormap.
+ */
+enum class ImageRange
+{
+  Step,   ///< min and max of each image
+  Fixed,  ///< given min and max
+  Run     ///< min and max of every image of the run so far
+};
+
+inline ImageRange parseImageRange(const std::string& name)
+{
+  if (name == "step") return ImageRange::Step;
+  if (name == "fixed") return ImageRange::Fixed;
+  if (name == "run") return ImageRange::Run;
+
+  throw std::invalid_argument("Image range must be step, fixed or run, got " +
+                              name);
+}
+
+/**
+ * @brief 256 RGB colours of a colormap, 768 bytes.
+ */
+inline std::array<uint8_t, 768> colormapTable(Colormap colormap)
+{
+  std::vector<std::array<int, 3>> anchors;
+  switch (colormap)
+  {
+    case Colormap::BlueGreen:
+      anchors = {{0, 0, 255}, {0, 255, 0}};
+      break;
+    case Colormap::Gray:
+      anchors = {{0, 0, 0}, {255, 255, 255}};
+      break;
+    case Colormap::Viridis:
+      anchors = {{68, 1, 84},    {71, 45, 123},  {59, 82, 139},
+                 {44, 114, 142}, {33, 145, 140}, {40, 174, 128},
+                 {94, 201, 98},  {173, 220, 48}, {253, 231, 37}};
+      break;
+    case Colormap::Seismic:
+      anchors = {
+          {0, 0, 77}, {0, 0, 255}, {255, 255, 255}, {255, 0, 0}, {128, 0, 0}};
+      break;
+  }
+
+  std::array<uint8_t, 768> table;
+  const int segments = static_cast<int>(anchors.size()) - 1;
+  for (int i = 0; i < 256; i++)
+  {
+    // colour i lies at i * segments / 255 along the anchors
+    const int k = std::min(i * segments / 255, segments - 1);
+    const int r = i * segments - k * 255;
+    for (int c = 0; c < 3; c++)
+    {
+      table[3 * i + c] = static_cast<uint8_t>(
+          (anchors[k][c] * (255 - r) + anchors[k + 1][c] * r + 127) / 255);
+    }
+  }
+  return table;
+}
+
+/**
+ * @brief Render slices through a colormap and write them as images.
+ *
+ * The pixel and file buffers are kept between calls; a writer must only be
+ * used by one thread at a time.
+ */
+class ImageWriter
+{
+ public:
+  ImageWriter() : ImageWriter(Colormap::BlueGreen, ImageRange::Step, 0, 0) {}
+
+  /**
+   * @param min, max values mapped to the ends of the colormap with
+   *        ImageRange::Fixed
+   */
+  ImageWriter(Colormap colormap, ImageRange range, float min, float max)
+      : table_(colormapTable(colormap)), range_(range), min_(min), max_(max)
+  {
+    if (range == ImageRange::Fixed && !(max > min))
+      throw std::invalid_argument("A fixed image range needs max > min");
+    if (range == ImageRange::Run)
+    {
+      min_ = INFINITY;
+      max_ = -INFINITY;
+    }
+  }
+
+  /**
+   * @brief Write a width x height plane, row 0 first, as a binary PPM.
+   */
+  bool writePPM(const std::filesystem::path& filename, const float* values,
+                int width, int height)
+  {
+    render(values, width, height);
+    std::ofstream out(filename, std::ios::binary);
+    if (!out) return false;
+    out << "P6\n" << width << " " << height << "\n255\n";
+    out.write(reinterpret_cast<const char*>(pixels_.data()), pixels_.size());
+    return static_cast<bool>(out);
+  }
+
+  /**
+   * @brief Write a width x height plane, row 0 first, as an RGB PNG.
+   */
+  bool writePNG(const std::filesystem::path& filename, const float* values,
+                int width, int height)
+  {
+    render(values, width, height);
+
+    // every scanline starts with its filter type, 0 (none)
+    const size_t stride = 3 * static_cast<size_t>(width);
+    scanlines_.resize((stride + 1) * height);
+    for (int y = 0; y < height; y++)
+    {
+      scanlines_[y * (stride + 1)] = 0;
+      std::copy_n(pixels_.data() + y * stride, stride,
+                  scanlines_.data() + y * (stride + 1) + 1);
+    }
+
+    png_.clear();
+    const uint8_t signature[8] = {0x89, 'P', 'N', 'G', '\r', '\n', 0x1a, '\n'};
+    png_.insert(png_.end(), signature, signature + 8);
+
+    std::vector<uint8_t>& ihdr = chunk_;
+    ihdr.clear();
+    appendBigEndian(ihdr, width);
+    appendBigEndian(ihdr, height);
+    // 8 bits per channel, RGB, deflate, adaptive filtering, no interlace
+    ihdr.insert(ihdr.end(), {8, 2, 0, 0, 0});
+    appendChunk("IHDR", ihdr);
+    deflateScanlines();
+    appendChunk("IDAT", chunk_);
+    chunk_.clear();
+    appendChunk("IEND", chunk_);
+
+    std::ofstream out(filename, std::ios::binary);
+    if (!out) return false;
+    out.write(reinterpret_cast<const char*>(png_.data()), png_.size());
+    return static_cast<bool>(out);
+  }
+
+ private:
+  // map the plane to RGB in pixels_
+  void render(const float* values, int width, int height)
+  {
+    const size_t count = static_cast<size_t>(width) * height;
+    float min = min_;
+    float max = max_;
+    if (range_ != ImageRange::Fixed)
+    {
+      float lo = INFINITY;
+      float hi = -INFINITY;
+      for (size_t n = 0; n < count; n++)
+      {
+        lo = std::fmin(lo, values[n]);
+        hi = std::fmax(hi, values[n]);
+      }
+      if (range_ == ImageRange::Run)
+      {
+        min_ = std::fmin(min_, lo);
+        max_ = std::fmax(max_, hi);
+        lo = min_;
+        hi = max_;
+      }
+      min = lo;
+      max = hi;
+    }
+    // a constant image takes the first colour
+    const float scale = max > min ? 255.f / (max - min) : 0.f;
+
+    pixels_.resize(3 * count);
+    uint8_t* pixels = pixels_.data();
+    const uint8_t* table = table_.data();
+#pragma omp parallel for
+    for (size_t n = 0; n < count; n++)
+    {
+      const float t = (values[n] - min) * scale;
+      const int index = t >= 0.f ? (t < 255.f ? static_cast<int>(t) : 255) : 0;
+      pixels[3 * n] = table[3 * index];
+      pixels[3 * n + 1] = table[3 * index + 1];
+      pixels[3 * n + 2] = table[3 * index + 2];
+    }
+  }
+
+  static void appendBigEndian(std::vector<uint8_t>& out, uint32_t value)
+  {
+    for (int shift = 24; shift >= 0; shift -= 8)
+    {
+      out.push_back(static_cast<uint8_t>(value >> shift));
+    }
+  }
+
+  static uint32_t crc32(const uint8_t* data, size_t size, uint32_t crc)
+  {
+    static const std::array<uint32_t, 256> table = [] {
+      std::array<uint32_t, 256> t;
+      for (uint32_t n = 0; n < 256; n++)
+      {
+        uint32_t c = n;
+        for (int k = 0; k < 8; k++)
+        {
+          c = c & 1 ? 0xedb88320u ^ (c >> 1) : c >> 1;
+        }
+        t[n] = c;
+      }
+      return t;
+    }();
+    for (size_t n = 0; n < size; n++)
+    {
+      crc = table[(crc ^ data[n]) & 0xff] ^ (crc >> 8);
+    }
+    return crc;
+  }
+
+  // length, type, data and CRC of the type and data
+  void appendChunk(const char type[4], const std::vector<uint8_t>& data)
+  {
+    appendBigEndian(png_, data.size());
+    const size_t typeAt = png_.size();
+    png_.insert(png_.end(), type, type + 4);
+    png_.insert(png_.end(), data.begin(), data.end());
+    const uint32_t crc =
+        crc32(png_.data() + typeAt, png_.size() - typeAt, 0xffffffffu);
+    appendBigEndian(png_, crc ^ 0xffffffffu);
+  }
+
+  // zlib stream of scanlines_ in chunk_
+  void deflateScanlines()
+  {
+#if defined(USE_ZLIB)
+    uLongf size = compressBound(scanlines_.size());
+    chunk_.resize(size);
+    if (compress2(chunk_.data(), &size, scanlines_.data(), scanlines_.size(),
+                  Z_BEST_SPEED) == Z_OK)
+    {
+      chunk_.resize(size);
+      return;
+    }
+#endif
+    // stored deflate blocks of at most 65535 bytes
+    chunk_.clear();
+    chunk_.insert(chunk_.end(), {0x78, 0x01});
+    size_t at = 0;
+    do
+    {
+      const size_t size = std::min<size_t>(65535, scanlines_.size() - at);
+      const bool last = at + size == scanlines_.size();
+      chunk_.insert(
+          chunk_.end(),
+          {static_cast<uint8_t>(last), static_cast<uint8_t>(size),
+           static_cast<uint8_t>(size >> 8), static_cast<uint8_t>(~size),
+           static_cast<uint8_t>(~size >> 8)});
+      chunk_.insert(chunk_.end(), scanlines_.begin() + at,
+                    scanlines_.begin() + at + size);
+      at += size;
+    } while (at < scanlines_.size());
+
+    uint32_t a = 1, b = 0;
+    for (uint8_t byte : scanlines_)
+    {
+      a = (a + byte) % 65521;
+      b = (b + a) % 65521;
+    }
+    appendBigEndian(chunk_, (b << 16) | a);
+  }
+
+  std::array<uint8_t, 768> table_;
+  ImageRange range_;
+  float min_;
+  float max_;
+  std::vector<uint8_t> pixels_;
+  std::vector<uint8_t> scanlines_;
+  std::vector<uint8_t> chunk_;
+  std::vector<uint8_t> png_;
+};
+
+}  // namespace insitu
+
+#endif  // IMAGE_WRITER_HPP_
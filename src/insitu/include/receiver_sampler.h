@@ -0,0 +1,171 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  receiver_sampler.h: sampling of the receivers where the field lives
+//
+//  Every receiver is a weighted sum of field nodes, stored in CSR form:
+//  the nodes and weights of receiver r are entries [offsets[r],
+//  offsets[r + 1]). At each step all the receivers are sampled by one
+//  kernel into a trace buffer of batchSteps steps kept next to the field
+//  (on the device with Kokkos), which is copied to the host only when it
+//  is full or flushed.
+//************************************************************************
+
+#ifndef RECEIVER_SAMPLER_HPP_
+#define RECEIVER_SAMPLER_HPP_
+
+#include <cstddef>
+#include <functional>
+#include <stdexcept>
+#include <vector>
+
+#if defined(USE_KOKKOS)
+#include <Kokkos_Core.hpp>
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Record the receivers of a field column step after step.
+ */
+template <typename ArrayType>
+class ReceiverSampler
+{
+ public:
+  /**
+   * @brief Called with the recorded steps: the value of receiver r at step
+   *        firstStep + s is values[r * stride + s], s < count.
+   */
+  using Sink = std::function<void(int firstStep, int count, const float* values,
+                                  int stride)>;
+
+  /**
+   * @param offsets receiver r uses entries [offsets[r], offsets[r + 1])
+   * @param nodes, weights field node and weight of each entry
+   * @param batchSteps steps recorded before the traces must be flushed
+   */
+  ReceiverSampler(const std::vector<size_t>& offsets,
+                  const std::vector<int>& nodes,
+                  const std::vector<float>& weights, int batchSteps)
+      : receivers_(offsets.empty() ? 0 : static_cast<int>(offsets.size()) - 1),
+        batch_(batchSteps)
+  {
+    if (batchSteps < 1)
+      throw std::invalid_argument("Receiver batches need at least one step");
+    if (nodes.size() != weights.size() ||
+        (!offsets.empty() && offsets.back() != nodes.size()))
+      throw std::invalid_argument("Receiver entries do not match the offsets");
+
+#if defined(USE_KOKKOS)
+    offsets_ = upload<size_t>(offsets, "receiverOffsets");
+    nodes_ = upload<int>(nodes, "receiverNodes");
+    weights_ = upload<float>(weights, "receiverWeights");
+    traces_ = TracesView("receiverTraces", receivers_, batch_);
+    hostTraces_ = Kokkos::create_mirror_view(traces_);
+#else
+    offsets_ = offsets;
+    nodes_ = nodes;
+    weights_ = weights;
+    traces_.assign(static_cast<size_t>(receivers_) * batch_, 0.f);
+#endif
+  }
+
+  int receivers() const { return receivers_; }
+  int batchSteps() const { return batch_; }
+  /// True when the next record needs a flush first.
+  bool full() const { return count_ == batch_; }
+
+  /**
+   * @brief Sample every receiver in column of field at this step.
+   *
+   * Steps must be recorded in order; flush the traces when full().
+   */
+  void record(const ArrayType& field, int column, int step)
+  {
+    if (full())
+      throw std::logic_error("Receiver traces must be flushed when full");
+    if (count_ == 0) first_ = step;
+    const int slot = count_++;
+    if (receivers_ == 0) return;
+
+#if defined(USE_KOKKOS)
+    auto offsets = offsets_;
+    auto nodes = nodes_;
+    auto weights = weights_;
+    auto traces = traces_;
+    Kokkos::parallel_for(
+        "receiverSample", receivers_, KOKKOS_LAMBDA(const int r) {
+          float value = 0.f;
+          for (size_t e = offsets(r); e < offsets(r + 1); e++)
+          {
+            value += field(nodes(e), column) * weights(e);
+          }
+          traces(r, slot) = value;
+        });
+#else
+#pragma omp parallel for if (receivers_ > 256)
+    for (int r = 0; r < receivers_; r++)
+    {
+      float value = 0.f;
+      for (size_t e = offsets_[r]; e < offsets_[r + 1]; e++)
+      {
+        value += field(nodes_[e], column) * weights_[e];
+      }
+      traces_[static_cast<size_t>(r) * batch_ + slot] = value;
+    }
+#endif
+  }
+
+  /**
+   * @brief Hand the steps recorded since the last flush to sink.
+   */
+  void flush(const Sink& sink)
+  {
+    if (count_ == 0) return;
+#if defined(USE_KOKKOS)
+    Kokkos::deep_copy(hostTraces_, traces_);
+    sink(first_, count_, hostTraces_.data(), batch_);
+#else
+    sink(first_, count_, traces_.data(), batch_);
+#endif
+    count_ = 0;
+  }
+
+ private:
+#if defined(USE_KOKKOS)
+  using MemorySpace = typename ArrayType::memory_space;
+  using TracesView = Kokkos::View<float**, Kokkos::LayoutRight, MemorySpace>;
+
+  template <typename T>
+  static Kokkos::View<T*, MemorySpace> upload(const std::vector<T>& values,
+                                              const char* label)
+  {
+    Kokkos::View<T*, MemorySpace> view(label, values.size());
+    Kokkos::deep_copy(view,
+                      Kokkos::View<const T*, Kokkos::HostSpace,
+                                   Kokkos::MemoryTraits<Kokkos::Unmanaged>>(
+                          values.data(), values.size()));
+    return view;
+  }
+
+  Kokkos::View<size_t*, MemorySpace> offsets_;
+  Kokkos::View<int*, MemorySpace> nodes_;
+  Kokkos::View<float*, MemorySpace> weights_;
+  TracesView traces_;
+  typename TracesView::HostMirror hostTraces_;
+#else
+  std::vector<size_t> offsets_;
+  std::vector<int> nodes_;
+  std::vector<float> weights_;
+  std::vector<float> traces_;
+#endif
+  int receivers_;
+  int batch_;
+  int first_ = 0;
+  int count_ = 0;
+};
+
+}  // namespace insitu
+
+#endif  // RECEIVER_SAMPLER_HPP_
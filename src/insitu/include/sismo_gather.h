@@ -0,0 +1,82 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  sismo_gather.h: every receiver trace of a run in one binary file
+//
+//  A gather file is a SismoGatherHeader, the x, y, z coordinates of every
+//  receiver as float32 (padded with zeros up to headerSize, a multiple of
+//  64 bytes), then the traces: nbReceivers rows of nbSamples float32, one
+//  row per receiver in the order of the coordinates. The traces are one
+//  contiguous matrix, so that readers can map it without parsing.
+//************************************************************************
+
+#ifndef SISMO_GATHER_HPP_
+#define SISMO_GATHER_HPP_
+
+#include <array>
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Fixed part of the header of a gather file (32 bytes, native
+ *        endianness).
+ */
+struct SismoGatherHeader
+{
+  char magic[8] = {'S', 'E', 'M', 'G', 'A', 'T', 'H', '\0'};
+  uint32_t version = 1;
+  uint32_t headerSize = 0;  ///< offset of the traces
+  uint32_t nbReceivers = 0;
+  uint32_t nbSamples = 0;
+  double dt = 0;  ///< time between two samples (s)
+};
+
+static_assert(sizeof(SismoGatherHeader) == 32,
+              "SismoGatherHeader must stay 32 bytes");
+
+/**
+ * @brief Write the traces of receivers, traces(r, s) being the sample s of
+ *        receiver r.
+ * @return false if the file could not be written
+ */
+template <typename ArrayType>
+bool writeSismoGather(const std::filesystem::path& filename,
+                      const std::vector<std::array<float, 3>>& receivers,
+                      double dt, int nbSamples, const ArrayType& traces)
+{
+  std::ofstream out(filename, std::ios::binary);
+  if (!out) return false;
+
+  SismoGatherHeader header;
+  const size_t coordsSize = receivers.size() * 3 * sizeof(float);
+  header.headerSize = (sizeof(header) + coordsSize + 63) / 64 * 64;
+  header.nbReceivers = receivers.size();
+  header.nbSamples = nbSamples;
+  header.dt = dt;
+  out.write(reinterpret_cast<const char*>(&header), sizeof(header));
+  out.write(reinterpret_cast<const char*>(receivers.data()), coordsSize);
+  const std::vector<char> padding(
+      header.headerSize - sizeof(header) - coordsSize, 0);
+  out.write(padding.data(), padding.size());
+
+  std::vector<float> trace(nbSamples);
+  for (size_t r = 0; r < receivers.size(); r++)
+  {
+    for (int s = 0; s < nbSamples; s++)
+    {
+      trace[s] = traces(r, s);
+    }
+    out.write(reinterpret_cast<const char*>(trace.data()),
+              trace.size() * sizeof(float));
+  }
+  return static_cast<bool>(out);
+}
+
+}  // namespace insitu
+
+#endif  // SISMO_GATHER_HPP_
@@ -0,0 +1,235 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  slice_extractor.h: in-situ extraction of axis-aligned slices
+//
+//  A slice is given by a SliceSpec (axis, node index or physical
+//  coordinate, interval, output format). At each timestep the
+//  SliceExtractor selects the slices due at that step and lists the nodes
+//  of their planes, plane after plane, so that the field is gathered once
+//  for all of them; slices on the same plane share it.
+//************************************************************************
+
+#ifndef SLICE_EXTRACTOR_HPP_
+#define SLICE_EXTRACTOR_HPP_
+
+#include <cstddef>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief One requested slice.
+ *
+ * Written on the command line as axis=index[:interval[:format]] or
+ * axis@coordinate[:interval[:format]], e.g. x=40, z@1000:25:ppm.
+ */
+struct SliceSpec
+{
+  int axis = 2;            ///< fixed axis, 0 for X, 1 for Y, 2 for Z
+  int index = -1;          ///< node index along axis, -1 to use coordinate
+  float coordinate = 0.f;  ///< physical position along axis (m)
+  int interval = 0;        ///< steps between two slices, 0 for the default
+  std::string format;      ///< raw, text, ppm or png, empty for the default
+  std::string name;        ///< prefix of the file names
+};
+
+inline SliceSpec parseSliceSpec(const std::string& text)
+{
+  const std::string error =
+      "Slice must be axis=index[:interval[:format]] "
+      "or axis@coordinate[:interval[:format]], got " +
+      text;
+  const std::string axes = "xyz";
+  if (text.size() < 3 || axes.find(text[0]) == std::string::npos ||
+      (text[1] != '=' && text[1] != '@'))
+    throw std::invalid_argument(error);
+
+  SliceSpec spec;
+  spec.axis = static_cast<int>(axes.find(text[0]));
+  std::vector<std::string> fields;
+  size_t start = 2;
+  for (size_t end; (end = text.find(':', start)) != std::string::npos;
+       start = end + 1)
+  {
+    fields.push_back(text.substr(start, end - start));
+  }
+  fields.push_back(text.substr(start));
+  if (fields.size() > 3 || fields[0].empty())
+    throw std::invalid_argument(error);
+
+  try
+  {
+    size_t used = 0;
+    if (text[1] == '=')
+      spec.index = std::stoi(fields[0], &used);
+    else
+      spec.coordinate = std::stof(fields[0], &used);
+    if (used != fields[0].size()) throw std::invalid_argument(error);
+    if (fields.size() > 1 && !fields[1].empty())
+      spec.interval = std::stoi(fields[1]);
+  }
+  catch (const std::logic_error&)
+  {
+    throw std::invalid_argument(error);
+  }
+  if (fields.size() > 2) spec.format = fields[2];
+
+  if (spec.interval < 0 || (text[1] == '=' && spec.index < 0))
+    throw std::invalid_argument(error);
+  if (!spec.format.empty() && spec.format != "raw" && spec.format != "text" &&
+      spec.format != "ppm" && spec.format != "png")
+    throw std::invalid_argument(
+        "Slice format must be raw, text, ppm or png, got " + spec.format);
+  return spec;
+}
+
+/**
+ * @brief Plane of the node grid holding a slice.
+ */
+struct SlicePlane
+{
+  int origin[3] = {0, 0, 0};  ///< first node of the plane in the grid
+  int dims[3] = {0, 0, 0};    ///< nodes per axis, 1 along the fixed axis
+  size_t offset = 0;          ///< first value of the plane in nodes()
+
+  size_t count() const
+  {
+    return static_cast<size_t>(dims[0]) * dims[1] * dims[2];
+  }
+  /// Nodes per row, x fastest: the first axis that is not the fixed one.
+  int rowLength() const { return dims[0] > 1 ? dims[0] : dims[1]; }
+  /// Rows of the plane.
+  int rows() const { return static_cast<int>(count() / rowLength()); }
+};
+
+/**
+ * @brief Select the slices due at a timestep and the nodes to gather.
+ *
+ * Nodes are numbered x fastest then y then z on a grid of gridDims nodes.
+ */
+class SliceExtractor
+{
+ public:
+  struct Selected
+  {
+    const SliceSpec* spec;
+    SlicePlane plane;
+  };
+
+  /**
+   * @param specs slices with index, interval and format resolved
+   * @param gridDims nodes per axis of the grid
+   */
+  SliceExtractor(std::vector<SliceSpec> specs, const int gridDims[3])
+      : specs_(std::move(specs))
+  {
+    for (int d = 0; d < 3; d++) grid_[d] = gridDims[d];
+    for (const SliceSpec& spec : specs_)
+    {
+      if (spec.index < 0 || spec.index >= grid_[spec.axis])
+        throw std::invalid_argument(
+            "Slice " + spec.name + " is outside of the grid (" +
+            std::to_string(grid_[spec.axis]) + " nodes along its axis)");
+      if (spec.interval < 1)
+        throw std::invalid_argument("Slice " + spec.name +
+                                    " needs an interval >= 1");
+    }
+  }
+
+  /**
+   * @brief Select the slices of this timestep.
+   * @return false if no slice is due
+   */
+  bool select(int timestep)
+  {
+    std::vector<char> due(specs_.size());
+    for (size_t s = 0; s < specs_.size(); s++)
+    {
+      due[s] = timestep % specs_[s].interval == 0;
+    }
+    if (due != due_)
+    {
+      due_ = std::move(due);
+      rebuild();
+    }
+    return !selected_.empty();
+  }
+
+  /// Selected slices, with the plane of each one.
+  const std::vector<Selected>& selected() const { return selected_; }
+  /// Nodes of the planes of the selected slices, each plane once.
+  const std::vector<size_t>& nodes() const { return nodes_; }
+  /// Changes every time nodes() does.
+  size_t version() const { return version_; }
+
+ private:
+  void rebuild()
+  {
+    selected_.clear();
+    nodes_.clear();
+    version_++;
+    for (size_t s = 0; s < specs_.size(); s++)
+    {
+      if (!due_[s]) continue;
+      const SliceSpec& spec = specs_[s];
+
+      Selected slice{&spec, plane(spec.axis, spec.index)};
+      bool shared = false;
+      for (const Selected& other : selected_)
+      {
+        if (other.spec->axis == spec.axis && other.spec->index == spec.index)
+        {
+          slice.plane.offset = other.plane.offset;
+          shared = true;
+          break;
+        }
+      }
+      if (!shared)
+      {
+        slice.plane.offset = nodes_.size();
+        appendNodes(slice.plane);
+      }
+      selected_.push_back(slice);
+    }
+  }
+
+  SlicePlane plane(int axis, int index) const
+  {
+    SlicePlane plane;
+    for (int d = 0; d < 3; d++)
+    {
+      plane.dims[d] = d == axis ? 1 : grid_[d];
+    }
+    plane.origin[axis] = index;
+    return plane;
+  }
+
+  void appendNodes(const SlicePlane& plane)
+  {
+    const size_t nx = grid_[0];
+    const size_t ny = grid_[1];
+    for (int k = 0; k < plane.dims[2]; k++)
+      for (int j = 0; j < plane.dims[1]; j++)
+        for (int i = 0; i < plane.dims[0]; i++)
+        {
+          nodes_.push_back(((plane.origin[2] + k) * ny + plane.origin[1] + j) *
+                               nx +
+                           plane.origin[0] + i);
+        }
+  }
+
+  std::vector<SliceSpec> specs_;
+  int grid_[3];
+  std::vector<char> due_;
+  std::vector<Selected> selected_;
+  std::vector<size_t> nodes_;
+  size_t version_ = 0;
+};
+
+}  // namespace insitu
+
+#endif  // SLICE_EXTRACTOR_HPP_
@@ -0,0 +1,196 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  snapshot_codec.h: block compression of raw snapshot values
+//
+//  A compressed snapshot is a SnapshotHeader (version 2, codec set) then
+//  the values cut in blocks of header.blockValues values. Each block is
+//  a SnapshotBlockHeader followed by its payload:
+//    Stored:      the float32 values as they are
+//    ShuffleZlib: zlib stream of the block with its bytes shuffled (every
+//                 first byte of the floats, then every second byte, ...)
+//    Quantized:   zlib stream of the LEB128 varints of the zigzag deltas
+//                 of q[i] = round(v[i] / (2 * tolerance)), decoded as
+//                 q[i] * 2 * tolerance in double precision, i.e. at most
+//                 tolerance away. Rounded to float32 the decoded value may
+//                 be up to half an ulp further, beyond tolerance when the
+//                 tolerance is about the float32 spacing of the values
+//  A block of a lossy snapshot holding a non-finite or too large value is
+//  Stored, as is a block that zlib would make larger.
+//************************************************************************
+
+#ifndef SNAPSHOT_CODEC_HPP_
+#define SNAPSHOT_CODEC_HPP_
+
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#if defined(USE_ZLIB)
+#include <zlib.h>
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Compression of the values of a raw snapshot.
+ */
+enum class SnapshotCodec : uint32_t
+{
+  None = 0,         ///< contiguous float32 values, no blocks
+  ShuffleZlib = 1,  ///< lossless
+  Quantized = 2     ///< error bounded by an absolute tolerance
+};
+
+inline SnapshotCodec parseSnapshotCodec(const std::string& name)
+{
+  SnapshotCodec codec;
+  if (name == "none")
+    codec = SnapshotCodec::None;
+  else if (name == "lossless")
+    codec = SnapshotCodec::ShuffleZlib;
+  else if (name == "lossy")
+    codec = SnapshotCodec::Quantized;
+  else
+    throw std::invalid_argument(
+        "Snapshot compression must be none, lossless or lossy, got " + name);
+
+#if !defined(USE_ZLIB)
+  if (codec != SnapshotCodec::None)
+    throw std::invalid_argument("Snapshot compression needs a build with zlib");
+#endif
+  return codec;
+}
+
+/**
+ * @brief Header of a block of a compressed snapshot (8 bytes).
+ */
+struct SnapshotBlockHeader
+{
+  uint32_t size = 0;  ///< bytes of payload following this header
+  uint32_t mode = 0;  ///< SnapshotCodec of the payload, None for Stored
+};
+
+static_assert(sizeof(SnapshotBlockHeader) == 8,
+              "SnapshotBlockHeader must stay 8 bytes");
+
+/**
+ * @brief Encode blocks of snapshot values, reusing its buffers.
+ */
+class SnapshotEncoder
+{
+ public:
+  SnapshotEncoder(SnapshotCodec codec, double tolerance)
+      : codec_(codec), tolerance_(tolerance)
+  {
+    if (codec == SnapshotCodec::Quantized && !(tolerance > 0))
+      throw std::invalid_argument(
+          "Lossy snapshot compression needs a tolerance > 0");
+  }
+
+  /**
+   * @brief Append the block header and payload of values[0, count) to out.
+   */
+  void encode(const float* values, size_t count, std::vector<uint8_t>& out)
+  {
+    SnapshotBlockHeader block;
+    block.mode = static_cast<uint32_t>(codec_);
+    const size_t headerAt = out.size();
+    out.resize(headerAt + sizeof(block));
+
+    bool encoded = false;
+#if defined(USE_ZLIB)
+    const size_t storedSize = count * sizeof(float);
+    if (codec_ == SnapshotCodec::ShuffleZlib)
+    {
+      shuffle(values, count);
+      encoded = deflate(out, storedSize);
+    }
+    else if (codec_ == SnapshotCodec::Quantized)
+    {
+      encoded = quantize(values, count) && deflate(out, storedSize);
+    }
+#endif
+    if (!encoded)
+    {
+      block.mode = static_cast<uint32_t>(SnapshotCodec::None);
+      const uint8_t* bytes = reinterpret_cast<const uint8_t*>(values);
+      out.insert(out.end(), bytes, bytes + count * sizeof(float));
+    }
+    block.size = out.size() - headerAt - sizeof(block);
+    std::memcpy(out.data() + headerAt, &block, sizeof(block));
+  }
+
+ private:
+  // bytes of the floats, byte k of every value together
+  void shuffle(const float* values, size_t count)
+  {
+    const uint8_t* bytes = reinterpret_cast<const uint8_t*>(values);
+    scratch_.resize(count * sizeof(float));
+    for (size_t k = 0; k < sizeof(float); k++)
+    {
+      uint8_t* plane = scratch_.data() + k * count;
+      for (size_t i = 0; i < count; i++)
+      {
+        plane[i] = bytes[i * sizeof(float) + k];
+      }
+    }
+  }
+
+  // zigzag varints of the deltas of the quantized values
+  bool quantize(const float* values, size_t count)
+  {
+    const double step = 2 * tolerance_;
+    // beyond 2^52 steps doubles no longer hold every integer
+    const double limit = 4503599627370496.0;
+    scratch_.clear();
+    int64_t previous = 0;
+    for (size_t i = 0; i < count; i++)
+    {
+      const double q = std::nearbyint(values[i] / step);
+      if (!(std::fabs(q) < limit)) return false;
+      const int64_t delta = static_cast<int64_t>(q) - previous;
+      previous = static_cast<int64_t>(q);
+      uint64_t zigzag = (static_cast<uint64_t>(delta) << 1) ^
+                        static_cast<uint64_t>(delta >> 63);
+      while (zigzag >= 0x80)
+      {
+        scratch_.push_back(static_cast<uint8_t>(zigzag) | 0x80);
+        zigzag >>= 7;
+      }
+      scratch_.push_back(static_cast<uint8_t>(zigzag));
+    }
+    return true;
+  }
+
+#if defined(USE_ZLIB)
+  // compress scratch_ at the end of out, false if not below maxSize bytes
+  bool deflate(std::vector<uint8_t>& out, size_t maxSize)
+  {
+    const size_t at = out.size();
+    uLongf size = compressBound(scratch_.size());
+    out.resize(at + size);
+    const int status = compress2(out.data() + at, &size, scratch_.data(),
+                                 scratch_.size(), Z_BEST_SPEED);
+    if (status != Z_OK || size >= maxSize)
+    {
+      out.resize(at);
+      return false;
+    }
+    out.resize(at + size);
+    return true;
+  }
+#endif
+
+  SnapshotCodec codec_;
+  double tolerance_;
+  std::vector<uint8_t> scratch_;
+};
+
+}  // namespace insitu
+
+#endif  // SNAPSHOT_CODEC_HPP_
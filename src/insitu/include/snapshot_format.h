@@ -0,0 +1,127 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  snapshot_format.h: self-describing binary layout for field snapshots
+//
+//  A snapshot file is a fixed size SnapshotHeader followed by the float32
+//  values of a box of the node grid, x fastest then y then z. The same
+//  layout is used for full cubes (origin 0, dims = whole grid) and for
+//  slices (one of the dims is 1).
+//
+//  Bricked snapshots (brickDims set, version 3) cut the box in bricks of
+//  brickDims nodes (smaller at the upper edges), numbered x fastest then y
+//  then z. The header is followed by nbBricks + 1 uint64 file offsets,
+//  brick b spanning [offsets[b], offsets[b + 1]), then by the bricks: the
+//  brick values x fastest, or one compressed block when a codec is set.
+//************************************************************************
+
+#ifndef SNAPSHOT_FORMAT_HPP_
+#define SNAPSHOT_FORMAT_HPP_
+
+#include <cstdint>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <stdexcept>
+#include <string>
+
+namespace insitu
+{
+
+/**
+ * @brief On-disk format of the snapshots written by the proxies.
+ */
+enum class SnapshotFormat
+{
+  Text,  ///< legacy whitespace separated ASCII
+  Raw    ///< SnapshotHeader + contiguous float32 buffer
+};
+
+inline SnapshotFormat parseSnapshotFormat(const std::string& name)
+{
+  if (name == "text") return SnapshotFormat::Text;
+  if (name == "raw") return SnapshotFormat::Raw;
+
+  throw std::invalid_argument("Snapshot format must be text or raw, got " +
+                              name);
+}
+
+/**
+ * @brief Header of a raw snapshot file (128 bytes, native endianness).
+ *
+ * Readers must use headerSize to find the first value, so fields can be
+ * appended in the reserved area without breaking older files. Version 2
+ * files are compressed (codec != 0, see snapshot_codec.h), version 3
+ * files are bricked, compressed or not.
+ */
+struct SnapshotHeader
+{
+  char magic[8] = {'S', 'E', 'M', 'S', 'N', 'A', 'P', '\0'};
+  uint32_t version = 1;
+  uint32_t headerSize = 128;
+  int32_t dims[3] = {0, 0, 0};      ///< number of stored nodes per axis
+  int32_t origin[3] = {0, 0, 0};    ///< first stored node in the full grid
+  int32_t gridDims[3] = {0, 0, 0};  ///< nodes per axis of the full grid
+  int32_t order = 0;                ///< polynomial order of the mesh
+  int32_t timestep = 0;             ///< time sample of the snapshot
+  char dtype[4] = {'<', 'f', '4', '\0'};  ///< numpy dtype of the values
+  uint32_t codec = 0;                     ///< SnapshotCodec, 0 for plain values
+  uint32_t blockValues = 0;               ///< values per compressed block
+  double tolerance = 0;              ///< absolute error bound of a lossy codec
+  int32_t brickDims[3] = {0, 0, 0};  ///< nodes per brick, 0 if not bricked
+  uint8_t reserved[36] = {0};
+
+  /// Number of values of the box.
+  size_t count() const
+  {
+    return static_cast<size_t>(dims[0]) * dims[1] * dims[2];
+  }
+
+  /// Number of bricks along axis d of a bricked snapshot.
+  int nbBricks(int d) const
+  {
+    return (dims[d] + brickDims[d] - 1) / brickDims[d];
+  }
+};
+
+static_assert(sizeof(SnapshotHeader) == 128,
+              "SnapshotHeader must stay 128 bytes");
+
+/**
+ * @brief Header describing a box of a grid of gridDims nodes.
+ */
+inline SnapshotHeader makeSnapshotHeader(const int gridDims[3],
+                                         const int origin[3], const int dims[3],
+                                         int order, int timestep)
+{
+  SnapshotHeader header;
+  for (int d = 0; d < 3; d++)
+  {
+    header.gridDims[d] = gridDims[d];
+    header.origin[d] = origin[d];
+    header.dims[d] = dims[d];
+  }
+  header.order = order;
+  header.timestep = timestep;
+  return header;
+}
+
+/**
+ * @brief Write a raw snapshot: the header then all values in one write.
+ * @return false if the file could not be written
+ */
+inline bool writeRawSnapshot(const std::filesystem::path& filename,
+                             const SnapshotHeader& header, const float* values)
+{
+  std::ofstream out(filename, std::ios::binary);
+  if (!out) return false;
+
+  out.write(reinterpret_cast<const char*>(&header), sizeof(header));
+  out.write(reinterpret_cast<const char*>(values),
+            header.count() * sizeof(float));
+  return static_cast<bool>(out);
+}
+
+}  // namespace insitu
+
+#endif  // SNAPSHOT_FORMAT_HPP_
@@ -0,0 +1,347 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  snapshot_writer.h: bulk copy and bulk write of snapshots
+//
+//  FieldGather copies a range or a list of nodes of one column of a field
+//  into a contiguous host buffer: with Kokkos the copy is done on the
+//  device and brought back with a single deep_copy. SnapshotWriter writes such
+//  a buffer, the text format being built a chunk of whole rows at a time in a
+//  reused buffer instead of one stream insertion per node, and raw snapshots
+//  being compressed block by block when a codec is set, or cut in bricks when a
+//  brick size is set.
+//************************************************************************
+
+#ifndef SNAPSHOT_WRITER_HPP_
+#define SNAPSHOT_WRITER_HPP_
+
+#include <snapshot_codec.h>
+#include <snapshot_format.h>
+
+#include <algorithm>
+#include <charconv>
+#include <chrono>
+#include <cstddef>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <vector>
+
+#if defined(USE_KOKKOS)
+#include <Kokkos_Core.hpp>
+#endif
+
+namespace insitu
+{
+
+/**
+ * @brief Copy field(first + n, column), n < count, into a host buffer.
+ *
+ * Owns the device staging view, which is reused from one call to the next;
+ * meant to be used by the thread driving the solver.
+ */
+template <typename ArrayType>
+class FieldGather
+{
+ public:
+  void gather(const ArrayType& field, int column, size_t first, size_t count,
+              float* out)
+  {
+#if defined(USE_KOKKOS)
+    if (staging_.extent(0) < count)
+    {
+      staging_ = StagingView(
+          Kokkos::view_alloc(Kokkos::WithoutInitializing, "snapshotGather"),
+          count);
+    }
+    StagingView staging = staging_;
+    Kokkos::parallel_for(
+        "snapshotGather", count, KOKKOS_LAMBDA(const size_t n) {
+          staging(n) = field(first + n, column);
+        });
+    Kokkos::View<float*, Kokkos::HostSpace,
+                 Kokkos::MemoryTraits<Kokkos::Unmanaged>>
+        host(out, count);
+    Kokkos::deep_copy(
+        host, Kokkos::subview(staging, std::make_pair(size_t(0), count)));
+#else
+#pragma omp parallel for
+    for (size_t n = 0; n < count; n++)
+    {
+      out[n] = field(first + n, column);
+    }
+#endif
+  }
+
+  /**
+   * @brief Copy field(nodes[n], column) into out[n] for every n.
+   * @param version identifies the content of nodes: the list is sent to the
+   *        device again only when it changes
+   */
+  void gather(const ArrayType& field, int column,
+              const std::vector<size_t>& nodes, size_t version, float* out)
+  {
+    const size_t count = nodes.size();
+#if defined(USE_KOKKOS)
+    if (nodes_version_ != version || nodes_.extent(0) != count)
+    {
+      nodes_ = NodesView(Kokkos::view_alloc(Kokkos::WithoutInitializing,
+                                            "snapshotGatherNodes"),
+                         count);
+      Kokkos::deep_copy(nodes_,
+                        Kokkos::View<const size_t*, Kokkos::HostSpace,
+                                     Kokkos::MemoryTraits<Kokkos::Unmanaged>>(
+                            nodes.data(), count));
+      nodes_version_ = version;
+    }
+    if (staging_.extent(0) < count)
+    {
+      staging_ = StagingView(
+          Kokkos::view_alloc(Kokkos::WithoutInitializing, "snapshotGather"),
+          count);
+    }
+    StagingView staging = staging_;
+    NodesView devNodes = nodes_;
+    Kokkos::parallel_for(
+        "snapshotGatherNodes", count, KOKKOS_LAMBDA(const size_t n) {
+          staging(n) = field(devNodes(n), column);
+        });
+    Kokkos::View<float*, Kokkos::HostSpace,
+                 Kokkos::MemoryTraits<Kokkos::Unmanaged>>
+        host(out, count);
+    Kokkos::deep_copy(
+        host, Kokkos::subview(staging, std::make_pair(size_t(0), count)));
+#else
+    (void)version;
+#pragma omp parallel for
+    for (size_t n = 0; n < count; n++)
+    {
+      out[n] = field(nodes[n], column);
+    }
+#endif
+  }
+
+ private:
+#if defined(USE_KOKKOS)
+  using StagingView = Kokkos::View<float*, typename ArrayType::memory_space>;
+  using NodesView = Kokkos::View<size_t*, typename ArrayType::memory_space>;
+  StagingView staging_;
+  NodesView nodes_;
+  size_t nodes_version_ = 0;
+#endif
+};
+
+/**
+ * @brief Write snapshot buffers, raw or text, with a few large writes.
+ *
+ * The text and compression buffers are kept between calls; a writer must
+ * only be used by one thread at a time (the time loop, or the async writer
+ * thread).
+ */
+class SnapshotWriter
+{
+ public:
+  /// Text is written each time about this many bytes are formatted.
+  static constexpr size_t kChunkBytes = size_t(4) << 20;
+  /// Values per block of a compressed snapshot (256 KiB of float32).
+  static constexpr size_t kBlockValues = size_t(1) << 16;
+
+  SnapshotWriter() : SnapshotWriter(SnapshotCodec::None, 0) {}
+
+  /**
+   * @param codec compression of the raw snapshots
+   * @param tolerance absolute error bound of SnapshotCodec::Quantized
+   * @param brick nodes per brick side of bricked snapshots, 0 to write the
+   *        values contiguously
+   */
+  SnapshotWriter(SnapshotCodec codec, double tolerance, int brick = 0)
+      : codec_(codec),
+        tolerance_(tolerance),
+        brick_(brick),
+        encoder_(codec, tolerance)
+  {
+  }
+
+  /**
+   * @brief Write a raw snapshot, compressed if the writer has a codec and
+   *        bricked if it has a brick size.
+   */
+  bool writeRaw(const std::filesystem::path& filename,
+                const SnapshotHeader& header, const float* values)
+  {
+    const size_t count = header.count();
+    rawBytes_ += count * sizeof(float);
+    if (brick_ > 0) return writeBricked(filename, header, values);
+    if (codec_ == SnapshotCodec::None)
+    {
+      storedBytes_ += count * sizeof(float);
+      return writeRawSnapshot(filename, header, values);
+    }
+
+    const auto start = std::chrono::steady_clock::now();
+    SnapshotHeader compressed = header;
+    compressed.version = 2;
+    compressed.codec = static_cast<uint32_t>(codec_);
+    compressed.blockValues = kBlockValues;
+    compressed.tolerance = tolerance_;
+    encoded_.clear();
+    for (size_t first = 0; first < count; first += kBlockValues)
+    {
+      encoder_.encode(values + first, std::min(kBlockValues, count - first),
+                      encoded_);
+    }
+    encodeMicroseconds_ +=
+        std::chrono::duration_cast<std::chrono::microseconds>(
+            std::chrono::steady_clock::now() - start)
+            .count();
+    storedBytes_ += encoded_.size();
+
+    std::ofstream out(filename, std::ios::binary);
+    if (!out) return false;
+    out.write(reinterpret_cast<const char*>(&compressed), sizeof(compressed));
+    out.write(reinterpret_cast<const char*>(encoded_.data()), encoded_.size());
+    return static_cast<bool>(out);
+  }
+
+  /// Size of the values given to writeRaw, in bytes.
+  size_t rawBytes() const { return rawBytes_; }
+  /// Size of these values once encoded, block headers included.
+  size_t storedBytes() const { return storedBytes_; }
+  /// Time spent compressing (and cutting in bricks).
+  long long encodeMicroseconds() const { return encodeMicroseconds_; }
+
+  /**
+   * @brief Write values as text, rowLength values per line.
+   *
+   * Same output as streaming every value followed by a space, with a
+   * newline between rows: 6 significant digits, like std::ostream.
+   */
+  bool writeText(const std::filesystem::path& filename, const float* values,
+                 size_t count, size_t rowLength)
+  {
+    std::ofstream out(filename, std::ios::binary);
+    if (!out) return false;
+
+    // a chunk is flushed after the row reaching kChunkBytes; a value takes
+    // at most 12 chars (-1.17549e-38) and its space
+    constexpr size_t kMaxValueChars = 16;
+    text_.resize(kChunkBytes + rowLength * kMaxValueChars + 1);
+    char* const begin = text_.data();
+    char* const end = begin + text_.size();
+    char* cursor = begin;
+
+    for (size_t row = 0; row * rowLength < count; row++)
+    {
+      if (row > 0) *cursor++ = '\n';
+      const size_t last = std::min(count, (row + 1) * rowLength);
+      for (size_t n = row * rowLength; n < last; n++)
+      {
+        cursor =
+            std::to_chars(cursor, end, values[n], std::chars_format::general, 6)
+                .ptr;
+        *cursor++ = ' ';
+      }
+      if (static_cast<size_t>(cursor - begin) >= kChunkBytes)
+      {
+        out.write(begin, cursor - begin);
+        cursor = begin;
+      }
+    }
+    out.write(begin, cursor - begin);
+    return static_cast<bool>(out);
+  }
+
+ private:
+  bool writeBricked(const std::filesystem::path& filename,
+                    const SnapshotHeader& header, const float* values)
+  {
+    const auto start = std::chrono::steady_clock::now();
+    SnapshotHeader bricked = header;
+    bricked.version = 3;
+    bricked.codec = static_cast<uint32_t>(codec_);
+    bricked.tolerance = tolerance_;
+    for (int d = 0; d < 3; d++)
+    {
+      bricked.brickDims[d] = std::min(brick_, std::max(header.dims[d], 1));
+    }
+    bricked.blockValues = static_cast<uint32_t>(bricked.brickDims[0]) *
+                          bricked.brickDims[1] * bricked.brickDims[2];
+
+    const int nb[3] = {bricked.nbBricks(0), bricked.nbBricks(1),
+                       bricked.nbBricks(2)};
+    offsets_.resize(size_t(nb[0]) * nb[1] * nb[2] + 1);
+    const uint64_t first = sizeof(bricked) + offsets_.size() * sizeof(uint64_t);
+    const size_t nx = header.dims[0];
+    const size_t ny = header.dims[1];
+    brick_values_.resize(bricked.blockValues);
+    encoded_.clear();
+
+    size_t b = 0;
+    for (int bz = 0; bz < nb[2]; bz++)
+      for (int by = 0; by < nb[1]; by++)
+        for (int bx = 0; bx < nb[0]; bx++, b++)
+        {
+          const int lo[3] = {bx * bricked.brickDims[0],
+                             by * bricked.brickDims[1],
+                             bz * bricked.brickDims[2]};
+          int n[3];
+          for (int d = 0; d < 3; d++)
+          {
+            n[d] = std::min(bricked.brickDims[d], header.dims[d] - lo[d]);
+          }
+
+          // one x row of the brick at a time
+          float* row = brick_values_.data();
+          for (int z = 0; z < n[2]; z++)
+            for (int y = 0; y < n[1]; y++, row += n[0])
+            {
+              const size_t at = ((lo[2] + z) * ny + lo[1] + y) * nx + lo[0];
+              std::memcpy(row, values + at, n[0] * sizeof(float));
+            }
+
+          offsets_[b] = first + encoded_.size();
+          const size_t count = size_t(n[0]) * n[1] * n[2];
+          if (codec_ == SnapshotCodec::None)
+          {
+            const uint8_t* bytes =
+                reinterpret_cast<const uint8_t*>(brick_values_.data());
+            encoded_.insert(encoded_.end(), bytes,
+                            bytes + count * sizeof(float));
+          }
+          else
+          {
+            encoder_.encode(brick_values_.data(), count, encoded_);
+          }
+        }
+    offsets_[b] = first + encoded_.size();
+    encodeMicroseconds_ +=
+        std::chrono::duration_cast<std::chrono::microseconds>(
+            std::chrono::steady_clock::now() - start)
+            .count();
+    storedBytes_ += offsets_.size() * sizeof(uint64_t) + encoded_.size();
+
+    std::ofstream out(filename, std::ios::binary);
+    if (!out) return false;
+    out.write(reinterpret_cast<const char*>(&bricked), sizeof(bricked));
+    out.write(reinterpret_cast<const char*>(offsets_.data()),
+              offsets_.size() * sizeof(uint64_t));
+    out.write(reinterpret_cast<const char*>(encoded_.data()), encoded_.size());
+    return static_cast<bool>(out);
+  }
+
+  SnapshotCodec codec_;
+  double tolerance_;
+  int brick_;
+  SnapshotEncoder encoder_;
+  std::vector<uint8_t> encoded_;
+  std::vector<uint64_t> offsets_;
+  std::vector<float> brick_values_;
+  std::vector<char> text_;
+  size_t rawBytes_ = 0;
+  size_t storedBytes_ = 0;
+  long long encodeMicroseconds_ = 0;
+};
+
+}  // namespace insitu
+
+#endif  // SNAPSHOT_WRITER_HPP_
@@ -0,0 +1,138 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  stft.h: short-time Fourier transform of receiver traces, computed while
+//  the samples are produced
+//
+//  Each receiver keeps only the last `window` samples in a ring buffer.
+//  Every `hop` samples (once the first window is full) the window of every
+//  receiver is tapered, transformed with one shared RealFFTPlan and handed
+//  to a callback, so the trace history never has to be stored.
+//************************************************************************
+
+#ifndef STFT_HPP_
+#define STFT_HPP_
+
+#include <fft.h>
+
+#include <cmath>
+#include <functional>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Window applied to the samples before each transform.
+ */
+enum class Taper
+{
+  Rect,
+  Hann,
+  Hamming
+};
+
+inline Taper parseTaper(const std::string& name)
+{
+  if (name == "rect") return Taper::Rect;
+  if (name == "hann") return Taper::Hann;
+  if (name == "hamming") return Taper::Hamming;
+
+  throw std::invalid_argument("Taper must be rect, hann or hamming, got " +
+                              name);
+}
+
+/**
+ * @brief Periodic taper coefficients (same as scipy.signal.get_window).
+ */
+inline std::vector<double> makeTaper(Taper taper, int length)
+{
+  const double PI = std::acos(-1.0);
+  std::vector<double> coefs(length, 1.0);
+  for (int n = 0; n < length; n++)
+  {
+    const double c = std::cos(2.0 * PI * n / length);
+    if (taper == Taper::Hann) coefs[n] = 0.5 - 0.5 * c;
+    if (taper == Taper::Hamming) coefs[n] = 0.54 - 0.46 * c;
+  }
+  return coefs;
+}
+
+class StreamingSTFT
+{
+ public:
+  /**
+   * @brief Called for every receiver and frame with spectrumSize() bins.
+   * @param receiver index of the receiver
+   * @param frame frame number, starting at 0
+   * @param firstSample time sample of the first value of the window
+   */
+  using FrameCallback = std::function<void(
+      int receiver, int frame, int firstSample, const Complex* spectrum)>;
+
+  StreamingSTFT(int nbReceivers, int window, int hop, Taper taper)
+      : nbReceivers_(nbReceivers),
+        window_(window),
+        hop_(hop),
+        taper_(makeTaper(taper, window)),
+        plan_(window),
+        ring_(static_cast<size_t>(nbReceivers) * window, 0.f),
+        frame_(window),
+        spectrum_(plan_.spectrumSize())
+  {
+    if (hop < 1) throw std::invalid_argument("STFT hop must be >= 1");
+  }
+
+  int window() const { return window_; }
+  int hop() const { return hop_; }
+  int spectrumSize() const { return plan_.spectrumSize(); }
+
+  /**
+   * @brief Add the next time sample of every receiver.
+   * @param values one value per receiver
+   * @param onFrame called for each receiver when a frame is complete
+   */
+  void push(const float* values, const FrameCallback& onFrame)
+  {
+    const int slot = samples_ % window_;
+    for (int r = 0; r < nbReceivers_; r++)
+    {
+      ring_[static_cast<size_t>(r) * window_ + slot] = values[r];
+    }
+    samples_++;
+
+    if (samples_ < window_ || (samples_ - window_) % hop_ != 0) return;
+
+    // oldest sample of the window is the one that will be overwritten next
+    const int oldest = samples_ % window_;
+    for (int r = 0; r < nbReceivers_; r++)
+    {
+      const float* ring = ring_.data() + static_cast<size_t>(r) * window_;
+      for (int n = 0; n < window_; n++)
+      {
+        frame_[n] = ring[(oldest + n) % window_] * taper_[n];
+      }
+      plan_.forward(frame_.data(), spectrum_.data());
+      onFrame(r, frames_, samples_ - window_, spectrum_.data());
+    }
+    frames_++;
+  }
+
+ private:
+  int nbReceivers_;
+  int window_;
+  int hop_;
+  std::vector<double> taper_;
+  RealFFTPlan plan_;
+  std::vector<float> ring_;  // window_ samples per receiver
+  std::vector<double> frame_;
+  std::vector<Complex> spectrum_;
+  int samples_ = 0;
+  int frames_ = 0;
+};
+
+}  // namespace insitu
+
+#endif  // STFT_HPP_
@@ -0,0 +1,138 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  stft_writer.h: short-time spectra of every receiver in one binary file
+//
+//  An STFT file is an STFTHeader, the x, y, z coordinates of every
+//  receiver as float32 (padded with zeros up to headerSize, a multiple of
+//  64 bytes), then the frames in order. A frame is nbReceivers rows of
+//  nbBins complex values (float32 real and imaginary parts), one row per
+//  receiver in the order of the coordinates. Frame f starts at time sample
+//  f * hop. The frame count is not stored: frames are appended a batch at
+//  a time and readers count the complete frames from the file size.
+//************************************************************************
+
+#ifndef STFT_WRITER_HPP_
+#define STFT_WRITER_HPP_
+
+#include <fft.h>
+
+#include <array>
+#include <cerrno>
+#include <complex>
+#include <cstdint>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Fixed part of the header of an STFT file (32 bytes, native
+ *        endianness).
+ */
+struct STFTHeader
+{
+  char magic[8] = {'S', 'E', 'M', 'S', 'T', 'F', 'T', '\0'};
+  uint32_t version = 1;
+  uint32_t headerSize = 0;  ///< offset of the first frame
+  uint32_t nbReceivers = 0;
+  uint32_t nbBins = 0;  ///< spectrum values per receiver and frame
+  uint32_t window = 0;  ///< samples per window
+  uint32_t hop = 0;     ///< samples between two frames
+};
+
+static_assert(sizeof(STFTHeader) == 32, "STFTHeader must stay 32 bytes");
+
+class STFTWriter
+{
+ public:
+  /**
+   * @brief Create the file and write its header.
+   * @param nbBins first bins of each spectrum kept
+   * @param batchFrames frames buffered before being written
+   * @throw std::runtime_error if the file cannot be written
+   */
+  STFTWriter(const std::filesystem::path& filename,
+             const std::vector<std::array<float, 3>>& receivers, int window,
+             int hop, int nbBins, int batchFrames = 8)
+      : filename_(filename),
+        nbReceivers_(receivers.size()),
+        nbBins_(nbBins),
+        batchFrames_(batchFrames),
+        buffer_(static_cast<size_t>(batchFrames) * receivers.size() * nbBins)
+  {
+    if (batchFrames < 1)
+      throw std::invalid_argument("STFTWriter batchFrames must be >= 1");
+    out_.open(filename, std::ios::binary);
+    if (!out_) fail("opening");
+
+    STFTHeader header;
+    const size_t coordsSize = receivers.size() * 3 * sizeof(float);
+    header.headerSize = (sizeof(header) + coordsSize + 63) / 64 * 64;
+    header.nbReceivers = receivers.size();
+    header.nbBins = nbBins;
+    header.window = window;
+    header.hop = hop;
+    out_.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    out_.write(reinterpret_cast<const char*>(receivers.data()), coordsSize);
+    const std::vector<char> padding(
+        header.headerSize - sizeof(header) - coordsSize, 0);
+    out_.write(padding.data(), padding.size());
+    if (!out_) fail("writing");
+  }
+
+  /**
+   * @brief Add the spectrum of a receiver. The receivers of a frame come
+   *        in order, a frame being complete with its last receiver.
+   */
+  void add(int receiver, const Complex* spectrum)
+  {
+    std::complex<float>* row =
+        buffer_.data() +
+        (static_cast<size_t>(buffered_) * nbReceivers_ + receiver) * nbBins_;
+    for (int k = 0; k < nbBins_; k++)
+    {
+      row[k] = std::complex<float>(spectrum[k]);
+    }
+    if (receiver == nbReceivers_ - 1 && ++buffered_ == batchFrames_) flush();
+  }
+
+  /**
+   * @brief Write the complete frames buffered so far.
+   * @throw std::runtime_error if they cannot be written
+   */
+  void flush()
+  {
+    if (buffered_ == 0) return;
+    out_.write(reinterpret_cast<const char*>(buffer_.data()),
+               static_cast<std::streamsize>(buffered_) * nbReceivers_ *
+                   nbBins_ * sizeof(std::complex<float>));
+    out_.flush();
+    buffered_ = 0;
+    if (!out_) fail("writing");
+  }
+
+ private:
+  [[noreturn]] void fail(const char* action) const
+  {
+    throw std::runtime_error("Error " + std::string(action) + " file " +
+                             filename_.string() + ": " + std::strerror(errno));
+  }
+
+  std::filesystem::path filename_;
+  std::ofstream out_;
+  int nbReceivers_;
+  int nbBins_;
+  int batchFrames_;
+  std::vector<std::complex<float>> buffer_;
+  int buffered_ = 0;  ///< complete frames in buffer_
+};
+
+}  // namespace insitu
+
+#endif  // STFT_WRITER_HPP_
@@ -0,0 +1,152 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  timeseries.h: appendable columnar file for per-step scalar diagnostics
+//
+//  A time-series file is a TimeSeriesHeader, the column names (each one
+//  NUL terminated, padded with NULs up to headerSize), then any number of
+//  blocks. A block is an int64 row count r followed by every column in
+//  turn, r float64 values each. Rows are buffered in memory and written a
+//  block at a time; a value not set for a row is NaN.
+//************************************************************************
+
+#ifndef TIMESERIES_HPP_
+#define TIMESERIES_HPP_
+
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <limits>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace insitu
+{
+
+/**
+ * @brief Fixed part of the header of a time-series file (32 bytes, native
+ *        endianness).
+ */
+struct TimeSeriesHeader
+{
+  char magic[8] = {'S', 'E', 'M', 'T', 'S', 'E', 'R', '\0'};
+  uint32_t version = 1;
+  uint32_t headerSize = 0;  ///< offset of the first block
+  uint32_t nbColumns = 0;
+  uint32_t blockRows = 0;  ///< rows per block, the last one may be shorter
+  uint8_t reserved[8] = {0};
+};
+
+static_assert(sizeof(TimeSeriesHeader) == 32,
+              "TimeSeriesHeader must stay 32 bytes");
+
+class TimeSeriesWriter
+{
+ public:
+  /**
+   * @brief Create the file and write its header.
+   * @param blockRows Number of rows buffered before a block is ready.
+   */
+  TimeSeriesWriter(const std::filesystem::path& filename,
+                   const std::vector<std::string>& columns,
+                   int blockRows = 1024)
+      : columns_(columns),
+        blockRows_(blockRows),
+        row_(columns.size(), std::numeric_limits<double>::quiet_NaN())
+  {
+    if (blockRows < 1)
+      throw std::invalid_argument("TimeSeriesWriter blockRows must be >= 1");
+    out_.open(filename, std::ios::binary);
+    if (!out_)
+      throw std::runtime_error("Error opening file " + filename.string());
+
+    std::string names;
+    for (const std::string& name : columns_) names += name + '\0';
+    names.resize((names.size() + 7) / 8 * 8, '\0');
+
+    TimeSeriesHeader header;
+    header.headerSize = sizeof(header) + names.size();
+    header.nbColumns = columns_.size();
+    header.blockRows = blockRows_;
+    out_.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    out_.write(names.data(), names.size());
+    pending_.reserve(columns_.size() * blockRows_);
+  }
+
+  TimeSeriesWriter(const TimeSeriesWriter&) = delete;
+  TimeSeriesWriter& operator=(const TimeSeriesWriter&) = delete;
+
+  /// Write the rows still buffered.
+  ~TimeSeriesWriter() { writeBlock(takeBlock()); }
+
+  /// Index of a column, to be given to set().
+  int column(const std::string& name) const
+  {
+    for (size_t c = 0; c < columns_.size(); c++)
+    {
+      if (columns_[c] == name) return c;
+    }
+    throw std::invalid_argument("No time-series column named " + name);
+  }
+
+  /// Set a value of the current row.
+  void set(int column, double value) { row_[column] = value; }
+
+  /**
+   * @brief Append the current row to the block and start a new one.
+   * @return true when the block is full, see takeBlock()
+   */
+  bool endRow()
+  {
+    pending_.insert(pending_.end(), row_.begin(), row_.end());
+    row_.assign(columns_.size(), std::numeric_limits<double>::quiet_NaN());
+    return pending_.size() >= columns_.size() * blockRows_;
+  }
+
+  /**
+   * @brief Remove the buffered rows and return them as a block, row-major.
+   *
+   * The block can be written later, possibly from another thread, with
+   * writeBlock(); blocks must be written in the order they were taken.
+   */
+  std::vector<double> takeBlock()
+  {
+    std::vector<double> block;
+    block.swap(pending_);
+    pending_.reserve(columns_.size() * blockRows_);
+    return block;
+  }
+
+  /// Write a block returned by takeBlock(), transposed to columns.
+  void writeBlock(const std::vector<double>& block)
+  {
+    const size_t nbColumns = columns_.size();
+    const int64_t nbRows = nbColumns ? block.size() / nbColumns : 0;
+    if (nbRows == 0) return;
+
+    std::vector<double> columnar(block.size());
+    for (int64_t r = 0; r < nbRows; r++)
+    {
+      for (size_t c = 0; c < nbColumns; c++)
+      {
+        columnar[c * nbRows + r] = block[r * nbColumns + c];
+      }
+    }
+    out_.write(reinterpret_cast<const char*>(&nbRows), sizeof(nbRows));
+    out_.write(reinterpret_cast<const char*>(columnar.data()),
+               columnar.size() * sizeof(double));
+    out_.flush();
+  }
+
+ private:
+  std::ofstream out_;
+  std::vector<std::string> columns_;
+  size_t blockRows_;
+  std::vector<double> row_;
+  std::vector<double> pending_;  // full rows not written yet
+};
+
+}  // namespace insitu
+
+#endif  // TIMESERIES_HPP_
@@ -4,7 +4,11 @@
 // main.cpp: this main file is simply a driver
 //************************************************************************
 
+#include <analysis_pipeline.h>
+
 #include <fd/FDTDinit.hpp>
+#include <fd/FDTDsnapshot.hpp>
+#include <memory>
 
 int main(int argc, char *argv[])
 {
@@ -46,6 +50,28 @@ int main(int argc, char *argv[])
     cout << "|  Running FDTD Application ...       " << endl;
     cout << "+================================= \n" << endl;
 
+    // in-situ analyses, run on the field of the current step (i2 after the
+    // swap); they read only a few nodes of pnGlobal where it lives, so the
+    // field is never staged on the host
+    insitu::AnalysisPipeline pipeline(insitu::StepField(
+        static_cast<size_t>(myGrids.nx) * myGrids.ny * myGrids.nz, {}));
+    pipeline.add("print", insitu::Schedule{50}, [&](insitu::StepField &step) {
+      myFDTDUtils.printSource(myGrids, myModels.pnGlobal, step.timestep(),
+                              myInit.i2);
+    });
+    std::unique_ptr<FDTDSnapshot> snapshot;
+    if (myInit.saveSnapShots)
+    {
+      snapshot = std::make_unique<FDTDSnapshot>(myGrids, myInit.snapshotBox,
+                                                myInit.snapshotDir);
+    }
+    pipeline.add(
+        "snapshot",
+        insitu::Schedule{myInit.saveSnapShots ? myInit.snapshotInterval : 0},
+        [&](insitu::StepField &step) {
+          snapshot->write(myModels.pnGlobal, step.timestep(), myInit.i2);
+        });
+
     // start timer
     time_point<system_clock> startRunTime = system_clock::now();
 
@@ -77,8 +103,7 @@ int main(int argc, char *argv[])
       startOutputTime = system_clock::now();
       swap(myInit.i1, myInit.i2);
       // print infos and save wavefields
-      myFDTDUtils.output(myGrids, myModels.pnGlobal, itSample, myInit.i2,
-                         myInit.saveSnapShots);
+      pipeline.run(itSample);
       totalOutputTime += system_clock::now() - startOutputTime;
     }
 
@@ -109,6 +134,11 @@ int main(int argc, char *argv[])
          << endl;
     cout << "---- Elapsed Output Time : " << outputtime_ms / 1E6 << " seconds."
          << endl;
+    for (const auto &[name, time_us] : pipeline.timings())
+    {
+      cout << "---- Elapsed " << name << " In-Situ Time : " << time_us / 1E6
+           << " seconds." << endl;
+    }
     cout << "------------------------------------------------ " << endl;
 
 #ifdef USE_KOKKOS
@@ -0,0 +1,106 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  node_locator.h: closest mesh node lookup for receivers
+//
+//************************************************************************
+
+#ifndef NODE_LOCATOR_HPP_
+#define NODE_LOCATOR_HPP_
+
+#include <model.h>
+
+#include <array>
+#include <memory>
+#include <string>
+#include <vector>
+
+using Point3 = std::array<float, 3>;
+
+/**
+ * @brief Find the closest mesh node of query points.
+ *
+ * Built once per mesh, then used for any number of points.
+ */
+class NodeLocator
+{
+ public:
+  virtual ~NodeLocator() = default;
+
+  /**
+   * @brief Global index of the node closest to point.
+   */
+  virtual int locate(const Point3& point) const = 0;
+
+  /**
+   * @brief Closest node of every point, in the same order.
+   */
+  std::vector<int> locate(const std::vector<Point3>& points) const;
+};
+
+/**
+ * @brief Closed-form lookup on a cartesian grid of nElems[d] * order + 1
+ *        nodes per axis, numbered ix + iy * nx + iz * nx * ny.
+ *
+ * The closest node of a tensor grid is the closest node on each axis: the
+ * element containing the coordinate is computed directly and only its
+ * order + 1 nodes are compared.
+ */
+class StructNodeLocator : public NodeLocator
+{
+ public:
+  StructNodeLocator(const model::ModelApi<float, int>& mesh,
+                    const int nElems[3]);
+
+  int locate(const Point3& point) const override;
+  using NodeLocator::locate;
+
+ private:
+  int locateAxis(int dim, float coord) const;
+
+  int order_;
+  int nElems_[3];
+  int nNodes_[3];
+  float elementSize_[3];
+  std::vector<float> axisCoords_[3];  // node coordinates along each axis
+};
+
+/**
+ * @brief Lookup through a uniform grid of buckets, for meshes whose nodes
+ *        follow no known pattern.
+ *
+ * Nodes are sorted by bucket (about one node per bucket). A query visits
+ * shells of buckets of growing radius around its bucket and stops once the
+ * next shell is farther than the best node found.
+ */
+class BucketNodeLocator : public NodeLocator
+{
+ public:
+  explicit BucketNodeLocator(const model::ModelApi<float, int>& mesh);
+
+  int locate(const Point3& point) const override;
+  using NodeLocator::locate;
+
+ private:
+  int bucketCoord(int dim, float coord) const;
+  // search the buckets at Chebyshev distance radius of the center bucket
+  void searchShell(const Point3& point, const int center[3], int radius,
+                   int& best, float& bestDist2) const;
+
+  std::vector<float> coords_;  // x, y, z of every node
+  float min_[3];
+  float bucketSize_[3];
+  int nBuckets_[3];
+  std::vector<int> bucketStart_;  // CSR offsets, one more than buckets
+  std::vector<int> bucketNodes_;
+};
+
+/**
+ * @brief Read receiver coordinates, three values per line.
+ *
+ * The whole file is read at once and parsed with strtof. Lines which do not
+ * hold exactly three values are ignored.
+ */
+void parseSismoPoints(const std::string& path, std::vector<Point3>* points);
+
+#endif  // NODE_LOCATOR_HPP_
@@ -8,12 +8,30 @@
 #ifndef SEMPROXY_HPP_
 #define SEMPROXY_HPP_
 
+#include <analysis_pipeline.h>
+#include <async_writer.h>
 #include <data_type.h>
+#include <field_reduction.h>
+#include <image_writer.h>
 #include <model_struct.h>
 #include <model_unstruct.h>
+#include <profiler.h>
+#include <receiver_sampler.h>
+#include <sismo_gather.h>
+#include <slice_extractor.h>
+#include <snapshot_format.h>
+#include <snapshot_writer.h>
 #include <solver_factory.h>
+#include <stft.h>
+#include <stft_writer.h>
+#include <timeseries.h>
 #include <utils.h>
 
+#include <chrono>
+#include <filesystem>
+#include <fstream>
+#include <functional>
+#include <limits>
 #include <memory>
 #include <string>
 #include <variant>
@@ -74,13 +92,55 @@ class SEMproxy
    */
   float find_cfl_dt(float cfl_factor);
 
-  void saveSnapshot(int timestep);
-  void saveSliceSnapshotBin(int timestep, int dim2Coord);
-  void saveSliceSnapshotPPM(int timestep, int dim2Coord);
-  void statsAnalysis(int timestep);
-  void computeHistogram(int timestep);
+  // analyses of the pipeline, run on the field of one step
+  void saveSnapshot(insitu::StepField& step);
+  // save the slices due at this timestep, gathered together
+  void saveSlices(insitu::StepField& step);
+  void statsAnalysis(insitu::StepField& step);
+  void computeHistogram(insitu::StepField& step);
   void computeFourier();
  private:
+  /**
+   * @brief Run an output job on a copy of (part of) the pressure field.
+   *
+   * stage fills a buffer of count values from pnGlobal, then write is run on
+   * it: right away, or on the writer thread when --async-io is on.
+   */
+  void runOutput(size_t count,
+                 const std::function<void(std::vector<float>&)>& stage,
+                 insitu::AsyncWriter::Job write);
+  // same, on values already on the host (copied only for the writer thread)
+  void runOutput(const std::vector<float>& values,
+                 insitu::AsyncWriter::Job write);
+  // register the in-situ analyses, after everything they use
+  void initPipeline();
+  // open the short-time spectra file of the sismo receivers
+  void initSTFT(int window, int hop, const std::string& taper);
+  // histogram bins over [min, max] for the configured scale
+  insitu::HistogramBins makeHistogramBins(float min, float max) const;
+  // save the learned range and the cumulative histogram
+  void finalizeHistograms();
+  /**
+   * @brief Path of an output file of the given kind (snapshot,
+   *        slice_snapshot, histo, stats, fourier, sismos, trace).
+   *
+   * Under <output-dir>/<kind>/ when --output-dir is given, else in the
+   * default location of that kind of output.
+   */
+  std::filesystem::path outputFile(const std::string& kind,
+                                   const std::string& name) const;
+  // add the current row to the time series, write full blocks
+  void appendTimeSeriesRow();
+  // write the buffered time-series rows
+  void flushTimeSeries();
+  // copy pnGlobal(:,1) into buffer
+  void stageField(std::vector<float>& buffer);
+  // --slice specs, and --slice-snapshot as a Z slice, with their
+  // defaults resolved
+  std::vector<insitu::SliceSpec> sliceSpecs(const SemProxyOptions& opt) const;
+  // index of the node line along axis closest to coordinate
+  int nodeIndexAt(int axis, float coordinate) const;
+
   int i1 = 0;
   int i2 = 1;
 
@@ -92,20 +152,57 @@ class SEMproxy
   std::array<float, 3> rcv_coord_ = {0};
   float domain_size_[3] = {0};
 
+  // root of all outputs, empty for the default locations
+  std::string output_dir_;
   // snapshots
   bool is_snapshots_;
   int snap_time_interval_;
   std::string snap_folder_;
-  int slice_snapshots_coords_;
-  bool slice_snapshots_to_PPM_;
+  // slices to save, null without any
+  std::unique_ptr<insitu::SliceExtractor> slice_extractor_;
+  insitu::SnapshotFormat snapshot_format_;
+  // snapshot, histogram, stats and slices, sharing the field of each step
+  std::unique_ptr<insitu::AnalysisPipeline> pipeline_;
+  // asynchronous outputs, null when outputs are written in the time loop
+  std::unique_ptr<insitu::AsyncWriter> async_writer_;
+  std::vector<float> staging_;
+  // device to host copy of pnGlobal(:,1), used by the time loop
+  insitu::FieldGather<arrayReal> field_gather_;
+  // used by the thread running the write jobs
+  insitu::SnapshotWriter snapshot_writer_;
+  // colour images of the slices, used by the same thread
+  insitu::ImageWriter image_writer_;
   //stat analysis
   bool is_stats_analysis_;
   int stats_analysis_interval; 
+  // per-step scalars (stats, receiver, timings), one row per recorded step
+  std::unique_ptr<insitu::TimeSeriesWriter> timeseries_;
+  // a row at every step, not only at the stats steps
+  bool is_timeseries_every_step_;
   // histogram computation
   bool is_compute_histogram_;
   int compute_histogram_interval;
+  int histogram_nb_bins_;
+  insitu::HistogramRange histogram_range_;
+  bool histogram_log_;
+  int histogram_log_decades_;
+  bool histogram_cumulative_;
+  // bins used at every step for fixed and learned ranges
+  insitu::HistogramBins histogram_bins_;
+  std::vector<long long> cumulative_hist_;
+  // global range of the field over the histogram steps
+  float histogram_seen_min_ = std::numeric_limits<float>::infinity();
+  float histogram_seen_max_ = -std::numeric_limits<float>::infinity();
 
   bool is_compute_fourier;
+  // short-time spectra of the sismo receivers, computed in the time loop
+  std::unique_ptr<insitu::StreamingSTFT> stft_;
+  std::unique_ptr<insitu::STFTWriter> stft_writer_;
+  std::vector<float> stft_samples_;
+  // false when only the short-time spectra need the receiver samples
+  bool keep_sismo_traces_;
+  // all the traces in one binary gather file, else one text file each
+  bool sismo_gather_;
 
   // physics
   bool isElastic_;
@@ -136,10 +233,26 @@ class SEMproxy
 
   std::vector<std::array<float, 3>> sismoPoints;
   std::vector<int> sismoPointsToNode; // for each sismoPoints, the corresponding node index
+  // with --sismo-interpolation lagrange: element of each sismo point and
+  // weights of its nodes, one row per point
+  std::vector<int> sismoPointsElement;
+  arrayReal sismoPointsWeights;
   arrayReal pnAtSismoPoints; // 
+  // receiver 0 is the receiver, then one per sismo point
+  std::unique_ptr<insitu::ReceiverSampler<arrayReal>> receiver_sampler_;
 
   // initialize source and RHS
   void init_source();
+  // Lagrange weights of the nodes of element at coord, in row of weights
+  void computeElementWeights(int element, const std::array<float, 3>& coord,
+                             arrayReal& weights, int row);
+  // element and weights of every sismo point
+  void initSismoWeights();
+  // sampler of the receiver and of the sismo points, after init_source
+  void initReceivers(int batchSteps);
+  // move the recorded receiver samples to pnAtReceiver, pnAtSismoPoints
+  // and the short-time spectra, return the time spent in the latter
+  std::chrono::system_clock::duration flushReceivers();
 
   // allocate arrays and vectors
   void init_arrays();
@@ -3,6 +3,7 @@
 #include <cxxopts.hpp>
 #include <stdexcept>
 #include <string>
+#include <vector>
 
 class SemProxyOptions
 {
@@ -20,6 +21,8 @@ class SemProxyOptions
   float timemax = 1.5;
   bool autodt = false;
   std::string sismoPoints = "";
+  std::string sismoInterpolation = "lagrange";  // lagrange|nearest
+  std::string sismoFormat = "gather";           // gather|text
   int snap_time_interval = 150;
   // sponge boundaries parameters
   float boundaries_size = 0;
@@ -27,15 +30,42 @@ class SemProxyOptions
   float taper_delta = 0.015;
   // Boolean to tell if the model is charged on nodes or on element
   bool isModelOnNodes = false;
+  std::string geometryCache = "none";  // none|corners|jacobian
+  std::string assembly = "atomic";     // atomic|coloring
   bool isElastic = false;
   bool isSnapshotOn = false;
   bool isStatsAnalysisOn = false;
+  bool isTimeSeriesOn = false;
   int statsAnalysisInterval= 50;
   bool isComputeHistogramOn = false;
   bool isComputeFourierOn = false;
+  bool isSismoSTFTOn = false;
+  int stftWindow = 256;
+  int stftHop = 128;
+  std::string stftTaper = "hann";  // rect|hann|hamming
   int computeHistogramInterval = 150;
+  int histogramBins = 10;
+  std::string histogramRange = "step";  // step|fixed|learned
+  float histogramMin = 0.f, histogramMax = 0.f;
+  bool histogramLog = false;
+  int histogramLogDecades = 6;
+  bool histogramCumulative = false;
   int sliceSnapshotCoord = -1;
   bool saveSliceSnapshotToPPM = false; // if false save as bin
+  std::vector<std::string> slices;  // axis=index|axis@coord[:interval[:format]]
+  std::string imageColormap = "blue-green";  // blue-green|gray|viridis|seismic
+  std::string imageRange = "step";           // step|fixed|run
+  float imageMin = 0.f, imageMax = 0.f;      // range of fixed
+  std::string snapshotFormat = "raw";        // raw|text
+  std::string snapshotCompression = "none";  // none|lossless|lossy
+  float snapshotTolerance = 0.f;             // absolute error bound of lossy
+  int snapshotBrick = 0;  // nodes per brick side, 0: not bricked
+  std::string outputDir;  // empty: default location of each output
+  bool isAsyncIOOn = false;
+  int asyncIODepth = 2;
+  int receiverBatch = 128;    // steps of receiver samples copied at once
+  bool profile = false;       // time the phases of every step
+  bool profileTrace = false;  // and save them as a Chrome trace
 
   void validate() const
   {
@@ -44,6 +74,49 @@ class SemProxyOptions
       throw std::runtime_error("ex/ey/ez must be > 0");
     if (lx <= 0 || ly <= 0 || lz <= 0)
       throw std::runtime_error("lx/ly/lz must be > 0");
+    if (histogramBins < 1)
+      throw std::runtime_error("histogram-bins must be >= 1");
+    if (histogramRange == "fixed" && !(histogramMax > histogramMin))
+      throw std::runtime_error(
+          "--histogram-range fixed needs --histogram-max > --histogram-min");
+    if (histogramRange == "fixed" && histogramLog && !(histogramMin > 0))
+      throw std::runtime_error(
+          "log histograms with a fixed range need --histogram-min > 0");
+    if (histogramLogDecades < 1)
+      throw std::runtime_error("histogram-log-decades must be >= 1");
+    if (histogramCumulative && histogramRange == "step")
+      throw std::runtime_error(
+          "--histogram-cumulative needs a fixed or learned histogram range");
+    if (stftWindow < 1 || stftHop < 1)
+      throw std::runtime_error("stft-window/stft-hop must be >= 1");
+    if (asyncIODepth < 1)
+      throw std::runtime_error("async-io-depth must be >= 1");
+    if (sismoInterpolation != "lagrange" && sismoInterpolation != "nearest")
+      throw std::runtime_error(
+          "sismo-interpolation must be lagrange or nearest");
+    if (sismoFormat != "gather" && sismoFormat != "text")
+      throw std::runtime_error("sismo-format must be gather or text");
+    if (geometryCache != "none" && geometryCache != "corners" &&
+        geometryCache != "jacobian")
+      throw std::runtime_error(
+          "geometry-cache must be none, corners or jacobian");
+    if (assembly != "atomic" && assembly != "coloring")
+      throw std::runtime_error("assembly must be atomic or coloring");
+    if (receiverBatch < 1)
+      throw std::runtime_error("receiver-batch must be >= 1");
+    if (snapshotCompression != "none" && snapshotFormat != "raw")
+      throw std::runtime_error(
+          "--snapshot-compression needs --snapshot-format raw");
+    if (snapshotCompression == "lossy" && !(snapshotTolerance > 0))
+      throw std::runtime_error(
+          "--snapshot-compression lossy needs --snapshot-tolerance > 0");
+    if (imageRange == "fixed" && !(imageMax > imageMin))
+      throw std::runtime_error(
+          "--image-range fixed needs --image-max > --image-min");
+    if (snapshotBrick < 0)
+      throw std::runtime_error("snapshot-brick must be >= 0");
+    if (snapshotBrick > 0 && snapshotFormat != "raw")
+      throw std::runtime_error("--snapshot-brick needs --snapshot-format raw");
   }
 
   // Bind CLI flags to this instance (no --help here)
@@ -80,18 +153,145 @@ class SemProxyOptions
         "is-model-on-nodes",
         "Boolean to tell if the model is charged on nodes (true) or on element "
         "(false)",
-        cxxopts::value<bool>(o.isModelOnNodes))
-        ("s,snapshot","Enable or disable saving snapshots",cxxopts::value<bool>(o.isSnapshotOn))
-        ("sismo-points", "Path to sismo receptor points to save", cxxopts::value<std::string>(o.sismoPoints))
-        ("sismo-fourier", "Path to sismo receptor to do fourier", cxxopts::value<bool>(o.isComputeFourierOn))
-        ("is-elastic", "Elastic simulation", cxxopts::value<bool>(o.isElastic))
-        ("stats-analysis", "Enable stats analysis(min ,max, variance, moyenne) during execution", cxxopts::value<bool>(o.isStatsAnalysisOn))
-        ("stats-interval", "Delay between each stats analysis (step (ms) )", cxxopts::value<int>(o.statsAnalysisInterval))
-        ("compute-histogram","Enable or disable computing histogram for pressure value distribution",cxxopts::value<bool>(o.isComputeHistogramOn))
-        ("compute-histogram-delay", "Delay between each histogram computation (step (ms) )", cxxopts::value<int>(o.computeHistogramInterval))
-        ("sd,snapshot-delay", "Delay between each snapshot (step (ms) )", cxxopts::value<int>(o.snap_time_interval))
-        ("slice-snapshot", "Enable snapshots at given coordinates. Will use the --snapshot-delay parameter for delay", cxxopts::value<int>(o.sliceSnapshotCoord))
-        ("slice-ppm", "Save slice snapshots as PPM format. Saving slice snapshots without this option result in binary save", cxxopts::value<bool>(o.saveSliceSnapshotToPPM))
-        ;
+        cxxopts::value<bool>(o.isModelOnNodes))(
+        "geometry-cache",
+        "Element geometry precomputed for the stiffness loop: none (recomputed "
+        "at each step) | corners (element nodes and corner coordinates) | "
+        "jacobian (element nodes and Jacobian factors, most memory)",
+        cxxopts::value<std::string>(o.geometryCache))(
+        "assembly",
+        "Assembly of the element contributions: atomic (atomic adds on shared "
+        "nodes) | coloring (elements sharing no node at a time, plain adds)",
+        cxxopts::value<std::string>(o.assembly))(
+        "s,snapshot", "Enable or disable saving snapshots",
+        cxxopts::value<bool>(o.isSnapshotOn))(
+        "sismo-points", "Path to sismo receptor points to save",
+        cxxopts::value<std::string>(o.sismoPoints))(
+        "sismo-interpolation",
+        "Value of the sismo receivers: lagrange (interpolated in their "
+        "element, like the receiver) | nearest (closest node)",
+        cxxopts::value<std::string>(o.sismoInterpolation))(
+        "sismo-format",
+        "File format of the sismo traces: gather (one binary file, "
+        "data/sismos/sismo_gather.bin) | text (one x-y-z-sismo.txt file per "
+        "receiver)",
+        cxxopts::value<std::string>(o.sismoFormat))(
+        "sismo-fourier", "Path to sismo receptor to do fourier",
+        cxxopts::value<bool>(o.isComputeFourierOn))(
+        "sismo-stft",
+        "Compute short-time Fourier spectra of the sismo receivers during the "
+        "run",
+        cxxopts::value<bool>(o.isSismoSTFTOn))(
+        "stft-window",
+        "Number of samples of each short-time Fourier window (default = 256)",
+        cxxopts::value<int>(o.stftWindow))(
+        "stft-hop",
+        "Number of samples between two short-time Fourier windows (default = "
+        "128)",
+        cxxopts::value<int>(o.stftHop))(
+        "stft-taper",
+        "Taper of the short-time Fourier windows: rect|hann|hamming",
+        cxxopts::value<std::string>(o.stftTaper))(
+        "is-elastic", "Elastic simulation", cxxopts::value<bool>(o.isElastic))(
+        "stats-analysis",
+        "Enable stats analysis(min ,max, variance, moyenne) during execution",
+        cxxopts::value<bool>(o.isStatsAnalysisOn))(
+        "timeseries",
+        "Record the receiver pressure and the kernel and output times of every "
+        "step in the time-series file",
+        cxxopts::value<bool>(o.isTimeSeriesOn))(
+        "stats-interval", "Delay between each stats analysis (step (ms) )",
+        cxxopts::value<int>(o.statsAnalysisInterval))(
+        "compute-histogram",
+        "Enable or disable computing histogram for pressure value distribution",
+        cxxopts::value<bool>(o.isComputeHistogramOn))(
+        "compute-histogram-delay",
+        "Delay between each histogram computation (step (ms) )",
+        cxxopts::value<int>(o.computeHistogramInterval))(
+        "histogram-bins", "Number of histogram bins (default = 10)",
+        cxxopts::value<int>(o.histogramBins))(
+        "histogram-range",
+        "Range of the histogram bins: step (min/max of each step) | fixed "
+        "(--histogram-min/max) | learned (global range of the previous run)",
+        cxxopts::value<std::string>(o.histogramRange))(
+        "histogram-min", "Lower bound of a fixed histogram range",
+        cxxopts::value<float>(o.histogramMin))(
+        "histogram-max", "Upper bound of a fixed histogram range",
+        cxxopts::value<float>(o.histogramMax))(
+        "histogram-log", "Log-scaled bins on the absolute pressure value",
+        cxxopts::value<bool>(o.histogramLog))(
+        "histogram-log-decades",
+        "Decades below the maximum covered by log bins without a fixed range "
+        "(default = 6)",
+        cxxopts::value<int>(o.histogramLogDecades))(
+        "histogram-cumulative",
+        "Sum the histograms of all steps and save the total at the end of the "
+        "run",
+        cxxopts::value<bool>(o.histogramCumulative))(
+        "sd,snapshot-delay", "Delay between each snapshot (step (ms) )",
+        cxxopts::value<int>(o.snap_time_interval))(
+        "slice-snapshot",
+        "Enable snapshots at given coordinates. Will use the --snapshot-delay "
+        "parameter for delay",
+        cxxopts::value<int>(o.sliceSnapshotCoord))(
+        "slice",
+        "Slice to save, as axis=index[:interval[:format]] or "
+        "axis@coordinate[:interval[:format]] (axis x|y|z, coordinate in m, "
+        "interval defaults to --snapshot-delay, format raw|text|ppm|png "
+        "defaults to --snapshot-format). Repeat or separate with commas for "
+        "several slices",
+        cxxopts::value<std::vector<std::string>>(o.slices))(
+        "image-colormap",
+        "Colormap of the slice images: blue-green | gray | viridis | seismic",
+        cxxopts::value<std::string>(o.imageColormap))(
+        "image-range",
+        "Values at the ends of the colormap: step (min/max of each image) | "
+        "fixed (--image-min/--image-max) | run (min/max of the run so far)",
+        cxxopts::value<std::string>(o.imageRange))(
+        "image-min", "Value of the first colour with --image-range fixed",
+        cxxopts::value<float>(o.imageMin))(
+        "image-max", "Value of the last colour with --image-range fixed",
+        cxxopts::value<float>(o.imageMax))(
+        "slice-ppm",
+        "Save slice snapshots as PPM format. Saving slice snapshots without "
+        "this option result in binary save",
+        cxxopts::value<bool>(o.saveSliceSnapshotToPPM))(
+        "snapshot-format",
+        "File format of snapshots and slice snapshots: raw|text",
+        cxxopts::value<std::string>(o.snapshotFormat))(
+        "snapshot-compression",
+        "Compression of raw snapshots: none | lossless (byte shuffle + zlib) | "
+        "lossy (quantized to --snapshot-tolerance)",
+        cxxopts::value<std::string>(o.snapshotCompression))(
+        "snapshot-tolerance",
+        "Largest absolute error of --snapshot-compression lossy",
+        cxxopts::value<float>(o.snapshotTolerance))(
+        "snapshot-brick",
+        "Write raw snapshots in bricks of N x N x N nodes with an index of "
+        "their offsets, for reading sub-volumes (0: contiguous)",
+        cxxopts::value<int>(o.snapshotBrick))(
+        "output-dir",
+        "Write every output (snapshots, histograms, stats, spectra, sismos, "
+        "execution CSV) under this directory, one sub-directory per kind",
+        cxxopts::value<std::string>(o.outputDir))(
+        "receiver-batch",
+        "Number of steps of receiver and sismo samples kept with the field "
+        "before being copied to the host (default = 128)",
+        cxxopts::value<int>(o.receiverBatch))(
+        "async-io",
+        "Run snapshot, histogram and stats outputs on a background writer "
+        "thread",
+        cxxopts::value<bool>(o.isAsyncIOOn))(
+        "async-io-depth",
+        "Number of staging buffers of the background writer (default = 2)",
+        cxxopts::value<int>(o.asyncIODepth))(
+        "profile",
+        "Time the phases of every step (solver kernels, outputs, analyses) and "
+        "add their count, total, min, max and percentiles to the execution CSV",
+        cxxopts::value<bool>(o.profile))(
+        "profile-trace",
+        "Same as --profile, and save every timed phase as a Chrome trace "
+        "(trace/<timestamp>-trace.json, for chrome://tracing or Perfetto)",
+        cxxopts::value<bool>(o.profileTrace));
   } 
 };
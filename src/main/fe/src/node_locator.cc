@@ -0,0 +1,274 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  node_locator.cc: closest mesh node lookup for receivers
+//
+//************************************************************************
+
+#include "node_locator.h"
+
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+#include <fstream>
+#include <iostream>
+#include <iterator>
+#include <limits>
+
+std::vector<int> NodeLocator::locate(const std::vector<Point3>& points) const
+{
+  std::vector<int> nodes(points.size());
+  for (size_t p = 0; p < points.size(); p++)
+  {
+    nodes[p] = locate(points[p]);
+  }
+  return nodes;
+}
+
+StructNodeLocator::StructNodeLocator(const model::ModelApi<float, int>& mesh,
+                                     const int nElems[3])
+    : order_(mesh.getOrder())
+{
+  for (int d = 0; d < 3; d++)
+  {
+    nElems_[d] = nElems[d];
+    nNodes_[d] = nElems[d] * order_ + 1;
+  }
+
+  // node n of axis d is the node at index n * stride[d] of the whole grid
+  const int stride[3] = {1, nNodes_[0], nNodes_[0] * nNodes_[1]};
+  for (int d = 0; d < 3; d++)
+  {
+    axisCoords_[d].resize(nNodes_[d]);
+    for (int n = 0; n < nNodes_[d]; n++)
+    {
+      axisCoords_[d][n] = mesh.nodeCoord(n * stride[d], d);
+    }
+    elementSize_[d] =
+        (axisCoords_[d].back() - axisCoords_[d].front()) / nElems_[d];
+  }
+}
+
+int StructNodeLocator::locateAxis(int dim, float coord) const
+{
+  const std::vector<float>& axis = axisCoords_[dim];
+  int elem = 0;
+  if (elementSize_[dim] > 0)
+  {
+    elem = static_cast<int>(std::floor((coord - axis[0]) / elementSize_[dim]));
+    elem = std::clamp(elem, 0, nElems_[dim] - 1);
+  }
+
+  int best = elem * order_;
+  float bestDist = std::abs(coord - axis[best]);
+  for (int n = best + 1; n <= (elem + 1) * order_; n++)
+  {
+    float dist = std::abs(coord - axis[n]);
+    if (dist < bestDist)
+    {
+      bestDist = dist;
+      best = n;
+    }
+  }
+  return best;
+}
+
+int StructNodeLocator::locate(const Point3& point) const
+{
+  int ix = locateAxis(0, point[0]);
+  int iy = locateAxis(1, point[1]);
+  int iz = locateAxis(2, point[2]);
+  return ix + iy * nNodes_[0] + iz * nNodes_[0] * nNodes_[1];
+}
+
+BucketNodeLocator::BucketNodeLocator(const model::ModelApi<float, int>& mesh)
+{
+  const int nbNodes = mesh.getNumberOfNodes();
+  coords_.resize(3 * static_cast<size_t>(nbNodes));
+
+  float max[3];
+  for (int d = 0; d < 3; d++)
+  {
+    min_[d] = std::numeric_limits<float>::max();
+    max[d] = std::numeric_limits<float>::lowest();
+  }
+  for (int n = 0; n < nbNodes; n++)
+  {
+    for (int d = 0; d < 3; d++)
+    {
+      float c = mesh.nodeCoord(n, d);
+      coords_[3 * n + d] = c;
+      min_[d] = std::min(min_[d], c);
+      max[d] = std::max(max[d], c);
+    }
+  }
+
+  // cubic buckets holding about one node each
+  double volume = 1.0;
+  int nbFlat = 0;
+  for (int d = 0; d < 3; d++)
+  {
+    if (max[d] > min_[d])
+      volume *= max[d] - min_[d];
+    else
+      nbFlat++;
+  }
+  const double side =
+      std::pow(volume / std::max(nbNodes, 1), 1.0 / std::max(3 - nbFlat, 1));
+  for (int d = 0; d < 3; d++)
+  {
+    const float extent = max[d] - min_[d];
+    nBuckets_[d] = extent > 0 ? std::max(1, int(std::round(extent / side))) : 1;
+    bucketSize_[d] = extent > 0 ? extent / nBuckets_[d] : 1.f;
+  }
+
+  // counting sort of the nodes by bucket
+  const int nbBuckets = nBuckets_[0] * nBuckets_[1] * nBuckets_[2];
+  std::vector<int> bucketOf(nbNodes);
+  bucketStart_.assign(nbBuckets + 1, 0);
+  for (int n = 0; n < nbNodes; n++)
+  {
+    int bx = bucketCoord(0, coords_[3 * n]);
+    int by = bucketCoord(1, coords_[3 * n + 1]);
+    int bz = bucketCoord(2, coords_[3 * n + 2]);
+    bucketOf[n] = bx + by * nBuckets_[0] + bz * nBuckets_[0] * nBuckets_[1];
+    bucketStart_[bucketOf[n] + 1]++;
+  }
+  for (int b = 0; b < nbBuckets; b++)
+  {
+    bucketStart_[b + 1] += bucketStart_[b];
+  }
+  bucketNodes_.resize(nbNodes);
+  std::vector<int> fill(bucketStart_.begin(), bucketStart_.end() - 1);
+  for (int n = 0; n < nbNodes; n++)
+  {
+    bucketNodes_[fill[bucketOf[n]]++] = n;
+  }
+}
+
+int BucketNodeLocator::bucketCoord(int dim, float coord) const
+{
+  int b = static_cast<int>(std::floor((coord - min_[dim]) / bucketSize_[dim]));
+  return std::clamp(b, 0, nBuckets_[dim] - 1);
+}
+
+void BucketNodeLocator::searchShell(const Point3& point, const int center[3],
+                                    int radius, int& best,
+                                    float& bestDist2) const
+{
+  for (int bz = center[2] - radius; bz <= center[2] + radius; bz++)
+  {
+    if (bz < 0 || bz >= nBuckets_[2]) continue;
+    for (int by = center[1] - radius; by <= center[1] + radius; by++)
+    {
+      if (by < 0 || by >= nBuckets_[1]) continue;
+      // inside the shell only the two x ends belong to it
+      const bool onFace = std::abs(bz - center[2]) == radius ||
+                          std::abs(by - center[1]) == radius;
+      const int bxStep = (onFace || radius == 0) ? 1 : 2 * radius;
+      for (int bx = center[0] - radius; bx <= center[0] + radius; bx += bxStep)
+      {
+        if (bx < 0 || bx >= nBuckets_[0]) continue;
+        const int b = bx + by * nBuckets_[0] + bz * nBuckets_[0] * nBuckets_[1];
+        for (int i = bucketStart_[b]; i < bucketStart_[b + 1]; i++)
+        {
+          const int n = bucketNodes_[i];
+          float dist2 = 0;
+          for (int d = 0; d < 3; d++)
+          {
+            const float delta = point[d] - coords_[3 * n + d];
+            dist2 += delta * delta;
+          }
+          // ties go to the lowest node index, like a scan over all nodes
+          if (dist2 < bestDist2 || (dist2 == bestDist2 && n < best))
+          {
+            bestDist2 = dist2;
+            best = n;
+          }
+        }
+      }
+    }
+  }
+}
+
+int BucketNodeLocator::locate(const Point3& point) const
+{
+  const int center[3] = {bucketCoord(0, point[0]), bucketCoord(1, point[1]),
+                         bucketCoord(2, point[2])};
+  const int maxRadius = std::max({nBuckets_[0], nBuckets_[1], nBuckets_[2]});
+
+  int best = -1;
+  float bestDist2 = std::numeric_limits<float>::infinity();
+  for (int radius = 0; radius <= maxRadius; radius++)
+  {
+    searchShell(point, center, radius, best, bestDist2);
+    if (best < 0) continue;
+
+    // distance from the point to the buckets not visited yet
+    float margin = std::numeric_limits<float>::infinity();
+    for (int d = 0; d < 3; d++)
+    {
+      if (center[d] - radius > 0)
+      {
+        float low = min_[d] + (center[d] - radius) * bucketSize_[d];
+        margin = std::min(margin, point[d] - low);
+      }
+      if (center[d] + radius < nBuckets_[d] - 1)
+      {
+        float high = min_[d] + (center[d] + radius + 1) * bucketSize_[d];
+        margin = std::min(margin, high - point[d]);
+      }
+    }
+    if (margin == std::numeric_limits<float>::infinity()) break;
+    if (margin > 0 && margin * margin > bestDist2) break;
+  }
+  return best;
+}
+
+void parseSismoPoints(const std::string& path, std::vector<Point3>* points)
+{
+  std::cout << "Parsing sismo receiver points in provided file : " << path
+            << std::endl;
+  std::ifstream file(path, std::ios::binary);
+  if (!file.is_open())
+  {
+    std::cerr << "Impossible to open the --sismo-points provided path ! "
+              << std::endl;
+    return;
+  }
+  const std::string content((std::istreambuf_iterator<char>(file)),
+                            std::istreambuf_iterator<char>());
+
+  const char* cursor = content.c_str();
+  const char* end = cursor + content.size();
+  while (cursor < end)
+  {
+    const char* lineEnd = std::find(cursor, end, '\n');
+    Point3 coords;
+    int index = 0;
+    bool valid = true;
+    while (valid)
+    {
+      while (cursor < lineEnd &&
+             (*cursor == ' ' || *cursor == '\t' || *cursor == '\r'))
+        cursor++;
+      if (cursor == lineEnd) break;
+
+      char* next;
+      float value = std::strtof(cursor, &next);
+      if (next == cursor || next > lineEnd || index == 3)
+      {
+        valid = false;
+        break;
+      }
+      coords[index++] = value;
+      cursor = next;
+    }
+    // ensuring we parsed 3 values on this line
+    if (valid && index == 3)
+    {
+      points->push_back(coords);
+    }
+    cursor = lineEnd + 1;
+  }
+}
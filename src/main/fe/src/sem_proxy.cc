@@ -8,13 +8,16 @@
 #include "sem_proxy.h"
 
 #include "filesystem"
+#include "node_locator.h"
 
 #include <cartesian_struct_builder.h>
 #include <cartesian_unstruct_builder.h>
 #include <sem_solver_acoustic.h>
 #include <source_and_receiver_utils.h>
 
+#include <algorithm>
 #include <cxxopts.hpp>
+#include <fft.h>
 #include <iomanip>
 #include <iostream>
 #include <sstream>
@@ -28,40 +31,48 @@
 
 using namespace SourceAndReceiverUtils;
 
-void parseSismoPoints(std::string path, std::vector<std::array<float, 3>> * resultVector) {
-  std::cout << "Parsing sismo receiver points in provided file : " << path << std::endl;
-  std::ifstream file(path);
-  if (!file.is_open()) {
-    std::cerr << "Impossible to open the --sismo-points provided path ! " << std::endl;
-    return;
-  }
-
-  std::string line;
-  while (std::getline(file, line)) {
-    std::istringstream lineStringStream(line);
-    std::array<float, 3> currentCoordinates;
-    std::string token;
-    int index = 0;
-    while (std::getline(lineStringStream, token, ' ')) {
-      currentCoordinates[index] = std::stof(token);
-      index += 1;
-    }
-    if (index == 3) { // ensuring we parsed 3 values in this iteration of the loop
-      resultVector->push_back(currentCoordinates);
-    }
-  }
-  
-}
-
 std::filesystem::path executableDir() {
     return std::filesystem::path(
         std::filesystem::canonical("/proc/self/exe")
     ).parent_path();
 }
 
+std::filesystem::path SEMproxy::outputFile(const std::string& kind,
+                                           const std::string& name) const
+{
+  if (!output_dir_.empty())
+  {
+    return std::filesystem::path(output_dir_) / kind / name;
+  }
+  // default locations
+  if (kind == "snapshot" || kind == "slice_snapshot")
+  {
+    return std::filesystem::path("/tmp/insitu/data") / kind / name;
+  }
+  if (kind == "fourier")
+  {
+    return std::filesystem::path("../data") / kind / name;
+  }
+  return executableDir() / "../../data" / kind / name;
+}
+
 SEMproxy::SEMproxy(const SemProxyOptions& opt)
 {
   order = opt.order;
+  output_dir_ = opt.outputDir;
+  if (!output_dir_.empty())
+  {
+    for (const char* kind : {"snapshot", "slice_snapshot", "histo", "stats",
+                             "fourier", "sismos", "trace"})
+    {
+      std::filesystem::create_directories(std::filesystem::path(output_dir_) /
+                                          kind);
+    }
+  }
+  if (opt.profile || opt.profileTrace)
+  {
+    Profiler::instance().enable(opt.profileTrace);
+  }
   snap_time_interval_ = opt.snap_time_interval;
   nb_elements_[0] = opt.ex;
   nb_elements_[1] = opt.ey;
@@ -94,12 +105,63 @@ SEMproxy::SEMproxy(const SemProxyOptions& opt)
 
   is_snapshots_ =  opt.isSnapshotOn;
   is_stats_analysis_ = opt.isStatsAnalysisOn;
-  slice_snapshots_coords_ = opt.sliceSnapshotCoord;
-  slice_snapshots_to_PPM_ = opt.saveSliceSnapshotToPPM;
+  snapshot_format_ = insitu::parseSnapshotFormat(opt.snapshotFormat);
+  snapshot_writer_ = insitu::SnapshotWriter(
+      insitu::parseSnapshotCodec(opt.snapshotCompression),
+      opt.snapshotTolerance, opt.snapshotBrick);
+  image_writer_ = insitu::ImageWriter(insitu::parseColormap(opt.imageColormap),
+                                      insitu::parseImageRange(opt.imageRange),
+                                      opt.imageMin, opt.imageMax);
+  if (opt.isAsyncIOOn)
+  {
+    async_writer_ = std::make_unique<insitu::AsyncWriter>(opt.asyncIODepth);
+  }
   stats_analysis_interval = opt.statsAnalysisInterval;
+  is_timeseries_every_step_ = opt.isTimeSeriesOn;
+  if (is_stats_analysis_ || is_timeseries_every_step_)
+  {
+    std::filesystem::path filename = outputFile(
+        "stats", "timeseries_order" + std::to_string(order) + ".bin");
+    std::filesystem::create_directories(filename.parent_path());
+    timeseries_ = std::make_unique<insitu::TimeSeriesWriter>(
+        filename, std::vector<std::string>{"timestep", "time", "receiver",
+                                           "kerneltime", "outputtime", "mean",
+                                           "variance", "min", "max",
+                                           "l2norm"});
+  }
 
   is_compute_histogram_ = opt.isComputeHistogramOn;
   compute_histogram_interval = opt.computeHistogramInterval;
+  histogram_nb_bins_ = opt.histogramBins;
+  histogram_range_ = insitu::parseHistogramRange(opt.histogramRange);
+  histogram_log_ = opt.histogramLog;
+  histogram_log_decades_ = opt.histogramLogDecades;
+  histogram_cumulative_ = opt.histogramCumulative;
+  if (is_compute_histogram_ &&
+      histogram_range_ == insitu::HistogramRange::Fixed)
+  {
+    // with --histogram-log the fixed range is a range of |pressure|
+    histogram_bins_ =
+        histogram_log_ ? insitu::HistogramBins::logarithmic(
+                             histogram_nb_bins_, opt.histogramMin,
+                             opt.histogramMax)
+                       : insitu::HistogramBins::linear(histogram_nb_bins_,
+                                                       opt.histogramMin,
+                                                       opt.histogramMax);
+  }
+  if (is_compute_histogram_ &&
+      histogram_range_ == insitu::HistogramRange::Learned)
+  {
+    // the range saved by the previous run only sets the bins: the range
+    // saved by this run is its own, not grown from the previous one
+    float learnedMin, learnedMax;
+    insitu::readHistogramRange(outputFile("histo", "histo_range_order" +
+                                                       std::to_string(order) +
+                                                       ".txt"),
+                               learnedMin, learnedMax);
+    histogram_bins_ = makeHistogramBins(learnedMin, learnedMax);
+  }
+  cumulative_hist_.assign(histogram_nb_bins_, 0);
   is_compute_fourier = opt.isComputeFourierOn;
 
   const SolverFactory::methodType methodType = getMethod(opt.method);
@@ -171,9 +233,22 @@ SEMproxy::SEMproxy(const SemProxyOptions& opt)
 
   m_solver = SolverFactory::createSolver(methodType, implemType, meshType,
                                          modelLocation, physicType, order);
-  m_solver->computeFEInit(*m_mesh, sponge_size, opt.surface_sponge,
-                          opt.taper_delta);
+  m_solver->setGeometryCache(parseGeometryCache(opt.geometryCache));
+  m_solver->setAssembly(parseAssembly(opt.assembly));
+  {
+    PROFILE_REGION("computeFEInit");
+    m_solver->computeFEInit(*m_mesh, sponge_size, opt.surface_sponge,
+                            opt.taper_delta);
+  }
+
 
+  // slices, after the mesh for the physical coordinates
+  std::vector<insitu::SliceSpec> slices = sliceSpecs(opt);
+  if (!slices.empty())
+  {
+    slice_extractor_ =
+        std::make_unique<insitu::SliceExtractor>(std::move(slices), nb_nodes_);
+  }
 
   // Sismo points
   if (opt.sismoPoints.size() > 0) {
@@ -181,28 +256,37 @@ SEMproxy::SEMproxy(const SemProxyOptions& opt)
     parseSismoPoints(opt.sismoPoints, &sismoPoints);   
   }
 
-  // find closest node to each of our receivers
-  std::cout << "Looking for closest node to each of the provided sismo points receivers" << std::endl;
-  for (int rcvIndex = 0; rcvIndex<sismoPoints.size(); rcvIndex++) {
-    float minDist = INFINITY;
-    float indexNodeMinDist = 0;
-    for (int n = 0; n<m_mesh->getNumberOfNodes(); n++) {
-      float tmpSum = 0.;
-      for (int dim = 0; dim<3; dim++) {
-        float nodeC = m_mesh->nodeCoord(n,dim);
-        float receiverC = sismoPoints[rcvIndex][dim];
-        tmpSum += (receiverC - nodeC) * (receiverC - nodeC);
-      }
-      float dist = sqrt(tmpSum);
-      // update min variables
-      if (dist < minDist) {minDist = dist; indexNodeMinDist = n;}
-    }
-    sismoPointsToNode.push_back(indexNodeMinDist); // save this node as the closest to the rcvIndex'th receiver
+  if (sismoPoints.size() > 0 && opt.sismoInterpolation == "lagrange") {
+    // interpolate the receivers in their element, as the receiver
+    std::cout << "Computing the interpolation weights of the sismo points receivers" << std::endl;
+    initSismoWeights();
+  }
+  else if (sismoPoints.size() > 0) {
+    // find closest node to each of our receivers
+    std::cout << "Looking for closest node to each of the provided sismo points receivers" << std::endl;
+    std::unique_ptr<NodeLocator> locator;
+    if (meshType == SolverFactory::Struct)
+      locator = std::make_unique<StructNodeLocator>(*m_mesh, nb_elements_);
+    else
+      locator = std::make_unique<BucketNodeLocator>(*m_mesh);
+    sismoPointsToNode = locator->locate(sismoPoints);
+  }
+  // the short-time spectra only need the last window of each receiver, the
+  // whole traces are kept for the sismo files and the full spectrum
+  keep_sismo_traces_ = !opt.isSismoSTFTOn || is_compute_fourier;
+  sismo_gather_ = opt.sismoFormat == "gather";
+  pnAtSismoPoints = allocateArray2D<arrayReal>(
+      sismoPoints.size(), keep_sismo_traces_ ? num_sample_ : 0,
+      "pnAtSismoPoints");
+  if (opt.isSismoSTFTOn)
+  {
+    initSTFT(opt.stftWindow, opt.stftHop, opt.stftTaper);
   }
-  pnAtSismoPoints = allocateArray2D<arrayReal>(sismoPoints.size(), num_sample_, "pnAtSismoPoints");
 
 
   initFiniteElem();
+  initReceivers(opt.receiverBatch);
+  initPipeline();
 
 
   std::cout << "Number of node is " << m_mesh->getNumberOfNodes() << std::endl;
@@ -221,16 +305,14 @@ SEMproxy::SEMproxy(const SemProxyOptions& opt)
 }
 
 
-void saveMetricsToFile(float kerneltime_ms,float outputtime_ms,float writesismotime_ms, float histotime_ms, float fourier_ms,
-                        float snapshottime_ms, float slicesnaptime_ms,float statstime_ms, float * domain_size_, int * nb_elements_, int order) {
+void saveMetricsToFile(const std::vector<std::pair<std::string, double>>& metrics,
+                        float * domain_size_, int * nb_elements_, int order,
+                        const std::filesystem::path& traceDir,
+                        std::time_t timestamp) {
 
   // determine file name, create file
-  std::filesystem::path baseDir = executableDir();       
-  std::time_t timestamp = std::time(nullptr);
-
-
   std::string baseName = std::to_string(timestamp) + "-execution.csv";
-  std::filesystem::path fullPath = baseDir / ".." / ".." / "data" / "trace" / baseName;
+  std::filesystem::path fullPath = traceDir / baseName;
                         
   std::filesystem::create_directories(fullPath.parent_path());
   std::ofstream file(fullPath);
@@ -239,7 +321,11 @@ void saveMetricsToFile(float kerneltime_ms,float outputtime_ms,float writesismot
     std::cerr << "Erreur : Impossible de créer le fichier dans " << fullPath << std::endl;
   }
 
-  file << "timestamp,kerneltime,outputtime,writesismotime,histotime,snapshottime,fouriertime,slicesnaptime,statstime,ex,ey,ez,lx,ly,lz,order";
+  file << "timestamp";
+  for (const auto& [name, value] : metrics) {
+    file << "," << name;
+  }
+  file << ",ex,ey,ez,lx,ly,lz,order";
 
   file << std::endl;
 
@@ -251,14 +337,13 @@ void saveMetricsToFile(float kerneltime_ms,float outputtime_ms,float writesismot
   int ez = nb_elements_[2];
 
   file << timestamp;
-  file <<","<<kerneltime_ms;
-  file<<","<<outputtime_ms;
-  file<<","<<writesismotime_ms;
-  file<<","<<histotime_ms;
-  file<<","<<snapshottime_ms;
-  file<<","<<fourier_ms;
-  file<<","<<slicesnaptime_ms;
-  file << "," << statstime_ms;
+  // whole values (byte counts, times in us) are written in full
+  for (const auto& [name, value] : metrics) {
+    if (value == std::trunc(value))
+      file << "," << static_cast<long long>(value);
+    else
+      file << "," << static_cast<float>(value);
+  }
   file<<","<<ex<<","<<ey<<","<<ez;
   file<<","<<lx<<","<<ly<<","<<lz;
   file<<","<<order;
@@ -271,8 +356,8 @@ void saveMetricsToFile(float kerneltime_ms,float outputtime_ms,float writesismot
 void SEMproxy::run()
 {
   time_point<system_clock> startComputeTime, startOutputTime, totalComputeTime,
-      totalOutputTime, startWriteSismoTime, totalWriteSismoTime, startHistoTime, totalHistoTime, 
-    startSnapshotTime, startStatsTime, totalSnapshotTime, startFourierTime, totalFourierTime, startSliceSnapTime, totalSliceSnapTime, totalStatsTime;
+      totalOutputTime, startWriteSismoTime, totalWriteSismoTime,
+      startFourierTime, totalFourierTime;
 
 
   SEMsolverDataAcoustic solverData(i1, i2, myRHSTerm, pnGlobal, rhsElement,
@@ -281,79 +366,66 @@ void SEMproxy::run()
   for (int indexTimeSample = 0; indexTimeSample < num_sample_;
        indexTimeSample++)
   {
+    PROFILE_REGION("step");
     startComputeTime = system_clock::now();
-    m_solver->computeOneStep(dt_, indexTimeSample, solverData);
-    totalComputeTime += system_clock::now() - startComputeTime;
-
-    startOutputTime = system_clock::now();
-
-    if (indexTimeSample % 50 == 0)
     {
-      m_solver->outputSolutionValues(indexTimeSample, i1, rhsElement[0],
-                                     pnGlobal, "pnGlobal");
+      PROFILE_REGION("kernel");
+      m_solver->computeOneStep(dt_, indexTimeSample, solverData);
     }
+    const auto stepComputeTime = system_clock::now() - startComputeTime;
+    totalComputeTime += stepComputeTime;
 
-    // Save pressure at receiver
-    const int order = m_mesh->getOrder();
-
-    float varnp1 = 0.0;
-    for (int i = 0; i < order + 1; i++)
+    startOutputTime = system_clock::now();
     {
-      for (int j = 0; j < order + 1; j++)
+      PROFILE_REGION("output");
+      if (indexTimeSample % 50 == 0)
       {
-        for (int k = 0; k < order + 1; k++)
-        {
-          int nodeIdx = m_mesh->globalNodeIndex(rhsElementRcv[0], i, j, k);
-          int globalNodeOnElement =
-              i + j * (order + 1) + k * (order + 1) * (order + 1);
-          varnp1 +=
-              pnGlobal(nodeIdx, i2) * rhsWeightsRcv(0, globalNodeOnElement);
-        }
+        m_solver->outputSolutionValues(indexTimeSample, i1, rhsElement[0],
+                                       pnGlobal, "pnGlobal");
       }
-    }
-
-    pnAtReceiver(0, indexTimeSample) = varnp1;
 
-    for (int rcvIndex = 0; rcvIndex < sismoPoints.size(); rcvIndex++) {
-        pnAtSismoPoints(rcvIndex, indexTimeSample) = pnGlobal(sismoPointsToNode[rcvIndex], i2);    
-    }
-
-    swap(i1, i2);
-
-    auto tmp = solverData.m_i1;
-    solverData.m_i1 = solverData.m_i2;
-    solverData.m_i2 = tmp;
-
-    totalOutputTime += system_clock::now() - startOutputTime;
+      // Save pressure at receiver and at the sismo points, all sampled next
+      // to pnGlobal and brought back to the host a batch of steps at a time
+      if (receiver_sampler_->full())
+      {
+        totalFourierTime += flushReceivers();
+      }
+      receiver_sampler_->record(pnGlobal, i2, indexTimeSample);
 
-    if (indexTimeSample % snap_time_interval_ == 0 && is_snapshots_ == true){
-      startSnapshotTime = system_clock::now();
-      saveSnapshot(indexTimeSample);
-      totalSnapshotTime += system_clock::now() - startSnapshotTime;
-    }
-    if (indexTimeSample % stats_analysis_interval == 0 &&  is_stats_analysis_ == true) {
-      startStatsTime = system_clock::now();
-      statsAnalysis(indexTimeSample);
-      totalStatsTime += system_clock::now() - startStatsTime;
-    }
+      swap(i1, i2);
 
-    if (indexTimeSample % compute_histogram_interval == 0 && is_compute_histogram_ == true) {
-      startHistoTime = system_clock::now();
-      computeHistogram(indexTimeSample);
-      totalHistoTime += system_clock::now() - startHistoTime;
+      auto tmp = solverData.m_i1;
+      solverData.m_i1 = solverData.m_i2;
+      solverData.m_i2 = tmp;
     }
-
-    if (indexTimeSample % snap_time_interval_ == 0 && slice_snapshots_coords_ != -1) {
-      startSliceSnapTime = system_clock::now();
-      if (slice_snapshots_to_PPM_) {
-        saveSliceSnapshotPPM(indexTimeSample, slice_snapshots_coords_);
-      }
-      else {
-        saveSliceSnapshotBin(indexTimeSample, slice_snapshots_coords_);
-      }
-      totalSliceSnapTime += system_clock::now() - startSliceSnapTime;
+    const auto stepOutputTime = system_clock::now() - startOutputTime;
+    totalOutputTime += stepOutputTime;
+
+    // snapshot, histogram, stats and slices due at this step, each one
+    // timed under its name
+    pipeline_->run(indexTimeSample);
+
+    if (timeseries_ && (pipeline_->ran("stats") || is_timeseries_every_step_)) {
+      // the receiver sample of this step must be on the host
+      totalFourierTime += flushReceivers();
+      timeseries_->set(timeseries_->column("timestep"), indexTimeSample);
+      timeseries_->set(timeseries_->column("time"), indexTimeSample * dt_);
+      timeseries_->set(timeseries_->column("receiver"),
+                       pnAtReceiver(0, indexTimeSample));
+      timeseries_->set(
+          timeseries_->column("kerneltime"),
+          duration_cast<microseconds>(stepComputeTime).count());
+      timeseries_->set(timeseries_->column("outputtime"),
+                       duration_cast<microseconds>(stepOutputTime).count());
+      appendTimeSeriesRow();
     }
-
+  }
+  totalFourierTime += flushReceivers();
+  if (stft_writer_)
+  {
+    startFourierTime = system_clock::now();
+    stft_writer_->flush();
+    totalFourierTime += system_clock::now() - startFourierTime;
   }
   if(is_compute_fourier){
     startFourierTime = system_clock::now();
@@ -361,14 +433,40 @@ void SEMproxy::run()
     totalFourierTime += system_clock::now() - startFourierTime;
   }
 
-  // Save sismos for all receivers
-  if(!is_compute_fourier){
+  finalizeHistograms();
+  if (timeseries_)
+  {
+    flushTimeSeries();
+  }
+
+  // wait for the outputs still queued on the writer thread
+  float iowaittime_ms = 0;
+  if (async_writer_)
+  {
+    async_writer_->drain();
+    iowaittime_ms = async_writer_->stallMicroseconds();
+  }
+
+  // Save sismos for all receivers, none without --sismo-points
+  if(!is_compute_fourier && keep_sismo_traces_ && sismo_gather_ &&
+     !sismoPoints.empty()){
+
+    startWriteSismoTime = system_clock::now();
+    std::filesystem::path filename = outputFile("sismos", "sismo_gather.bin");
+    if (!insitu::writeSismoGather(filename, sismoPoints, dt_, num_sample_,
+                                  pnAtSismoPoints)) {
+      std::cerr << "Error opening file " << filename << ": " << std::strerror(errno) << "\n";
+    } else {
+      std::cout << "Wrote the sismos of " << sismoPoints.size() << " receivers in " << filename << std::endl;
+    }
+    totalWriteSismoTime += system_clock::now() - startWriteSismoTime;
+  }
+  else if(!is_compute_fourier && keep_sismo_traces_){
 
     startWriteSismoTime = system_clock::now();
     for (int rcvIndex = 0; rcvIndex < sismoPoints.size(); rcvIndex++) {
       // create file and write in it
-      std::filesystem::path baseDir = executableDir();
-      std::filesystem::path filename = baseDir / ("../../data/sismos/" + std::to_string((int)sismoPoints[rcvIndex][0]) + "-" + 
+      std::filesystem::path filename = outputFile("sismos", std::to_string((int)sismoPoints[rcvIndex][0]) + "-" + 
                                         std::to_string((int)sismoPoints[rcvIndex][1]) + "-" + std::to_string((int)sismoPoints[rcvIndex][2]) + "-sismo.txt");
       std::ofstream file(filename);  
       if (!file) {
@@ -395,11 +493,7 @@ void SEMproxy::run()
 
   float writesismotime_ms = time_point_cast<microseconds>(totalWriteSismoTime).time_since_epoch().count();
 
-  float histotime_ms = time_point_cast<microseconds>(totalHistoTime).time_since_epoch().count();
-  float slicesnaptime_ms = time_point_cast<microseconds>(totalSliceSnapTime).time_since_epoch().count();
   float fourier_ms = time_point_cast<microseconds>(totalFourierTime).time_since_epoch().count();
-  float snapshottime_ms = time_point_cast<microseconds>(totalSnapshotTime).time_since_epoch().count();
-  float statstime_ms = time_point_cast<microseconds>(totalStatsTime).time_since_epoch().count();
 
   cout << "------------------------------------------------ " << endl;
   cout << "\n---- Elapsed Kernel Time : " << kerneltime_ms / 1E6 << " seconds."
@@ -407,10 +501,69 @@ void SEMproxy::run()
   cout << "---- Elapsed Output Time : " << outputtime_ms / 1E6 << " seconds."
        << endl;
   cout << "---- Elapsed write sismo time : " << writesismotime_ms / 1E6 << " seconds." << endl;
-  cout << "---- Elapsed Stats In-Situ Time : " << statstime_ms / 1E6 << " seconds." << endl;
+  for (const auto& [name, time_us] : pipeline_->timings())
+  {
+    cout << "---- Elapsed " << name << " In-Situ Time : " << time_us / 1E6
+         << " seconds." << endl;
+  }
+  if (async_writer_)
+  {
+    cout << "---- Elapsed I/O Wait Time : " << iowaittime_ms / 1E6
+         << " seconds." << endl;
+  }
   cout << "------------------------------------------------ " << endl;
 
-  saveMetricsToFile(kerneltime_ms, outputtime_ms, writesismotime_ms, histotime_ms, snapshottime_ms, fourier_ms, slicesnaptime_ms, statstime_ms, domain_size_,nb_elements_, order);
+  // one <name>time column per analysis of the pipeline
+  std::vector<std::pair<std::string, double>> metrics = {
+      {"kerneltime", kerneltime_ms},
+      {"outputtime", outputtime_ms},
+      {"writesismotime", writesismotime_ms}};
+  for (const auto& [name, time_us] : pipeline_->timings())
+  {
+    metrics.emplace_back(name + "time", time_us);
+  }
+  metrics.insert(metrics.end(),
+                 {{"fouriertime", fourier_ms},
+                  {"iowaittime", iowaittime_ms},
+                  {"snapshotbytes", double(snapshot_writer_.rawBytes())},
+                  {"snapshotstoredbytes", double(snapshot_writer_.storedBytes())},
+                  {"snapshotencodetime", snapshot_writer_.encodeMicroseconds()}});
+
+  // with --profile, the calls of every phase (times in us)
+  const std::time_t timestamp = std::time(nullptr);
+  if (Profiler::enabled())
+  {
+    Profiler& profiler = Profiler::instance();
+    cout << "---- Phases (us) : count total min max p50 p90 p99" << endl;
+    for (const Profiler::Summary& phase : profiler.summaries())
+    {
+      cout << "---- " << phase.name << " : " << phase.count << " "
+           << phase.total << " " << phase.min << " " << phase.max << " "
+           << phase.p50 << " " << phase.p90 << " " << phase.p99 << endl;
+      const std::string prefix = "phase_" + phase.name + "_";
+      metrics.insert(metrics.end(),
+                     {{prefix + "count", double(phase.count)},
+                      {prefix + "total", phase.total},
+                      {prefix + "min", phase.min},
+                      {prefix + "max", phase.max},
+                      {prefix + "p50", phase.p50},
+                      {prefix + "p90", phase.p90},
+                      {prefix + "p99", phase.p99}});
+    }
+    if (profiler.tracing())
+    {
+      std::filesystem::path filename =
+          outputFile("trace", std::to_string(timestamp) + "-trace.json");
+      std::filesystem::create_directories(filename.parent_path());
+      if (!profiler.writeChromeTrace(filename)) {
+        std::cerr << "Error writing trace " << filename << ": " << std::strerror(errno) << "\n";
+      } else {
+        std::cout << "Chrome trace: " << filename << std::endl;
+      }
+    }
+  }
+  saveMetricsToFile(metrics, domain_size_, nb_elements_, order,
+                    outputFile("trace", ""), timestamp);
 
 }
 
@@ -432,6 +585,140 @@ void SEMproxy::init_arrays()
       1, m_mesh->getNumberOfPointsPerElement(), "RHSWeightRcv");
 }
 
+void SEMproxy::initReceivers(int batchSteps)
+{
+  std::vector<size_t> offsets = {0};
+  std::vector<int> nodes;
+  std::vector<float> weights;
+
+  // the receiver, and the sismo points unless they take their closest
+  // node, interpolate the nodes of their element
+  const int order = m_mesh->getOrder();
+  for (int i = 0; i < order + 1; i++)
+  {
+    for (int j = 0; j < order + 1; j++)
+    {
+      for (int k = 0; k < order + 1; k++)
+      {
+        int globalNodeOnElement =
+            i + j * (order + 1) + k * (order + 1) * (order + 1);
+        nodes.push_back(m_mesh->globalNodeIndex(rhsElementRcv[0], i, j, k));
+        weights.push_back(rhsWeightsRcv(0, globalNodeOnElement));
+      }
+    }
+  }
+  offsets.push_back(nodes.size());
+
+  const bool sampleSismos = keep_sismo_traces_ || stft_;
+  for (size_t rcvIndex = 0; sampleSismos && rcvIndex < sismoPoints.size();
+       rcvIndex++)
+  {
+    if (sismoPointsElement.empty())
+    {
+      nodes.push_back(sismoPointsToNode[rcvIndex]);
+      weights.push_back(1.f);
+    }
+    else
+    {
+      for (int k = 0; k < order + 1; k++)
+      {
+        for (int j = 0; j < order + 1; j++)
+        {
+          for (int i = 0; i < order + 1; i++)
+          {
+            const float weight = sismoPointsWeights(
+                rcvIndex, i + j * (order + 1) + k * (order + 1) * (order + 1));
+            // nodes on which the weight vanishes are left out
+            if (weight == 0.f) continue;
+            nodes.push_back(m_mesh->globalNodeIndex(
+                sismoPointsElement[rcvIndex], i, j, k));
+            weights.push_back(weight);
+          }
+        }
+      }
+    }
+    offsets.push_back(nodes.size());
+  }
+
+  receiver_sampler_ = std::make_unique<insitu::ReceiverSampler<arrayReal>>(
+      offsets, nodes, weights, std::min(batchSteps, std::max(num_sample_, 1)));
+}
+
+void SEMproxy::initPipeline()
+{
+  const int nbNodes = m_mesh->getNumberOfNodes();
+  pipeline_ = std::make_unique<insitu::AnalysisPipeline>(insitu::StepField(
+      nbNodes, [this](std::vector<float>& buffer) { stageField(buffer); },
+      [this, nbNodes] { return insitu::reduceField(pnGlobal, 1, nbNodes); }));
+
+  // every analysis is registered, so that each one has its time column;
+  // the histogram runs before the stats, a fixed range one hands them its
+  // stats
+  pipeline_->add("snapshot",
+                 insitu::Schedule{is_snapshots_ ? snap_time_interval_ : 0},
+                 [this](insitu::StepField& step) { saveSnapshot(step); });
+  pipeline_->add(
+      "histo",
+      insitu::Schedule{is_compute_histogram_ ? compute_histogram_interval : 0},
+      [this](insitu::StepField& step) { computeHistogram(step); });
+  pipeline_->add(
+      "stats",
+      insitu::Schedule{is_stats_analysis_ ? stats_analysis_interval : 0},
+      [this](insitu::StepField& step) { statsAnalysis(step); });
+  pipeline_->add(
+      "slicesnap",
+      [this](int timestep) {
+        return slice_extractor_ && slice_extractor_->select(timestep);
+      },
+      [this](insitu::StepField& step) { saveSlices(step); });
+}
+
+system_clock::duration SEMproxy::flushReceivers()
+{
+  PROFILE_REGION("flushReceivers");
+  system_clock::duration stftTime{0};
+  receiver_sampler_->flush([&](int firstStep, int count, const float* values,
+                               int stride) {
+    for (int s = 0; s < count; s++)
+    {
+      pnAtReceiver(0, firstStep + s) = values[s];
+    }
+    if (receiver_sampler_->receivers() == 1) return;
+
+    const float* sismos = values + stride;
+    if (keep_sismo_traces_)
+    {
+      for (int rcvIndex = 0; rcvIndex < sismoPoints.size(); rcvIndex++)
+      {
+        for (int s = 0; s < count; s++)
+        {
+          pnAtSismoPoints(rcvIndex, firstStep + s) =
+              sismos[static_cast<size_t>(rcvIndex) * stride + s];
+        }
+      }
+    }
+    if (stft_)
+    {
+      const auto start = system_clock::now();
+      for (int s = 0; s < count; s++)
+      {
+        for (int rcvIndex = 0; rcvIndex < sismoPoints.size(); rcvIndex++)
+        {
+          stft_samples_[rcvIndex] =
+              sismos[static_cast<size_t>(rcvIndex) * stride + s];
+        }
+        stft_->push(stft_samples_.data(),
+                    [this](int receiver, int, int,
+                           const insitu::Complex* spectrum) {
+                      stft_writer_->add(receiver, spectrum);
+                    });
+      }
+      stftTime += system_clock::now() - start;
+    }
+  });
+  return stftTime;
+}
+
 // Initialize sources
 void SEMproxy::init_source()
 {
@@ -461,25 +748,6 @@ void SEMproxy::init_source()
     rhsElement[i] = source_index;
   }
 
-  // Get coordinates of the corners of the sourc element
-  float cornerCoords[8][3];
-  int I = 0;
-  int nodes_corner[2] = {0, m_mesh->getOrder()};
-  for (int k : nodes_corner)
-  {
-    for (int j : nodes_corner)
-    {
-      for (int i : nodes_corner)
-      {
-        int nodeIdx = m_mesh->globalNodeIndex(rhsElement[0], i, j, k);
-        cornerCoords[I][0] = m_mesh->nodeCoord(nodeIdx, 0);
-        cornerCoords[I][2] = m_mesh->nodeCoord(nodeIdx, 2);
-        cornerCoords[I][1] = m_mesh->nodeCoord(nodeIdx, 1);
-        I++;
-      }
-    }
-  }
-
   // initialize source term
   vector<float> sourceTerm =
       myUtils.computeSourceTerm(num_sample_, dt_, f0, sourceOrder);
@@ -495,25 +763,7 @@ void SEMproxy::init_source()
   cout << "Element number for the source location: " << myElementSource << endl
        << endl;
 
-  int order = m_mesh->getOrder();
-
-  switch (order)
-  {
-    case 1:
-      SourceAndReceiverUtils::ComputeRHSWeights<1>(cornerCoords, src_coord_,
-                                                   rhsWeights);
-      break;
-    case 2:
-      SourceAndReceiverUtils::ComputeRHSWeights<2>(cornerCoords, src_coord_,
-                                                   rhsWeights);
-      break;
-    case 3:
-      SourceAndReceiverUtils::ComputeRHSWeights<3>(cornerCoords, src_coord_,
-                                                   rhsWeights);
-      break;
-    default:
-      throw std::runtime_error("Unsupported order: " + std::to_string(order));
-  }
+  computeElementWeights(rhsElement[0], src_coord_, rhsWeights, 0);
 
   // Receiver computation
   int receiver_index = floor((rcv_coord_[0] * ex) / lx) +
@@ -525,43 +775,77 @@ void SEMproxy::init_source()
     rhsElementRcv[i] = receiver_index;
   }
 
-  // Get coordinates of the corners of the receiver element
-  float cornerCoordsRcv[8][3];
-  I = 0;
+  computeElementWeights(rhsElementRcv[0], rcv_coord_, rhsWeightsRcv, 0);
+}
+
+void SEMproxy::computeElementWeights(int element,
+                                     const std::array<float, 3>& coord,
+                                     arrayReal& weights, int row)
+{
+  // Get coordinates of the corners of the element
+  float cornerCoords[8][3];
+  int I = 0;
+  int nodes_corner[2] = {0, m_mesh->getOrder()};
   for (int k : nodes_corner)
   {
     for (int j : nodes_corner)
     {
       for (int i : nodes_corner)
       {
-        int nodeIdx = m_mesh->globalNodeIndex(rhsElementRcv[0], i, j, k);
-        cornerCoordsRcv[I][0] = m_mesh->nodeCoord(nodeIdx, 0);
-        cornerCoordsRcv[I][2] = m_mesh->nodeCoord(nodeIdx, 2);
-        cornerCoordsRcv[I][1] = m_mesh->nodeCoord(nodeIdx, 1);
+        int nodeIdx = m_mesh->globalNodeIndex(element, i, j, k);
+        cornerCoords[I][0] = m_mesh->nodeCoord(nodeIdx, 0);
+        cornerCoords[I][2] = m_mesh->nodeCoord(nodeIdx, 2);
+        cornerCoords[I][1] = m_mesh->nodeCoord(nodeIdx, 1);
         I++;
       }
     }
   }
 
+  int order = m_mesh->getOrder();
   switch (order)
   {
     case 1:
-      SourceAndReceiverUtils::ComputeRHSWeights<1>(cornerCoordsRcv, rcv_coord_,
-                                                   rhsWeightsRcv);
+      SourceAndReceiverUtils::ComputeRHSWeights<1>(cornerCoords, coord,
+                                                   weights, row);
       break;
     case 2:
-      SourceAndReceiverUtils::ComputeRHSWeights<2>(cornerCoordsRcv, rcv_coord_,
-                                                   rhsWeightsRcv);
+      SourceAndReceiverUtils::ComputeRHSWeights<2>(cornerCoords, coord,
+                                                   weights, row);
       break;
     case 3:
-      SourceAndReceiverUtils::ComputeRHSWeights<3>(cornerCoordsRcv, rcv_coord_,
-                                                   rhsWeightsRcv);
+      SourceAndReceiverUtils::ComputeRHSWeights<3>(cornerCoords, coord,
+                                                   weights, row);
       break;
     default:
       throw std::runtime_error("Unsupported order: " + std::to_string(order));
   }
 }
 
+void SEMproxy::initSismoWeights()
+{
+  const int nbPoints = sismoPoints.size();
+  sismoPointsElement.resize(nbPoints);
+  sismoPointsWeights = allocateArray2D<arrayReal>(
+      nbPoints, m_mesh->getNumberOfPointsPerElement(), "sismoPointsWeights");
+  for (int rcvIndex = 0; rcvIndex < nbPoints; rcvIndex++)
+  {
+    // elements are numbered x fastest, like the nodes; points outside of
+    // the domain are moved to its boundary
+    std::array<float, 3> coord;
+    int element = 0;
+    for (int d = 2; d >= 0; d--)
+    {
+      coord[d] = std::clamp(sismoPoints[rcvIndex][d], 0.f, domain_size_[d]);
+      const int e = std::min(
+          static_cast<int>(coord[d] * nb_elements_[d] / domain_size_[d]),
+          nb_elements_[d] - 1);
+      element = element * nb_elements_[d] + e;
+    }
+    sismoPointsElement[rcvIndex] = element;
+    computeElementWeights(element, coord, sismoPointsWeights, rcvIndex);
+  }
+}
+
 SolverFactory::implemType SEMproxy::getImplem(string implemArg)
 {
   if (implemArg == "makutu") return SolverFactory::MAKUTU;
@@ -612,103 +896,118 @@ char* float_to_cstring(float f) {
     return result;
 }
 
-void SEMproxy::computeHistogram(int timestep) {
-  // min et max
-  float min = std::numeric_limits<float>::infinity();
-  float max = -std::numeric_limits<float>::infinity();
-  for (int n = 0; n<m_mesh->getNumberOfNodes(); n++) {
-      float value = pnGlobal(n, 1);
-      min = fmin(value, min);
-      max = fmax(value, max);
-  }
-
-  int nb_bins = 10;
-  // calculer les bin edges
-  std::vector<float> bin_edges;
-  bin_edges.push_back(min);
-  float bin_width = (max-min)/nb_bins;
-  for (int i = 1; i<=nb_bins; i++) {
-    bin_edges.push_back(min + i*bin_width);
-  }
-
-  // calculer l'histogramme
-  std::vector<int> hist(nb_bins, 0);
-  if (min == max) {
-    hist[0] = m_mesh->getNumberOfNodes();    
-  }
-  else{
-    for (int n = 0; n<m_mesh->getNumberOfNodes(); n++) {
-        float value = pnGlobal(n, 1);
-        int idx = ((value - min) / bin_width);
-        if (idx == nb_bins) {
-          hist[nb_bins-1]++;
-        } 
-        else {hist[idx]++;}
-    }
+insitu::HistogramBins SEMproxy::makeHistogramBins(float min, float max) const
+{
+  if (!histogram_log_)
+  {
+    return insitu::HistogramBins::linear(histogram_nb_bins_, min, max);
   }
+  // log bins of |pressure| over histogram_log_decades_ below its maximum
+  float hi = std::max(std::abs(min), std::abs(max));
+  hi = std::max(hi, std::numeric_limits<float>::min());
+  float lo = hi / std::pow(10.0, histogram_log_decades_);
+  lo = std::max(lo, std::numeric_limits<float>::min());
+  return insitu::HistogramBins::logarithmic(histogram_nb_bins_, lo, hi);
+}
 
-  // save 
-  std::filesystem::path baseDir = executableDir();
-
-  std::filesystem::path filename = baseDir / ("../../data/histo/histo_" + std::to_string(timestep)
+void SEMproxy::computeHistogram(insitu::StepField& step) {
+  const int timestep = step.timestep();
+  std::filesystem::path filename = outputFile("histo", "histo_" + std::to_string(timestep)
                          + "_order" + std::to_string(order) + ".bin");
-  std::ofstream out(filename);
-  if (!out) {
-      std::cerr << "Error opening file " << filename<< ": " << std::strerror(errno) << "\n";
-      return;
-  }
-  out << "bin_edges:\n";
-  for (int i = 0; i<nb_bins+1; i++) {
-    out <<bin_edges[i] << ' ';
+
+  insitu::HistogramBins bins = histogram_bins_;
+  if (histogram_range_ == insitu::HistogramRange::Step)
+  {
+    // the range comes from a stats pass, shared with statsAnalysis
+    const insitu::FieldStats& stats = step.stats();
+    bins = makeHistogramBins(stats.min, stats.max);
   }
-  out << '\n';
-  out << "hist:\n";
-  for (int i = 0; i<nb_bins; i++) {
-    out << hist[i]<< ' ';
+  // with a known range this is the only pass over the field, its stats go
+  // to the analyses after this one
+  std::vector<long long> hist;
+  const insitu::FieldStats stats = insitu::reduceField(
+      pnGlobal, 1, m_mesh->getNumberOfNodes(), &bins, &hist);
+  step.setStats(stats);
+
+  histogram_seen_min_ = std::min(histogram_seen_min_, float(stats.min));
+  histogram_seen_max_ = std::max(histogram_seen_max_, float(stats.max));
+  if (histogram_cumulative_)
+  {
+    for (int b = 0; b < histogram_nb_bins_; b++) cumulative_hist_[b] += hist[b];
   }
-  out << '\n';
-  out.close();
+
+  const insitu::HistogramRange range = histogram_range_;
+  runOutput(
+      0, [](std::vector<float>&) {},
+      [filename, bins, hist, range](const std::vector<float>&) {
+        if (!insitu::writeHistogram(filename, bins, hist, range))
+        {
+          std::cerr << "Error opening file " << filename << ": "
+                    << std::strerror(errno) << "\n";
+        }
+      });
 }
 
-typedef std::complex<double> Complex;
+void SEMproxy::finalizeHistograms()
+{
+  if (!is_compute_histogram_ ||
+      histogram_seen_min_ > histogram_seen_max_)
+    return;
 
-std::vector<Complex> dft(const std::vector<Complex>& x) {
-    int N = x.size();
-    std::vector<Complex> X(N);
-    const double PI = std::acos(-1.0);
+  // range of this run, for the next runs with --histogram-range learned
+  std::filesystem::path rangeFile = outputFile(
+      "histo", "histo_range_order" + std::to_string(order) + ".txt");
+  if (!insitu::writeHistogramRange(rangeFile, histogram_seen_min_,
+                                   histogram_seen_max_))
+  {
+    std::cerr << "Error opening file " << rangeFile << ": "
+              << std::strerror(errno) << "\n";
+  }
 
-    for (int k = 0; k < N; ++k) {
-        X[k] = Complex(0, 0);
-        for (int n = 0; n < N; ++n) {
-            double angle = (2.0 * PI * k * n) / N;
-            Complex exponent(std::cos(angle), -std::sin(angle));
-            X[k] += x[n] * exponent;
-        }
+  if (histogram_cumulative_)
+  {
+    std::filesystem::path filename = outputFile(
+        "histo", "histo_cumulative_order" + std::to_string(order) + ".bin");
+    if (!insitu::writeHistogram(filename, histogram_bins_, cumulative_hist_,
+                                histogram_range_))
+    {
+      std::cerr << "Error opening file " << filename << ": "
+                << std::strerror(errno) << "\n";
     }
-    return X;
   }
+}
 
 void SEMproxy::computeFourier() {
-  for (int rcvIndex = 0; rcvIndex < sismoPoints.size(); rcvIndex++) {
-        std::vector<Complex> timeSignal;
-        timeSignal.reserve(num_sample_);
-        
-        for (int sample = 0; sample < num_sample_; sample++) {
-            timeSignal.push_back(Complex(pnAtSismoPoints(rcvIndex, sample), 0.0));
-        }
+  const int nb_receivers = sismoPoints.size();
+  if (nb_receivers == 0 || num_sample_ == 0) return;
+
+  // one plan for every receiver, the traces are gathered contiguously
+  insitu::RealFFTPlan plan(num_sample_);
+  std::vector<float> traces(static_cast<size_t>(nb_receivers) * num_sample_);
+  for (int rcvIndex = 0; rcvIndex < nb_receivers; rcvIndex++) {
+    for (int sample = 0; sample < num_sample_; sample++) {
+      traces[static_cast<size_t>(rcvIndex) * num_sample_ + sample] =
+          pnAtSismoPoints(rcvIndex, sample);
+    }
+  }
+  std::vector<insitu::Complex> spectra(static_cast<size_t>(nb_receivers) *
+                                       plan.spectrumSize());
+  plan.forwardBatch(traces.data(), nb_receivers, spectra.data());
+
+  for (int rcvIndex = 0; rcvIndex < nb_receivers; rcvIndex++) {
+        const insitu::Complex* fourierTransform =
+            spectra.data() + static_cast<size_t>(rcvIndex) * plan.spectrumSize();
 
-        std::vector<Complex> fourierTransform = dft(timeSignal);
-        
         // On ne garde que la moitié utile (jusqu'à la fréquence de Nyquist)
-        int half_n = fourierTransform.size() / 2;
+        int half_n = num_sample_ / 2;
 
-        std::ostringstream filename;
-        filename << "../data/fourier/fourier_insitu_" 
-                 << sismoPoints[rcvIndex][0] << "_" 
-                 << sismoPoints[rcvIndex][1] << "_" 
-                 << sismoPoints[rcvIndex][2] << ".csv";
+        std::ostringstream name;
+        name << "fourier_insitu_" 
+             << sismoPoints[rcvIndex][0] << "_" 
+             << sismoPoints[rcvIndex][1] << "_" 
+             << sismoPoints[rcvIndex][2] << ".csv";
           
-        std::ofstream file(filename.str());
+        std::ofstream file(outputFile("fourier", name.str()));
         if (file.is_open()) {
             file << "freq_idx,magnitude,real,imag\n";
             for (int k = 0; k < half_n; ++k) {
@@ -725,188 +1024,269 @@ void SEMproxy::computeFourier() {
         }
     }
 }
-void SEMproxy::saveSnapshot(int timestep){
-  std::filesystem::path baseDir = executableDir();
 
-  // std::filesystem::path filename = baseDir /
-  //     ("../../data/snapshot/snapshot_" +
-  //     std::to_string(timestep) +
-  //     "_order" + std::to_string(order) +
-  //     ".bin");
-
-  std::filesystem::path filename = ("/tmp/insitu/data/snapshot/snapshot_" +
-      std::to_string(timestep) +
-      "_order" + std::to_string(order) +
-      ".bin");
+void SEMproxy::initSTFT(int window, int hop, const std::string& taper)
+{
+  stft_ = std::make_unique<insitu::StreamingSTFT>(
+      sismoPoints.size(), window, hop, insitu::parseTaper(taper));
+  stft_samples_.resize(sismoPoints.size());
+
+  // On ne garde que la moitié utile (jusqu'à la fréquence de Nyquist)
+  std::filesystem::path filename = outputFile("fourier", "stft_insitu.bin");
+  stft_writer_ = std::make_unique<insitu::STFTWriter>(
+      filename, sismoPoints, window, hop, window / 2);
+  std::cout << "Short-time Fourier spectra every " << hop
+            << " samples over windows of " << window << " samples ("
+            << taper << " taper) in " << filename << std::endl;
+}
 
-  std::ofstream out(filename);
-  if (!out) {
-      std::cerr << "Error opening file " << filename<< ": " << std::strerror(errno) << "\n";
-      return;
+void SEMproxy::runOutput(size_t count,
+                         const std::function<void(std::vector<float>&)>& stage,
+                         insitu::AsyncWriter::Job write)
+{
+  if (async_writer_)
+  {
+    std::vector<float>& buffer = async_writer_->acquire(count);
+    stage(buffer);
+    async_writer_->submit(std::move(write));
+    return;
   }
+  staging_.resize(count);
+  stage(staging_);
+  write(staging_);
+}
 
-  // Parcours des noeuds
-  for (int n = 0; n < m_mesh->getNumberOfNodes(); n++) {
-    if ( m_mesh->nodeCoord(n,0) == 0 && n != 0 ){
-      out << "\n";
-    }
-      float value = pnGlobal(n, 1);
-      out << value;
-      out << " ";
+void SEMproxy::runOutput(const std::vector<float>& values,
+                         insitu::AsyncWriter::Job write)
+{
+  if (async_writer_)
+  {
+    std::vector<float>& buffer = async_writer_->acquire(values.size());
+    std::copy(values.begin(), values.end(), buffer.begin());
+    async_writer_->submit(std::move(write));
+    return;
   }
+  write(values);
+}
 
-  out.close();
-
+void SEMproxy::stageField(std::vector<float>& buffer)
+{
+  // pnGlobal(:,1) is not contiguous in memory, gather it first
+  field_gather_.gather(pnGlobal, 1, 0, m_mesh->getNumberOfNodes(),
+                       buffer.data());
 }
 
-void SEMproxy::saveSliceSnapshotBin(int timestep, int dim2Coord) {
+void SEMproxy::saveSnapshot(insitu::StepField& step){
+  const int timestep = step.timestep();
   std::filesystem::path baseDir = executableDir();
 
   // std::filesystem::path filename = baseDir /
-  //     ("../../data/slice_snapshot/slice-snapshot_" +
+  //     ("../../data/snapshot/snapshot_" +
   //     std::to_string(timestep) +
   //     "_order" + std::to_string(order) +
   //     ".bin");
-  std::filesystem::path filename = ("/tmp/insitu/data/slice_snapshot/slice-snapshot_" +
+
+  std::filesystem::path filename = outputFile("snapshot", "snapshot_" +
       std::to_string(timestep) +
       "_order" + std::to_string(order) +
       ".bin");
 
-  std::ofstream out(filename);
-  if (!out) {
-      std::cerr << "Error opening file " << filename<< ": " << std::strerror(errno) << "\n";
-      return;
-  }
+  const int origin[3] = {0, 0, 0};
+  insitu::SnapshotHeader header =
+      insitu::makeSnapshotHeader(nb_nodes_, origin, nb_nodes_, order, timestep);
+  const insitu::SnapshotFormat format = snapshot_format_;
+  const int nx = nb_nodes_[0];
+
+  // the field staged once for every analysis of the step
+  runOutput(
+      step.values(),
+      [writer = &snapshot_writer_, filename, header, format,
+       nx](const std::vector<float>& values) {
+        if (format == insitu::SnapshotFormat::Raw)
+        {
+          if (!writer->writeRaw(filename, header, values.data()))
+          {
+            std::cerr << "Error writing file " << filename << ": "
+                      << std::strerror(errno) << "\n";
+          }
+          return;
+        }
 
-  // on save un plan en fixant une coordonnée sur la dimension 2
-  if (nb_nodes_[2] <= dim2Coord) {
-    std::cerr << "The provided dim2Coord for slice snapshot is too high." << std::endl;
-    return;
+        // une ligne par rangée en X
+        if (!writer->writeText(filename, values.data(), values.size(), nx))
+        {
+          std::cerr << "Error writing file " << filename << ": "
+                    << std::strerror(errno) << "\n";
+        }
+      });
+}
+
+std::vector<insitu::SliceSpec> SEMproxy::sliceSpecs(
+    const SemProxyOptions& opt) const
+{
+  std::vector<insitu::SliceSpec> specs;
+  for (const std::string& text : opt.slices)
+  {
+    insitu::SliceSpec spec = insitu::parseSliceSpec(text);
+    if (spec.index < 0) spec.index = nodeIndexAt(spec.axis, spec.coordinate);
+    spec.name = std::string("slice-") + "xyz"[spec.axis] +
+                std::to_string(spec.index);
+    specs.push_back(spec);
+  }
+  if (opt.sliceSnapshotCoord != -1)
+  {
+    // legacy Z slice, same file names as before
+    insitu::SliceSpec spec;
+    spec.axis = 2;
+    spec.index = opt.sliceSnapshotCoord;
+    spec.format = opt.saveSliceSnapshotToPPM ? "ppm" : "";
+    spec.name = "slice-snapshot";
+    specs.push_back(spec);
+  }
+  for (insitu::SliceSpec& spec : specs)
+  {
+    if (spec.interval == 0) spec.interval = snap_time_interval_;
+    if (spec.format.empty()) spec.format = opt.snapshotFormat;
   }
-  int sizePlan = nb_nodes_[0] * nb_nodes_[1];
-  int start = dim2Coord * sizePlan;
-  int end = (dim2Coord + 1) * sizePlan;
-  // on veut save tout ce qui est entre start et end
-  for (int n = start; n<end; n++) {
-    if ( m_mesh->nodeCoord(n,0) == 0 && n != start ){
-      out << "\n";
+  // raw and text files of the same plane would both be .bin
+  for (insitu::SliceSpec& spec : specs)
+  {
+    for (const insitu::SliceSpec& other : specs)
+    {
+      if (other.name == spec.name && other.format != spec.format &&
+          spec.format == "text")
+      {
+        spec.name += "-text";
+        break;
+      }
     }
-      float value = pnGlobal(n, 1);
-      out << value;
-      out << " ";
   }
-  out.close();
-  std::cout << "Done saving slice snapshot" << std::endl;
-
+  return specs;
 }
 
-void SEMproxy::saveSliceSnapshotPPM(int timestep, int dim2Coord) {
-    std::filesystem::path baseDir = executableDir();
-    // std::filesystem::path filename = baseDir /
-    //   ("../../data/slice_snapshot/slice-snapshot_" +
-    //   std::to_string(timestep) +
-    //   "_order" + std::to_string(order) +
-    //   ".ppm");
-    std::filesystem::path filename = ("/tmp/insitu/data/slice_snapshot/slice-snapshot_" +
-      std::to_string(timestep) +
-      "_order" + std::to_string(order) +
-      ".ppm");
-
-    std::ofstream out(filename);
-    if (!out) {
-        std::cerr << "Error opening file " << filename<< ": " << std::strerror(errno) << "\n";
-        return;
-    }
-    // on save un plan en fixant une coordonnée sur la dimension 2
-    if (nb_nodes_[2] <= dim2Coord) {
-      std::cerr << "The provided dim2Coord for slice snapshot is too high." << std::endl;
-      return;
-    }
-
-    int largeur = nb_nodes_[0];
-    int hauteur = nb_nodes_[1];
-    int sizePlan = largeur * hauteur;
-    int start = dim2Coord * sizePlan;
-    int end = (dim2Coord + 1) * sizePlan;
-
-    out << "P3\n";
-    out << largeur << " " << hauteur << "\n";
-    out << "255\n"; // valeur max
-
-    // trouver le min / max local
-    float minVal = INFINITY;
-    float maxVal = -INFINITY;
-    for (int n = start; n<end; n++) {
-      float value = pnGlobal(n,1);
-      minVal = fmin(minVal, value);
-      maxVal = fmax(maxVal, value);
+int SEMproxy::nodeIndexAt(int axis, float coordinate) const
+{
+  // nodes are numbered x fastest then y then z
+  const int stride[3] = {1, nb_nodes_[0], nb_nodes_[0] * nb_nodes_[1]};
+  int closest = 0;
+  float distance = std::numeric_limits<float>::max();
+  for (int i = 0; i < nb_nodes_[axis]; i++)
+  {
+    const float d =
+        std::fabs(m_mesh->nodeCoord(i * stride[axis], axis) - coordinate);
+    if (d < distance)
+    {
+      distance = d;
+      closest = i;
     }
+  }
+  return closest;
+}
 
-    // on veut save tout ce qui est entre start et end
-    for (int n = start; n<end; n++) {
-      float value = pnGlobal(n, 1);
-
-      // normaliser la pression
-      float pr = (value - minVal) / (maxVal - minVal);
-      pr = fmax(0, pr);
-      pr = fmin(1, pr);
-      // gradient linéaire allant de couleur0 à couleur1
-      int R0=0, G0=0, B0=255;   // bleu
-      int R1=0, G1=255, B1=0;   // vert
-
-      int R = int((1-pr)*R0 + pr*R1);
-      int G = int((1-pr)*G0 + pr*G1);
-      int B = int((1-pr)*B0 + pr*B1);
-      
-
-      if (n > start) {
-        out << " ";
-      }
-      out << R << " " << G << " " << B;
-    }
+void SEMproxy::saveSlices(insitu::StepField& step)
+{
+  const int timestep = step.timestep();
+  // what the writer needs of each slice, the extractor moves on meanwhile
+  struct SliceFile
+  {
+    std::filesystem::path filename;
+    std::string format;
+    insitu::SnapshotHeader header;
+    insitu::SlicePlane plane;
+  };
+  std::vector<SliceFile> files;
+  for (const insitu::SliceExtractor::Selected& slice :
+       slice_extractor_->selected())
+  {
+    const std::string& format = slice.spec->format;
+    const std::string extension =
+        format == "ppm" || format == "png" ? "." + format : ".bin";
+    files.push_back(
+        {outputFile("slice_snapshot", slice.spec->name + "_" +
+                                          std::to_string(timestep) + "_order" +
+                                          std::to_string(order) + extension),
+         format,
+         insitu::makeSnapshotHeader(nb_nodes_, slice.plane.origin,
+                                    slice.plane.dims, order, timestep),
+         slice.plane});
+  }
 
-    out.close();
+  runOutput(
+      slice_extractor_->nodes().size(),
+      [this, &step](std::vector<float>& buffer) {
+        const std::vector<size_t>& nodes = slice_extractor_->nodes();
+        if (step.staged())
+        {
+          // the field is already on the host for another analysis
+          const std::vector<float>& values = step.values();
+          for (size_t n = 0; n < nodes.size(); n++)
+          {
+            buffer[n] = values[nodes[n]];
+          }
+          return;
+        }
+        // every plane in one pass over pnGlobal(:,1)
+        field_gather_.gather(pnGlobal, 1, nodes, slice_extractor_->version(),
+                             buffer.data());
+      },
+      [writer = &snapshot_writer_, images = &image_writer_,
+       files = std::move(files)](const std::vector<float>& values) {
+        for (const SliceFile& file : files)
+        {
+          const float* plane = values.data() + file.plane.offset;
+          bool written;
+          if (file.format == "ppm")
+            written = images->writePPM(file.filename, plane,
+                                       file.plane.rowLength(),
+                                       file.plane.rows());
+          else if (file.format == "png")
+            written = images->writePNG(file.filename, plane,
+                                       file.plane.rowLength(),
+                                       file.plane.rows());
+          else if (file.format == "raw")
+            written = writer->writeRaw(file.filename, file.header, plane);
+          else
+            written = writer->writeText(file.filename, plane,
+                                        file.plane.count(),
+                                        file.plane.rowLength());
+          if (!written)
+          {
+            std::cerr << "Error writing file " << file.filename << ": "
+                      << std::strerror(errno) << "\n";
+          }
+        }
+        std::cout << "Done saving slice snapshot" << std::endl;
+      });
 }
 
 
-void SEMproxy::statsAnalysis(int timestep){
-    double sum = 0.0;
-    double sumSquared = 0.0;
-    double minVal = std::numeric_limits<double>::infinity();
-    double maxVal = -std::numeric_limits<double>::infinity();
-    int count = 0;
+void SEMproxy::statsAnalysis(insitu::StepField& step){
+  const insitu::FieldStats& stats = step.stats();
 
-    // Parcours des noeuds
-    for (int n = 0; n < m_mesh->getNumberOfNodes(); n++) {
-        double value = pnGlobal(n, 1);
+  // the rest of the row is filled by the time loop
+  timeseries_->set(timeseries_->column("mean"), stats.mean);
+  timeseries_->set(timeseries_->column("variance"), stats.variance());
+  timeseries_->set(timeseries_->column("min"), stats.min);
+  timeseries_->set(timeseries_->column("max"), stats.max);
+  timeseries_->set(timeseries_->column("l2norm"), stats.l2Norm());
+}
 
-        sum += value;
-        sumSquared += value * value;
-        if (value < minVal) minVal = value;
-        if (value > maxVal) maxVal = value;
-        count++;
-    }
+void SEMproxy::appendTimeSeriesRow()
+{
+  if (timeseries_->endRow())
+  {
+    flushTimeSeries();
+  }
+}
 
-    double mean = sum / count;
-    double variance = (sumSquared / count) - (mean * mean);
-
-    std::ostringstream filename;
-    filename << "../data/stats/stats_insitu_" << timestep << ".csv";
-
-    std::ofstream file(filename.str());
-    if (file.is_open()) {
-        // Écriture de l'en-tête
-        file << "timestep,mean,variance,min,max\n";
-        // Écriture des valeurs
-        file << timestep << "," 
-             << mean << "," 
-             << variance << "," 
-             << minVal << "," 
-             << maxVal << "\n";
-        file.close();
-        std::cout << "Stats CSV saved for timestep " << timestep << std::endl;
-    } else {
-        std::cerr << "[Error] Impossible d'ouvrir le fichier : " 
-                  << filename.str() << std::endl;
-    }
-}
\ No newline at end of file
+void SEMproxy::flushTimeSeries()
+{
+  std::vector<double> block = timeseries_->takeBlock();
+  if (block.empty()) return;
+
+  insitu::TimeSeriesWriter* timeseries = timeseries_.get();
+  runOutput(0, [](std::vector<float>&) {},
+            [timeseries, block = std::move(block)](const std::vector<float>&) {
+              timeseries->writeBlock(block);
+            });
+}
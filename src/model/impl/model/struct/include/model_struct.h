@@ -352,6 +352,17 @@ class ModelStruct : public ModelApi<FloatType, ScalarType>
   PROXY_HOST_DEVICE
   ScalarType getNumberOfElements() const { return ex_ * ey_ * ez_; }
 
+  /**
+   * @brief Get the number of elements along one axis.
+   * @param dim Dimension index (0 = x, 1 = y, 2 = z)
+   * @return Element count in the specified dimension
+   */
+  PROXY_HOST_DEVICE
+  ScalarType getNumberOfElementsInDim(int dim) const
+  {
+    return dim == 0 ? ex_ : (dim == 1 ? ey_ : ez_);
+  }
+
   /**
    * @brief Get the total number of global nodes in the mesh.
    * @return Total node count
@@ -0,0 +1,91 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  element_coloring.h: colour classes of the elements of a mesh
+//
+//  Two elements of the same colour share no node, so the elements of one
+//  colour can add their contributions to the global vectors without
+//  atomics. Structured meshes use 8 colours, the parity of the element
+//  indices along each axis. Other meshes are coloured greedily: each
+//  element takes the lowest colour not yet used at any of its nodes.
+//************************************************************************
+
+#ifndef ELEMENT_COLORING_HPP_
+#define ELEMENT_COLORING_HPP_
+
+#include <cstdint>
+#include <stdexcept>
+#include <string>
+#include <type_traits>
+#include <utility>
+#include <vector>
+
+/// Largest number of colours of a greedy colouring.
+constexpr int kMaxElementColors = 64;
+
+/// True for meshes laid out as a grid of elements, x fastest.
+template <typename MESH, typename = void>
+struct IsStructuredMesh : std::false_type
+{
+};
+
+template <typename MESH>
+struct IsStructuredMesh<MESH,
+                        std::void_t<decltype(std::declval<const MESH &>()
+                                                 .getNumberOfElementsInDim(0))>>
+    : std::true_type
+{
+};
+
+/**
+ * @brief Colour of every element of mesh, from 0 to the number of colours
+ *        minus one.
+ */
+template <typename MESH>
+std::vector<int> elementColors(const MESH &mesh)
+{
+  const int numElements = mesh.getNumberOfElements();
+  std::vector<int> colors(numElements);
+
+  if constexpr (IsStructuredMesh<MESH>::value)
+  {
+    const int ex = mesh.getNumberOfElementsInDim(0);
+    const int ey = mesh.getNumberOfElementsInDim(1);
+    for (int e = 0; e < numElements; e++)
+    {
+      const int ix = e % ex;
+      const int iy = (e / ex) % ey;
+      const int iz = e / (ex * ey);
+      colors[e] = (ix % 2) + 2 * (iy % 2) + 4 * (iz % 2);
+    }
+  }
+  else
+  {
+    const int order = mesh.getOrder();
+    // colours of the elements already coloured at each node
+    std::vector<uint64_t> used(mesh.getNumberOfNodes(), 0);
+    for (int e = 0; e < numElements; e++)
+    {
+      uint64_t taken = 0;
+      for (int k = 0; k <= order; k++)
+        for (int j = 0; j <= order; j++)
+          for (int i = 0; i <= order; i++)
+            taken |= used[mesh.globalNodeIndex(e, i, j, k)];
+      if (~taken == 0)
+        throw std::runtime_error("Element colouring needs more than " +
+                                 std::to_string(kMaxElementColors) +
+                                 " colours");
+
+      int color = 0;
+      while (taken >> color & 1) color++;
+      colors[e] = color;
+      for (int k = 0; k <= order; k++)
+        for (int j = 0; j <= order; j++)
+          for (int i = 0; i <= order; i++)
+            used[mesh.globalNodeIndex(e, i, j, k)] |= uint64_t(1) << color;
+    }
+  }
+  return colors;
+}
+
+#endif  // ELEMENT_COLORING_HPP_
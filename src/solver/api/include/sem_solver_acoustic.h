@@ -13,6 +13,7 @@
 #define SEM_SOLVER_ACOUSTIC_HPP_
 
 #include <data_type.h>
+#include <element_coloring.h>
 #include <model.h>
 #include <sem_solver_base.h>
 
@@ -83,6 +84,20 @@ class SEMsolverAcoustic : public SEMSolverBase
                      const bool surface_sponge,
                      const float taper_delta_) override;
 
+  /**
+   * @brief Choose the element geometry kept between time steps.
+   *
+   * @param mode What computeFEInit precomputes for the stiffness loop.
+   */
+  void setGeometryCache(GeometryCache mode) override { geometryCache_ = mode; }
+
+  /**
+   * @brief Choose how the element contributions are assembled.
+   *
+   * @param mode With Assembly::Coloring, computeFEInit colours the elements.
+   */
+  void setAssembly(Assembly mode) override { assembly_ = mode; }
+
   /**
    * @brief Compute one time step of the elastic wave equation solver.
    *
@@ -110,6 +125,16 @@ class SEMsolverAcoustic : public SEMSolverBase
    */
   void initSpongeValues() override;
 
+  /**
+   * @brief Precompute the element geometry selected by setGeometryCache.
+   */
+  void initGeometryCache();
+
+  /**
+   * @brief Sort the elements by colour for Assembly::Coloring.
+   */
+  void initElementColors();
+
   /**
    * @brief Reset global FE vectors (mass, stiffness) before accumulation.
    *
@@ -172,6 +197,15 @@ class SEMsolverAcoustic : public SEMSolverBase
   void updatePressureField(float dt, int i1, int i2,
                            const ARRAY_REAL_VIEW &pnGlobal);
 
+  /**
+   * @brief Coordinates of the 8 corners of an element, read from the mesh.
+   *
+   * @param elementNumber Element index.
+   * @param cornerCoords Corner coordinates, x fastest then y then z.
+   */
+  PROXY_HOST_DEVICE void elementCorners(int elementNumber,
+                                        float (&cornerCoords)[8][3]) const;
+
  private:
   MESH_TYPE m_mesh;  ///< Computational mesh
 
@@ -188,6 +222,21 @@ class SEMsolverAcoustic : public SEMSolverBase
   VECTOR_REAL_VIEW spongeTaperCoeff;  ///< Sponge tapering coefficients
   VECTOR_REAL_VIEW massMatrixGlobal;  ///< Global mass matrix
   VECTOR_REAL_VIEW yGlobal;           ///< Global pressure work vector
+
+  GeometryCache geometryCache_ = GeometryCache::None;
+  /// Global node of each local node, nPointsElement per element
+  VECTOR_INT_VIEW elementNodes;
+  /// Corner coordinates, 8 x 3 per element (GeometryCache::Corners)
+  VECTOR_REAL_VIEW elementCornerCoords;
+  /// Jacobian factors B, 6 per quadrature point (GeometryCache::Jacobian)
+  VECTOR_REAL_VIEW elementJacobians;
+
+  Assembly assembly_ = Assembly::Atomic;
+  /// Elements sorted by colour (Assembly::Coloring)
+  VECTOR_INT_VIEW elementsByColor;
+  /// Colour c spans elementsByColor [colorOffsets[c], colorOffsets[c + 1])
+  int colorOffsets[kMaxElementColors + 1] = {0};
+  int numberOfColors = 0;
 };
 
 #endif  // SEM_SOLVER_ACOUSTIC_HPP_
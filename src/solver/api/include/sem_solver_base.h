@@ -5,10 +5,79 @@
 #include <solver_base.h>
 
 #include <cmath>
+#include <stdexcept>
+#include <string>
+
+/**
+ * @brief Element geometry kept by a SEM solver for its time steps.
+ *
+ * The mesh never moves, so what the stiffness loop derives from it at each
+ * step can be computed once in computeFEInit, at the cost of memory.
+ */
+enum class GeometryCache
+{
+  None,     ///< recompute the element nodes and corners at each step
+  Corners,  ///< keep the element nodes and corner coordinates
+  Jacobian  ///< keep the element nodes and the Jacobian factors of every
+            ///< quadrature point
+};
+
+inline GeometryCache parseGeometryCache(const std::string &name)
+{
+  if (name == "none") return GeometryCache::None;
+  if (name == "corners") return GeometryCache::Corners;
+  if (name == "jacobian") return GeometryCache::Jacobian;
+
+  throw std::invalid_argument(
+      "Geometry cache must be none, corners or jacobian, got " + name);
+}
+
+/**
+ * @brief How the element contributions are added to the global vectors.
+ */
+enum class Assembly
+{
+  Atomic,   ///< every element at once, atomic adds on the shared nodes
+  Coloring  ///< one colour of elements sharing no node at a time, plain adds
+};
+
+inline Assembly parseAssembly(const std::string &name)
+{
+  if (name == "atomic") return Assembly::Atomic;
+  if (name == "coloring") return Assembly::Coloring;
+
+  throw std::invalid_argument("Assembly must be atomic or coloring, got " +
+                              name);
+}
 
 class SEMSolverBase : public SolverBase
 {
  public:
+  /**
+   * @brief Choose the element geometry kept between time steps; must be
+   * called before computeFEInit.
+   *
+   * @param mode GeometryCache::None unless the solver overrides it.
+   */
+  virtual void setGeometryCache(GeometryCache mode)
+  {
+    if (mode != GeometryCache::None)
+      throw std::invalid_argument(
+          "Geometry cache is not supported by this solver");
+  }
+
+  /**
+   * @brief Choose how the element contributions are assembled; must be
+   * called before computeFEInit.
+   *
+   * @param mode Assembly::Atomic unless the solver overrides it.
+   */
+  virtual void setAssembly(Assembly mode)
+  {
+    if (mode != Assembly::Atomic)
+      throw std::invalid_argument("Assembly is not supported by this solver");
+  }
+
   /**
    * @brief Initialize all finite element structures:
    * basis functions, integrals, global arrays, and sponge boundaries.
@@ -1,7 +1,10 @@
 #include <data_type.h>
+#include <profiler.h>
 
+#include <algorithm>
 #include <array>
 #include <cstdlib>
+#include <vector>
 
 #include "fe/Integrals.hpp"
 #include "sem_solver_acoustic.h"
@@ -30,7 +33,9 @@ void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE, IS_MODEL_ON_NODES>::
 
   allocateFEarrays();
   initFEarrays();
+  initElementColors();
   computeGlobalMassMatrix();
+  initGeometryCache();
 }
 
 template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
@@ -49,14 +54,27 @@ void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE, IS_MODEL_ON_NODES>::
   VECTOR_INT_VIEW const &rhsElement = myData.m_rhsElement;
   ARRAY_REAL_VIEW const &rhsWeights = myData.m_rhsWeights;
 
-  resetGlobalVectors(m_mesh.getNumberOfNodes());
-  FENCE
-  applyRHSTerm(timeSample, dt, i2, rhsTerm, rhsElement, rhsWeights);
-  FENCE
-  computeElementContributions(i2, pnGlobal);
-  FENCE
-  updatePressureField(dt, i1, i2, pnGlobal);
-  FENCE
+  // each phase is timed up to its fence, i.e. until its kernel is done
+  {
+    PROFILE_REGION("resetGlobalVectors");
+    resetGlobalVectors(m_mesh.getNumberOfNodes());
+    FENCE
+  }
+  {
+    PROFILE_REGION("applyRHSTerm");
+    applyRHSTerm(timeSample, dt, i2, rhsTerm, rhsElement, rhsWeights);
+    FENCE
+  }
+  {
+    PROFILE_REGION("computeElementContributions");
+    computeElementContributions(i2, pnGlobal);
+    FENCE
+  }
+  {
+    PROFILE_REGION("updatePressureField");
+    updatePressureField(dt, i1, i2, pnGlobal);
+    FENCE
+  }
 }
 
 template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
@@ -102,70 +120,96 @@ template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
 void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE, IS_MODEL_ON_NODES>::
     computeElementContributions(int i2, const ARRAY_REAL_VIEW &pnGlobal)
 {
-  MAINLOOPHEAD(m_mesh.getNumberOfElements(), elementNumber)
-
-  // Guard for extra threads (Kokkos might launch more than needed)
-  if (elementNumber >= m_mesh.getNumberOfElements()) return;
-
-  float pnLocal[nPointsElement] = {0};
-  float Y[nPointsElement] = {0};
-
-  int dim = m_mesh.getOrder() + 1;
-  for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
+  // with Assembly::Coloring, one launch per colour: the elements of a colour
+  // share no node, so their contributions are added without atomics
+  const bool colored = assembly_ == Assembly::Coloring;
+  for (int color = 0; color < (colored ? numberOfColors : 1); color++)
   {
-    int x = i % dim;
-    int z = (i / dim) % dim;
-    int y = i / (dim * dim);
-    int const globalIdx = m_mesh.globalNodeIndex(elementNumber, x, y, z);
-    pnLocal[i] = pnGlobal(globalIdx, i2);
-  }
+    const int first = colored ? colorOffsets[color] : 0;
+    const int count = colored ? colorOffsets[color + 1] - first
+                              : m_mesh.getNumberOfElements();
+    MAINLOOPHEAD(count, e)
+
+    // Guard for extra threads (Kokkos might launch more than needed)
+    if (e >= count) return;
+    const int elementNumber = colored ? elementsByColor[first + e] : e;
+
+    float pnLocal[nPointsElement] = {0};
+    float Y[nPointsElement] = {0};
+
+    int dim = m_mesh.getOrder() + 1;
+    // global node of the local node x + z * dim + y * dim * dim
+    const bool cachedNodes = geometryCache_ != GeometryCache::None;
+    auto nodeIndex = [&](const int i) {
+      if (cachedNodes) return elementNodes[elementNumber * nPointsElement + i];
+      int x = i % dim;
+      int z = (i / dim) % dim;
+      int y = i / (dim * dim);
+      return m_mesh.globalNodeIndex(elementNumber, x, y, z);
+    };
+
+    for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
+    {
+      pnLocal[i] = pnGlobal(nodeIndex(i), i2);
+    }
 
-  float cornerCoords[8][3];
-  int I = 0;
-  int nodes_corner[2] = {0, m_mesh.getOrder()};
-  for (int k : nodes_corner)
-  {
-    for (int j : nodes_corner)
+    real_t inv_density = 0.0f;
+    if constexpr (!IS_MODEL_ON_NODES)
     {
-      for (int i : nodes_corner)
-      {
-        int nodeIdx = m_mesh.globalNodeIndex(elementNumber, i, j, k);
-        cornerCoords[I][0] = m_mesh.nodeCoord(nodeIdx, 0);
-        cornerCoords[I][2] = m_mesh.nodeCoord(nodeIdx, 2);
-        cornerCoords[I][1] = m_mesh.nodeCoord(nodeIdx, 1);
-        I++;
-      }
+      inv_density = 1.0f / m_mesh.getModelRhoOnElement(elementNumber);
     }
-  }
 
-  real_t inv_density = 0.0f;
-  if constexpr (!IS_MODEL_ON_NODES)
-  {
-    inv_density = 1.0f / m_mesh.getModelRhoOnElement(elementNumber);
-  }
+    auto addStiffness = [&](const int qa, const int qb, const int qc,
+                            const int i, const int j, const real_t val) {
+      if constexpr (IS_MODEL_ON_NODES)
+      {
+        int const gIndex = nodeIndex(qa + qc * dim + qb * dim * dim);
+        inv_density = 1.0f / m_mesh.getModelRhoOnNodes(gIndex);
+      }
+      float localIncrement = inv_density * val * pnLocal[j];
+      Y[i] += localIncrement;
+    };
 
-  INTEGRAL_TYPE::computeStiffnessTerm(
-      cornerCoords, [&](const int qa, const int qb, const int qc, const int i,
-                        const int j, const real_t val) {
-        if constexpr (IS_MODEL_ON_NODES)
+    if (geometryCache_ == GeometryCache::Jacobian)
+    {
+      const int first = elementNumber * INTEGRAL_TYPE::numQuadraturePoints * 6;
+      INTEGRAL_TYPE::computeStiffnessTermFromB(
+          [&](const int q, const int c) {
+            return elementJacobians[first + q * 6 + c];
+          },
+          addStiffness);
+    }
+    else
+    {
+      float cornerCoords[8][3];
+      if (geometryCache_ == GeometryCache::Corners)
+      {
+        for (int c = 0; c < 8; c++)
         {
-          int const gIndex = m_mesh.globalNodeIndex(elementNumber, qa, qb, qc);
-          inv_density = 1.0f / m_mesh.getModelRhoOnNodes(gIndex);
+          for (int d = 0; d < 3; d++)
+          {
+            cornerCoords[c][d] =
+                elementCornerCoords[(elementNumber * 8 + c) * 3 + d];
+          }
         }
-        float localIncrement = inv_density * val * pnLocal[j];
-        Y[i] += localIncrement;
-      });
+      }
+      else
+      {
+        elementCorners(elementNumber, cornerCoords);
+      }
+      INTEGRAL_TYPE::computeStiffnessTerm(cornerCoords, addStiffness);
+    }
 
-  for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
-  {
-    int x = i % dim;
-    int z = (i / dim) % dim;
-    int y = i / (dim * dim);
-    int const gIndex = m_mesh.globalNodeIndex(elementNumber, x, y, z);
-    ATOMICADD(yGlobal[gIndex], Y[i]);
-  }
+    for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
+    {
+      if (colored)
+        yGlobal[nodeIndex(i)] += Y[i];
+      else
+        ATOMICADD(yGlobal[nodeIndex(i)], Y[i]);
+    }
 
-  MAINLOOPEND
+    MAINLOOPEND
+  }
 }
 
 template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
@@ -213,16 +257,69 @@ template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
 void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE,
                        IS_MODEL_ON_NODES>::computeGlobalMassMatrix()
 {
-  MAINLOOPHEAD(m_mesh.getNumberOfElements(), elementNumber)
+  // with Assembly::Coloring, one launch per colour: the elements of a colour
+  // share no node, so their contributions are added without atomics
+  const bool colored = assembly_ == Assembly::Coloring;
+  for (int color = 0; color < (colored ? numberOfColors : 1); color++)
+  {
+    const int first = colored ? colorOffsets[color] : 0;
+    const int count = colored ? colorOffsets[color + 1] - first
+                              : m_mesh.getNumberOfElements();
+    MAINLOOPHEAD(count, e)
 
-  // Guard for extra threads (Kokkos might launch more than needed)
-  if (elementNumber >= m_mesh.getNumberOfElements()) return;
+    // Guard for extra threads (Kokkos might launch more than needed)
+    if (e >= count) return;
+    const int elementNumber = colored ? elementsByColor[first + e] : e;
 
-  float massMatrixLocal[nPointsElement] = {0};
+    float massMatrixLocal[nPointsElement] = {0};
 
-  int dim = m_mesh.getOrder() + 1;
+    int dim = m_mesh.getOrder() + 1;
 
-  float cornerCoords[8][3];
+    float cornerCoords[8][3];
+    elementCorners(elementNumber, cornerCoords);
+
+    real_t inv_model2 = 0.0f;
+    if constexpr (!IS_MODEL_ON_NODES)
+    {
+      inv_model2 = 1.0f / (m_mesh.getModelVpOnElement(elementNumber) *
+                           m_mesh.getModelVpOnElement(elementNumber) *
+                           m_mesh.getModelRhoOnElement(elementNumber));
+    }
+
+    INTEGRAL_TYPE::computeMassTerm(
+        cornerCoords,
+        [&](const int j, const real_t val) { massMatrixLocal[j] += val; });
+
+    for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
+    {
+      int x = i % dim;
+      int z = (i / dim) % dim;
+      int y = i / (dim * dim);
+      int const gIndex = m_mesh.globalNodeIndex(elementNumber, x, y, z);
+      if constexpr (IS_MODEL_ON_NODES)
+      {
+        inv_model2 = 1.0f / (m_mesh.getModelVpOnNodes(gIndex) *
+                             m_mesh.getModelVpOnNodes(gIndex) *
+                             m_mesh.getModelRhoOnNodes(gIndex));
+      }
+      massMatrixLocal[i] *= inv_model2;
+      if (colored)
+        massMatrixGlobal[gIndex] += massMatrixLocal[i];
+      else
+        ATOMICADD(massMatrixGlobal[gIndex], massMatrixLocal[i]);
+    }
+
+    MAINLOOPEND
+  }
+}
+
+template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
+          bool IS_MODEL_ON_NODES>
+PROXY_HOST_DEVICE void SEMsolverAcoustic<
+    ORDER, INTEGRAL_TYPE, MESH_TYPE,
+    IS_MODEL_ON_NODES>::elementCorners(int elementNumber,
+                                       float (&cornerCoords)[8][3]) const
+{
   int I = 0;
   int nodes_corner[2] = {0, m_mesh.getOrder()};
   for (int k : nodes_corner)
@@ -239,36 +336,101 @@ void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE,
       }
     }
   }
+}
 
-  real_t inv_model2 = 0.0f;
-  if constexpr (!IS_MODEL_ON_NODES)
+template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
+          bool IS_MODEL_ON_NODES>
+void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE,
+                       IS_MODEL_ON_NODES>::initGeometryCache()
+{
+  if (geometryCache_ == GeometryCache::None) return;
+
+  const int numElements = m_mesh.getNumberOfElements();
+  elementNodes = allocateVector<VECTOR_INT_VIEW>(numElements * nPointsElement,
+                                                 "elementNodes");
+  if (geometryCache_ == GeometryCache::Corners)
   {
-    inv_model2 = 1.0f / (m_mesh.getModelVpOnElement(elementNumber) *
-                         m_mesh.getModelVpOnElement(elementNumber) *
-                         m_mesh.getModelRhoOnElement(elementNumber));
+    elementCornerCoords = allocateVector<VECTOR_REAL_VIEW>(
+        numElements * 8 * 3, "elementCornerCoords");
+  }
+  else
+  {
+    elementJacobians = allocateVector<VECTOR_REAL_VIEW>(
+        numElements * INTEGRAL_TYPE::numQuadraturePoints * 6,
+        "elementJacobians");
   }
 
-  INTEGRAL_TYPE::computeMassTerm(
-      cornerCoords,
-      [&](const int j, const real_t val) { massMatrixLocal[j] += val; });
-
-  for (int i = 0; i < m_mesh.getNumberOfPointsPerElement(); ++i)
+  LOOPHEAD(numElements, elementNumber)
   {
-    int x = i % dim;
-    int z = (i / dim) % dim;
-    int y = i / (dim * dim);
-    int const gIndex = m_mesh.globalNodeIndex(elementNumber, x, y, z);
-    if constexpr (IS_MODEL_ON_NODES)
+    int dim = m_mesh.getOrder() + 1;
+    for (int i = 0; i < nPointsElement; ++i)
     {
-      inv_model2 = 1.0f / (m_mesh.getModelVpOnNodes(gIndex) *
-                           m_mesh.getModelVpOnNodes(gIndex) *
-                           m_mesh.getModelRhoOnNodes(gIndex));
+      int x = i % dim;
+      int z = (i / dim) % dim;
+      int y = i / (dim * dim);
+      elementNodes[elementNumber * nPointsElement + i] =
+          m_mesh.globalNodeIndex(elementNumber, x, y, z);
     }
-    massMatrixLocal[i] *= inv_model2;
-    ATOMICADD(massMatrixGlobal[gIndex], massMatrixLocal[i]);
+
+    float cornerCoords[8][3];
+    elementCorners(elementNumber, cornerCoords);
+    if (geometryCache_ == GeometryCache::Corners)
+    {
+      for (int c = 0; c < 8; c++)
+      {
+        for (int d = 0; d < 3; d++)
+        {
+          elementCornerCoords[(elementNumber * 8 + c) * 3 + d] =
+              cornerCoords[c][d];
+        }
+      }
+    }
+    else
+    {
+      float B[INTEGRAL_TYPE::numQuadraturePoints][6];
+      INTEGRAL_TYPE::computeBMatrices(cornerCoords, B);
+      const int first = elementNumber * INTEGRAL_TYPE::numQuadraturePoints * 6;
+      for (int q = 0; q < INTEGRAL_TYPE::numQuadraturePoints; q++)
+      {
+        for (int c = 0; c < 6; c++)
+        {
+          elementJacobians[first + q * 6 + c] = B[q][c];
+        }
+      }
+    }
+  }
+  LOOPEND
+
+  FENCE
+}
+
+template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
+          bool IS_MODEL_ON_NODES>
+void SEMsolverAcoustic<ORDER, INTEGRAL_TYPE, MESH_TYPE,
+                       IS_MODEL_ON_NODES>::initElementColors()
+{
+  if (assembly_ != Assembly::Coloring) return;
+
+  const std::vector<int> colors = elementColors(m_mesh);
+  numberOfColors = 0;
+  for (int color : colors) numberOfColors = max(numberOfColors, color + 1);
+
+  // counting sort of the elements by colour
+  std::fill(colorOffsets, colorOffsets + kMaxElementColors + 1, 0);
+  for (int color : colors) colorOffsets[color + 1]++;
+  for (int color = 0; color < numberOfColors; color++)
+  {
+    colorOffsets[color + 1] += colorOffsets[color];
+  }
+  elementsByColor =
+      allocateVector<VECTOR_INT_VIEW>(colors.size(), "elementsByColor");
+  std::vector<int> next(colorOffsets, colorOffsets + numberOfColors);
+  for (int e = 0; e < static_cast<int>(colors.size()); e++)
+  {
+    elementsByColor[next[colors[e]]++] = e;
   }
 
-  MAINLOOPEND
+  FENCE
 }
 
 template <int ORDER, typename INTEGRAL_TYPE, typename MESH_TYPE,
@@ -33,7 +33,7 @@
 #define MAINLOOPEND \
   });
 
-#elif defined(USE_KOKKOS) && !defined(SEM_MESHCOLOR)
+#elif defined(USE_KOKKOS)
 #define LaunchMaxThreadsPerBlock 64
 #define LaunchMinBlocksPerSM 1
 #define MAINLOOPHEAD(Range, Iterator)                                                                                          \
@@ -42,16 +42,6 @@
 #define MAINLOOPEND \
   });
 
-#elif defined(SEM_MESHCOLOR)
-#define MAINLOOPHEAD(Range, Iterator)                         \
-  for (int color = 0; color < myInfo.numberOfColors; color++) \
-  {                                                           \
-    LOOPHEAD(myInfo.numberOfElementsByColor[color], eColor)   \
-    int Iterator = listOfElementsByColor(color, eColor);
-#define MAINLOOPEND \
-  });               \
-  }
-
 #else
 #define MAINLOOPHEAD LOOPHEAD
 #define MAINLOOPEND LOOPEND
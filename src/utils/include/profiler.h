@@ -0,0 +1,222 @@
+//************************************************************************
+//   proxy application v.0.0.1
+//
+//  profiler.h: timed regions of the hot path, summarized per phase
+//
+//  A region is opened by PROFILE_REGION("name") and closed at the end of
+//  its scope. Every call of a region is timed on the host, so a region
+//  around a kernel launch must end after the fence of that kernel. The
+//  calls of a region are summarized (count, total, min, max, percentiles)
+//  and, when tracing, saved as Chrome trace events (chrome://tracing,
+//  Perfetto). While the profiler is disabled a region costs one branch.
+//  With Kokkos every region is also a Kokkos Tools region, seen by the
+//  tools loaded with --kokkos-tools-libs, whether the profiler is enabled
+//  or not. Regions are opened and closed by the host thread only.
+//************************************************************************
+
+#ifndef PROFILER_HPP_
+#define PROFILER_HPP_
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <filesystem>
+#include <fstream>
+#include <limits>
+#include <string>
+#include <vector>
+
+#include "common_config.h"
+
+#if defined(USE_KOKKOS)
+#include <Kokkos_Core.hpp>
+#endif
+
+/**
+ * @brief Times and calls of the profiled regions of the run.
+ */
+class Profiler
+{
+ public:
+  using Clock = std::chrono::steady_clock;
+
+  /**
+   * @brief Calls of one region, times in microseconds.
+   */
+  struct Summary
+  {
+    std::string name;
+    size_t count = 0;
+    double total = 0;
+    double min = 0;
+    double max = 0;
+    double p50 = 0;
+    double p90 = 0;
+    double p99 = 0;
+  };
+
+  static Profiler& instance()
+  {
+    static Profiler profiler;
+    return profiler;
+  }
+
+  static bool enabled() { return enabled_; }
+  bool tracing() const { return tracing_; }
+
+  /**
+   * @brief Start recording the regions, from now on.
+   * @param trace also keep every call for writeChromeTrace()
+   */
+  void enable(bool trace)
+  {
+    enabled_ = true;
+    tracing_ = trace;
+    origin_ = Clock::now();
+  }
+
+  /// Id of the region called name, registered on first use.
+  int regionId(const std::string& name)
+  {
+    for (size_t id = 0; id < regions_.size(); id++)
+    {
+      if (regions_[id].name == name) return static_cast<int>(id);
+    }
+    regions_.push_back({name, {}});
+    return static_cast<int>(regions_.size()) - 1;
+  }
+
+  const std::string& regionName(int id) const { return regions_[id].name; }
+
+  /// Record a call of region id.
+  void record(int id, Clock::time_point start, Clock::time_point end)
+  {
+    const double duration =
+        std::chrono::duration<double, std::micro>(end - start).count();
+    regions_[id].durations.push_back(duration);
+    if (tracing_)
+    {
+      const double begin =
+          std::chrono::duration<double, std::micro>(start - origin_).count();
+      events_.push_back({id, begin, duration});
+    }
+  }
+
+  /// Summaries of the regions called at least once, in registration order.
+  std::vector<Summary> summaries() const
+  {
+    std::vector<Summary> result;
+    for (const Region& region : regions_)
+    {
+      if (region.durations.empty()) continue;
+      std::vector<double> sorted = region.durations;
+      std::sort(sorted.begin(), sorted.end());
+      Summary summary;
+      summary.name = region.name;
+      summary.count = sorted.size();
+      for (double duration : sorted) summary.total += duration;
+      summary.min = sorted.front();
+      summary.max = sorted.back();
+      summary.p50 = percentile(sorted, 50);
+      summary.p90 = percentile(sorted, 90);
+      summary.p99 = percentile(sorted, 99);
+      result.push_back(summary);
+    }
+    return result;
+  }
+
+  /**
+   * @brief Write the calls recorded while tracing as Chrome trace events.
+   * @return false if the file could not be written
+   */
+  bool writeChromeTrace(const std::filesystem::path& filename) const
+  {
+    std::ofstream out(filename);
+    if (!out) return false;
+    out.precision(std::numeric_limits<double>::max_digits10);
+    out << "{\"displayTimeUnit\":\"ms\",\"traceEvents\":[";
+    for (size_t i = 0; i < events_.size(); i++)
+    {
+      const Event& event = events_[i];
+      out << (i ? ",\n" : "\n") << "{\"name\":\"" << regions_[event.id].name
+          << "\",\"cat\":\"semproxy\",\"ph\":\"X\",\"pid\":0,\"tid\":0"
+          << ",\"ts\":" << event.begin << ",\"dur\":" << event.duration << "}";
+    }
+    out << "\n]}\n";
+    return static_cast<bool>(out);
+  }
+
+ private:
+  struct Region
+  {
+    std::string name;
+    std::vector<double> durations;
+  };
+
+  struct Event
+  {
+    int id;
+    double begin;  ///< from enable()
+    double duration;
+  };
+
+  Profiler() = default;
+
+  // nearest rank percentile of sorted values
+  static double percentile(const std::vector<double>& sorted, double p)
+  {
+    const size_t rank = static_cast<size_t>(std::ceil(p / 100 * sorted.size()));
+    return sorted[std::max<size_t>(rank, 1) - 1];
+  }
+
+  static inline bool enabled_ = false;
+  bool tracing_ = false;
+  Clock::time_point origin_;
+  std::vector<Region> regions_;
+  std::vector<Event> events_;
+};
+
+/**
+ * @brief Region timed from its construction to its destruction.
+ */
+class ProfileRegion
+{
+ public:
+  explicit ProfileRegion(int id) : id_(id), timed_(Profiler::enabled())
+  {
+#if defined(USE_KOKKOS)
+    Kokkos::Profiling::pushRegion(Profiler::instance().regionName(id));
+#endif
+    if (timed_) start_ = Profiler::Clock::now();
+  }
+
+  ~ProfileRegion()
+  {
+    if (timed_)
+      Profiler::instance().record(id_, start_, Profiler::Clock::now());
+#if defined(USE_KOKKOS)
+    Kokkos::Profiling::popRegion();
+#endif
+  }
+
+  ProfileRegion(const ProfileRegion&) = delete;
+  ProfileRegion& operator=(const ProfileRegion&) = delete;
+
+ private:
+  int id_;
+  bool timed_;
+  Profiler::Clock::time_point start_;
+};
+
+#define PROFILE_CONCAT_(a, b) a##b
+#define PROFILE_CONCAT(a, b) PROFILE_CONCAT_(a, b)
+
+// time the rest of the enclosing scope as the region name, a string
+// literal: its id is looked up once per call site
+#define PROFILE_REGION(name)                                    \
+  static const int PROFILE_CONCAT(profileRegionId_, __LINE__) = \
+      Profiler::instance().regionId(name);                      \
+  ProfileRegion PROFILE_CONCAT(                                 \
+      profileRegion_, __LINE__)(PROFILE_CONCAT(profileRegionId_, __LINE__))
+
+#endif  // PROFILER_HPP_
@@ -17,7 +17,7 @@
 #define ZEROED2D 1
 #endif
 
-#if defined(USE_KOKKOS) && !defined(SEM_MESHCOLOR)
+#if defined(USE_KOKKOS)
 #define ATOMICADD(ADD1, ADD2) Kokkos::atomic_add(&ADD1, ADD2)
 #else
 #define ATOMICADD(ADD1, ADD2) ADD1 += ADD2